@@ -1,26 +1,61 @@
-from flask import Flask, request, jsonify
+import time
+startup_began = time.perf_counter()
+
+import_started = time.perf_counter()
+from flask import Flask, Response, request, jsonify, send_file, g, has_request_context, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError, PyMongoError
 import bcrypt
 import jwt  
 from jwt import encode, decode, ExpiredSignatureError, InvalidTokenError
+web_import_seconds = time.perf_counter() - import_started
+
 import datetime
+import logging
 import os
-import joblib
-import pandas as pd
-import numpy as np
 import re
+import importlib
 from dotenv import load_dotenv
 import warnings
-from sklearn.exceptions import ConvergenceWarning
-import lime
-import lime.lime_tabular
-import shap
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use('Agg')  
 import base64
 from io import BytesIO
+import threading
+import hashlib
+import hmac
+import multiprocessing
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import_started = time.perf_counter()
+import pandas as pd
+import numpy as np
+data_import_seconds = time.perf_counter() - import_started
+
+import_started = time.perf_counter()
+import joblib
+from sklearn.exceptions import ConvergenceWarning
+ml_import_seconds = time.perf_counter() - import_started
+
+from artifact_registry import ArtifactRegistry
+from lime_engine import LimeExplanationEngine
+from feature_layout import OneHotFeatureLayout
+from recipe_pipeline import determine_risk_levels, preprocess_new_recipe
+from microbatch import MicroBatcher
+from mapped_artifacts import MappedArtifactLoader
+from tree_engine import CompiledTreeEnsemble
+from result_cache import ResultCache
+from inmemory_mongo import InMemoryMongoClient
+from auth_tokens import TokenVerifier
+from shap_jobs import ShapSummaryJobs, make_shap_explainer
+from bulk_io import FORMATS as BULK_FORMATS, detect_format, iter_chunks, to_ndjson
+from observability import MetricsRegistry, SampledLogger, StageTimer
+from model_registry import MODEL_REGISTRY_PATH, ModelRegistry, ReleaseError, ReleaseWatcher
+
+# shap, lime and matplotlib are imported on first use (see import_xai_module); plots are rendered off-screen
+os.environ.setdefault("MPLBACKEND", "Agg")
 
 # Suppress warnings
 warnings.filterwarnings("ignore", category=UserWarning, module='sklearn')
@@ -34,12 +69,128 @@ app = Flask(__name__)
 CORS(app)
 app.config['SECRET_KEY'] = os.getenv("SECRET_KEY", "your_default_secret_key")
 
-# MongoDB Connection
+# ---------------------- OBSERVABILITY ----------------------
+# Hot-path debug output goes through debug_log: nothing is formatted unless LOG_LEVEL=DEBUG,
+# and then only for a LOG_SAMPLE_RATE fraction of the calls.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 1.0))
+
+logger = logging.getLogger("backend")
+if not logger.handlers:
+    log_handler = logging.StreamHandler()
+    log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(log_handler)
+    logger.propagate = False
+logger.setLevel(LOG_LEVEL)
+debug_log = SampledLogger(logger, LOG_SAMPLE_RATE)
+
+# Request counters and latency histograms, exposed by /metrics
+metrics = MetricsRegistry()
+http_requests = metrics.counter("http_requests_total", "Requests served, by route, method and status.",
+                                ("route", "method", "status"))
+http_request_duration = metrics.histogram("http_request_duration_seconds", "Request latency until the response is returned.",
+                                          ("route", "method"))
+stage_timer = StageTimer(metrics.histogram("request_stage_duration_seconds",
+                                           "Time spent per stage (parse, preprocess, encode, predict, explain, plot, serialize).",
+                                           ("route", "stage")))
+stage = stage_timer.stage
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """
+    Times request body parsing and response serialization as the "parse" and "serialize" stages
+    (only within a route: Flask also uses the provider for sessions and the test client).
+    """
+
+    def loads(self, s, **kwargs):
+        if not stage_timer.active:
+            return super().loads(s, **kwargs)
+        with stage("parse"):
+            return super().loads(s, **kwargs)
+
+    def dumps(self, obj, **kwargs):
+        if not stage_timer.active:
+            return super().dumps(obj, **kwargs)
+        with stage("serialize"):
+            return super().dumps(obj, **kwargs)
+
+app.json = TimedJSONProvider(app)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    stage_timer.set_route(request.endpoint or "unmatched")
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get("request_started")
+    if started is not None:
+        route = request.endpoint or "unmatched"
+        http_request_duration.observe(time.perf_counter() - started, route, request.method)
+        http_requests.inc(route, request.method, str(response.status_code))
+    stage_timer.clear_route()
+    return response
+
+# MongoDB Connection (MONGO_URI=memory:// uses an in-process stand-in, e.g. for load tests)
 MONGO_URI = os.getenv("MONGO_URI")
-client = MongoClient(MONGO_URI)
+
+def create_mongo_client(uri):
+    """
+    Create a MongoDB client with the pool size and timeouts configured through MONGO_* variables.
+    """
+    if uri and uri.startswith("memory://"):
+        return InMemoryMongoClient.from_uri(uri)
+    return MongoClient(
+        uri,
+        connect=False,  # connect lazily so forked workers each open their own pool
+        maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", 50)),
+        minPoolSize=int(os.getenv("MONGO_MIN_POOL_SIZE", 0)),
+        maxIdleTimeMS=int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 60000)),
+        waitQueueTimeoutMS=int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 2000)),
+        connectTimeoutMS=int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000)),
+        serverSelectionTimeoutMS=int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)),
+        socketTimeoutMS=int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 10000)),
+    )
+
+client = create_mongo_client(MONGO_URI)
 db = client["chemrisk"]
 users_collection = db["users"]
 
+def ensure_user_indexes():
+    """
+    Ensure the unique index on users.email exists.
+
+    A short-lived client is used for a real server so that a pre-fork parent
+    does not open a connection pool its workers would inherit.
+    """
+    try:
+        if isinstance(client, InMemoryMongoClient):
+            users_collection.create_index("email", unique=True)
+        else:
+            with create_mongo_client(MONGO_URI) as startup_client:
+                startup_client["chemrisk"]["users"].create_index("email", unique=True)
+        print("✅ Unique index on users.email ensured")
+        return True
+    except PyMongoError as e:
+        print(f"❌ Could not ensure the users.email index: {e}")
+        return False
+
+# The index is ensured at startup by serve.py and `python app.py`, and otherwise (flask run, WSGI
+# servers) before the first signup, so importing app (CLIs, benchmarks) never waits on MongoDB
+user_indexes_ready = False
+user_indexes_lock = threading.Lock()
+
+def ensure_user_indexes_once():
+    """
+    Run ensure_user_indexes until it succeeds once in this process (and the processes it forks).
+    Spawned helper processes (SHAP summary jobs) re-import the entry point and skip it.
+    """
+    global user_indexes_ready
+    if user_indexes_ready or multiprocessing.parent_process() is not None:
+        return
+    with user_indexes_lock:
+        if not user_indexes_ready:
+            user_indexes_ready = ensure_user_indexes()
+
 # ---------------------- FILE PATHS CONFIGURATION ----------------------
 # Base paths for different components
 MODELS_PATH = os.path.join(os.path.dirname(__file__), "Models")
@@ -56,7 +207,7 @@ RECIPE_MODEL_PATH = os.path.join(RECIPE_MODELS_PATH, "multi_output_regressor_mod
 IMPORTER_MODELS_PATH = os.path.join(MODELS_PATH, "Importer-Risk")
 IMPORTER_ENCODERS_PATH = os.path.join(ENCODERS_PATH, "Importer-Risk")
 IMPORTER_SCALERS_PATH = os.path.join(SCALERS_PATH, "Importer-Risk")
-IMPORTER_XAI_PATH = os.path.join(XAI_PATH, "Importer-risk")
+IMPORTER_XAI_PATH = os.path.join(XAI_PATH, "Importer-Risk")
 
 # Future Trends paths
 FUTURE_MODELS_PATH = os.path.join(MODELS_PATH, "Future-Trends")
@@ -69,55 +220,84 @@ END_USER_MODELS_PATH = os.path.join(MODELS_PATH, "End-User-Risk")
 END_USER_ENCODERS_PATH = os.path.join(ENCODERS_PATH, "End-User-Risk")
 
 # ---------------------- LOAD MODELS AND COMPONENTS ----------------------
+# Artifacts are registered here and loaded on first use (or up front with WARMUP_ON_START=1).
+# Files converted with `python mapped_artifacts.py convert` are memory-mapped from Mapped/ instead.
+artifact_loader = MappedArtifactLoader(verify_checksums=os.getenv("ARTIFACT_VERIFY_CHECKSUMS", "0") == "1")
+artifacts = ArtifactRegistry(default_loader=artifact_loader.load)
+artifacts.record_import("flask, pymongo, bcrypt, jwt", web_import_seconds)
+artifacts.record_import("pandas, numpy", data_import_seconds)
+artifacts.record_import("sklearn, joblib", ml_import_seconds)
 
 # Recipe Analyzer models
-try:
-    vectorizer = joblib.load(RECIPE_VECTORIZER_PATH)
-    print(f"✅ Recipe Vectorizer Loaded Successfully from {RECIPE_VECTORIZER_PATH}!")
-    
-    regressor = joblib.load(RECIPE_MODEL_PATH)
-    print(f"✅ Recipe Regressor Model Loaded Successfully!")
-except Exception as e:
-    print(f"❌ Error Loading Recipe Models: {e}")
+artifacts.register("vectorizer", RECIPE_VECTORIZER_PATH, family="recipe")
+artifacts.register("regressor", RECIPE_MODEL_PATH, family="recipe")
 
 # Importer Risk Models
-try:
-    clf = joblib.load(os.path.join(IMPORTER_MODELS_PATH, "gradient_boost_classifier.pkl"))
-    reg = joblib.load(os.path.join(IMPORTER_MODELS_PATH, "gradient_boost_regressor.pkl"))
-    encoder = joblib.load(os.path.join(IMPORTER_ENCODERS_PATH, "encoder.pkl"))
-    scaler = joblib.load(os.path.join(IMPORTER_SCALERS_PATH, "scaler.pkl"))
-    label_encoder = joblib.load(os.path.join(IMPORTER_ENCODERS_PATH, "label_encoder.pkl"))
-    print("✅ Importer Risk Models Loaded Successfully!")
-except Exception as e:
-    print(f"❌ Error Loading Importer Risk Models: {e}")
+artifacts.register("clf", os.path.join(IMPORTER_MODELS_PATH, "gradient_boost_classifier.pkl"), family="importer")
+artifacts.register("reg", os.path.join(IMPORTER_MODELS_PATH, "gradient_boost_regressor.pkl"), family="importer")
+artifacts.register("encoder", os.path.join(IMPORTER_ENCODERS_PATH, "encoder.pkl"), family="importer")
+artifacts.register("scaler", os.path.join(IMPORTER_SCALERS_PATH, "scaler.pkl"), family="importer")
+artifacts.register("label_encoder", os.path.join(IMPORTER_ENCODERS_PATH, "label_encoder.pkl"), family="importer")
 
 # Future Trends Models
-try:
-    model_future = joblib.load(os.path.join(FUTURE_MODELS_PATH, "nn_model.pkl"))
-    scaler_future = joblib.load(os.path.join(FUTURE_SCALERS_PATH, "scaler_future.pkl"))
-    le = joblib.load(os.path.join(FUTURE_ENCODERS_PATH, "label_encoder_future.pkl"))
-    trained_columns = joblib.load(os.path.join(FUTURE_XAI_PATH, "trained_columns.pkl"))
-    print("✅ Future Trends Models Loaded Successfully!")
-except Exception as e:
-    print(f"❌ Error Loading Future Trends Models: {e}")
+artifacts.register("model_future", os.path.join(FUTURE_MODELS_PATH, "nn_model.pkl"), family="future")
+artifacts.register("scaler_future", os.path.join(FUTURE_SCALERS_PATH, "scaler_future.pkl"), family="future")
+artifacts.register("le", os.path.join(FUTURE_ENCODERS_PATH, "label_encoder_future.pkl"), family="future")
+artifacts.register("trained_columns", os.path.join(FUTURE_XAI_PATH, "trained_columns.pkl"), family="future")
 
 # End User Risk Models
-try:
-    rf_model = joblib.load(os.path.join(END_USER_MODELS_PATH, "Random_forest_model.pkl"))
-    label_encoders = joblib.load(os.path.join(END_USER_ENCODERS_PATH, "End_User_Label_Encoder.pkl"))
-    print("✅ End User Risk Models Loaded Successfully!")
-except Exception as e:
-    print(f"❌ Error Loading End User Risk Models: {e}")
-
-# Load XAI training samples
-try:
-    X_train_sample = joblib.load(os.path.join(IMPORTER_XAI_PATH, "X_train_sample.pkl"))
-    y_train_sample = joblib.load(os.path.join(IMPORTER_XAI_PATH, "y_train_sample.pkl"))
-    print("✅ XAI Training Samples Loaded Successfully!")
-except Exception as e:
-    print(f"❌ Error Loading XAI Training Samples: {e}")
-    X_train_sample = None
-    y_train_sample = None
+artifacts.register("rf_model", os.path.join(END_USER_MODELS_PATH, "Random_forest_model.pkl"), family="end_user")
+artifacts.register("label_encoders", os.path.join(END_USER_ENCODERS_PATH, "End_User_Label_Encoder.pkl"), family="end_user")
+
+# XAI training samples
+artifacts.register("X_train_sample", os.path.join(IMPORTER_XAI_PATH, "X_train_sample.pkl"), family="importer")
+artifacts.register("y_train_sample", os.path.join(IMPORTER_XAI_PATH, "y_train_sample.pkl"), family="importer")
+
+# Compiled flat-array engines for the tree ensembles (TREE_ENGINE=sklearn predicts with the pickled models).
+# Batches larger than TREE_ENGINE_MAX_ROWS go to sklearn, whose Cython traversal wins on large inputs.
+TREE_ENGINE = os.getenv("TREE_ENGINE", "compiled")
+TREE_ENGINE_MAX_ROWS = int(os.getenv("TREE_ENGINE_MAX_ROWS", 256))
+COMPILED_TREE_MODELS = ["rf_model", "clf", "reg"]
+
+def load_tree_engine(name):
+    """
+    Load the compiled engine for a tree model: mapped from Mapped/compiled/ when it
+    was exported by `mapped_artifacts.py convert`, otherwise compiled from the pickle.
+    """
+    compiled_path = artifact_loader.compiled_file(name, artifacts.paths()[name])
+    if compiled_path is not None:
+        return CompiledTreeEnsemble.load(compiled_path)
+    return CompiledTreeEnsemble.from_model(artifacts.get(name))
+
+for name in COMPILED_TREE_MODELS:
+    artifacts.register(f"{name}_engine", loader=lambda name=name: load_tree_engine(name), family=artifacts.family(name))
+
+def get_tree_model(name, n_rows=0):
+    """
+    Model used to predict n_rows rows: the compiled engine for small batches, otherwise
+    the sklearn model. (SHAP always explains the sklearn model itself.)
+    """
+    if TREE_ENGINE == "compiled" and n_rows <= TREE_ENGINE_MAX_ROWS:
+        return artifacts.get(f"{name}_engine")
+    return artifacts.get(name)
+
+# Lazily imported XAI libraries
+xai_modules = {}
+xai_import_lock = threading.Lock()
+
+def import_xai_module(name):
+    """
+    Import an XAI library (shap, lime, matplotlib) the first time an explanation needs it.
+    """
+    module = xai_modules.get(name)
+    if module is None:
+        with xai_import_lock:
+            if name not in xai_modules:
+                start = time.perf_counter()
+                xai_modules[name] = importlib.import_module(name)
+                artifacts.record_import(name, time.perf_counter() - start)
+            module = xai_modules[name]
+    return module
 
 # Define Categorical and Numerical Columns for Importer Risk
 categorical_cols = ["Chemical_Name", "Country_of_Origin", "Importation_Description", "Compliance_History", "Financial_Stability"]
@@ -127,20 +307,196 @@ numerical_cols = ["Import_Frequency", "Past_Violations", "Import_Quantity (kg)",
 end_user_categorical_columns = ['Customer name', 'Product code', 'Invoice No', 'UOM', 'Warehouse']
 end_user_numerical_columns = ['Issued Qty', 'Transaction Date']
 
-# Initialize LIME explainer
-lime_explainer = None
+# Upper bound on the number of transactions accepted by the batch endpoint
+END_USER_BATCH_MAX_ROWS = int(os.getenv("END_USER_BATCH_MAX_ROWS", 10000))
+# Rows per chunk when streaming transaction files through /predict-risk/stream and bulk_score.py
+BULK_CHUNK_ROWS = int(os.getenv("BULK_CHUNK_ROWS", 5000))
+
+# Compile the end-user label encoders into hash tables (class -> code) at load time
+def compile_label_encoders(encoders):
+    return {col: {value: code for code, value in enumerate(enc.classes_)} for col, enc in encoders.items()}
+
+artifacts.register("end_user_encoding_tables", loader=lambda: compile_label_encoders(artifacts.get("label_encoders")), family="end_user")
+
+# ---------------------- LIME CONFIGURATION ----------------------
+# Server-side caps for per-request LIME options
+LIME_DEFAULT_NUM_SAMPLES = int(os.getenv("LIME_DEFAULT_NUM_SAMPLES", 5000))
+LIME_MAX_NUM_SAMPLES = int(os.getenv("LIME_MAX_NUM_SAMPLES", 5000))
+LIME_MAX_NUM_FEATURES = int(os.getenv("LIME_MAX_NUM_FEATURES", 20))
+LIME_MAX_BATCH_ROWS = int(os.getenv("LIME_MAX_BATCH_ROWS", 100))
+
+# Build the LIME engine (explainers are built once and shared between requests)
+def build_lime_engine():
+    import_xai_module("lime.lime_tabular")
+    X_train_sample = artifacts.get("X_train_sample")
+    engine = LimeExplanationEngine(
+        X_train_sample.values,
+        feature_names=X_train_sample.columns.tolist(),
+        class_names=artifacts.get("label_encoder").classes_,
+        predict_proba=lambda rows: get_tree_model("clf", len(rows)).predict_proba(rows),
+        training_labels=artifacts.get("y_train_sample"),
+        default_num_samples=LIME_DEFAULT_NUM_SAMPLES,
+        max_num_samples=LIME_MAX_NUM_SAMPLES,
+        max_num_features=LIME_MAX_NUM_FEATURES,
+        max_batch_rows=LIME_MAX_BATCH_ROWS
+    )
+    engine.warm_up()
+    print("✅ LIME Explainer Initialized Successfully!")
+    return engine
+
+artifacts.register("lime_engine", loader=build_lime_engine, family="importer")
+
+# ---------------------- MICRO-BATCHING ----------------------
+# Single-row predictions from concurrent requests are coalesced into one vectorized predict per model.
+# Configure with MICROBATCH_<NAME>_MAX_BATCH_SIZE / MICROBATCH_<NAME>_MAX_WAIT_MS, or MICROBATCH_ENABLED=0.
+# Each submission is predicted with the model versions its request is pinned to (context=artifacts).
+importer_batcher = MicroBatcher.from_env("importer", lambda X: (get_tree_model("clf", len(X)).predict(X), get_tree_model("reg", len(X)).predict(X)), context=artifacts)
+recipe_batcher = MicroBatcher.from_env("recipe", lambda X: artifacts.get("regressor").predict(X), context=artifacts)
+future_batcher = MicroBatcher.from_env("future", lambda X: artifacts.get("model_future").predict(X), context=artifacts)
+end_user_batcher = MicroBatcher.from_env("end_user", lambda X: get_tree_model("rf_model", len(X)).predict(X), context=artifacts)
+model_batchers = [importer_batcher, recipe_batcher, future_batcher, end_user_batcher]
+
+# ---------------------- RESULT CACHE ----------------------
+# Results are cached per normalized input row and model version (LRU + TTL). Configure with
+# RESULT_CACHE_<NAME>_MAX_ENTRIES / _TTL_SECONDS / _MAX_BYTES, or RESULT_CACHE_ENABLED=0.
+# Requests with "X-Cache-Bypass: 1" or "Cache-Control: no-cache" skip the lookup and refresh the entry.
+prediction_caches = {family: ResultCache.from_env(family) for family in ("recipe", "future", "importer", "end_user")}
+# LIME/SHAP payloads (which may embed plots) get their own entry and byte budget
+explanation_cache = ResultCache.from_env("explanations", max_entries=1000, max_bytes=64 * 1024 * 1024)
+result_caches = list(prediction_caches.values()) + [explanation_cache]
+
+def invalidate_result_caches(family):
+    """
+    Drop cached results computed by a family's models (called when the family reloads).
+    """
+    if family in prediction_caches:
+        prediction_caches[family].invalidate()
+    if family == "importer":
+        explanation_cache.invalidate()
+
+artifacts.on_reload(invalidate_result_caches)
+
+def cache_bypassed():
+    if not has_request_context():
+        return False
+    return (request.headers.get("X-Cache-Bypass", "").lower() in ("1", "true", "yes")
+            or "no-cache" in request.headers.get("Cache-Control", "").lower())
+
+def cached_results(cache, family, payloads, compute, options=None, cacheable=None):
+    """
+    Return one result per canonical payload, computing only the ones not in the cache.
+
+    Args:
+        cache: ResultCache to use
+        family: Model family whose version is part of the key
+        payloads: Canonical (normalized) model inputs, one per result
+        compute: Callable taking the list of missing positions and returning their results
+        options: Route options that change the result (part of the key)
+        cacheable: Predicate deciding which results are stored (default: anything but an error dict)
+
+    Returns:
+        List of results in payload order
+    """
+    if not cache.enabled:
+        return compute(list(range(len(payloads))))
+    if cacheable is None:
+        cacheable = lambda result: not (isinstance(result, dict) and "error" in result)
+    bypass = cache_bypassed()
+    version = artifacts.version(family)
+    keys = [cache.make_key(family, version, options, payload) for payload in payloads]
+    results = [None] * len(keys) if bypass else [cache.get(key) for key in keys]
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        for i, result in zip(missing, compute(missing)):
+            results[i] = result
+            if cacheable(result):
+                cache.put(keys[i], result)
+
+    if bypass:
+        status = "BYPASS"
+    else:
+        status = "MISS" if len(missing) == len(keys) else "HIT" if not missing else "PARTIAL"
+    if has_request_context():
+        g.cache_status = status
+    return results
+
+@app.after_request
+def add_cache_status_header(response):
+    status = g.get("cache_status")
+    if status is not None:
+        response.headers["X-Cache"] = status
+    return response
+
+# ---------------------- SHAP CONFIGURATION ----------------------
+# Number of background rows summarized from X_train_sample (0 = tree-path-dependent, no background)
+SHAP_BACKGROUND_SIZE = int(os.getenv("SHAP_BACKGROUND_SIZE", 50))
+# Per-request latency target for computing SHAP values, in milliseconds
+SHAP_LATENCY_TARGET_MS = float(os.getenv("SHAP_LATENCY_TARGET_MS", 50))
+
+# SHAP explainers cached by model identity: id(model) -> (model, explainer)
+shap_explainers = {}
+shap_explainers_lock = threading.Lock()
+
+# Global summaries are computed as background jobs on a process pool and kept on disk per model
+SHAP_SUMMARY_WORKERS = int(os.getenv("SHAP_SUMMARY_WORKERS", 1))
+SHAP_SUMMARY_CACHE_PATH = os.getenv("SHAP_SUMMARY_CACHE_PATH", os.path.join(XAI_PATH, "summary-cache"))
+shap_summary_jobs = ShapSummaryJobs(SHAP_SUMMARY_CACHE_PATH, max_workers=SHAP_SUMMARY_WORKERS,
+                                    stale_after_seconds=float(os.getenv("SHAP_SUMMARY_JOB_TIMEOUT_SECONDS", 900)))
+
+# Plot handling for SHAP explanations: "none", "inline" (base64 in the response) or "deferred"
+SHAP_PLOT_MODES = ("none", "inline", "deferred")
+SHAP_PLOT_MODE = os.getenv("SHAP_PLOT_MODE", "inline")
+SHAP_PLOT_WORKERS = int(os.getenv("SHAP_PLOT_WORKERS", 2))
+SHAP_PLOT_CACHE_PATH = os.getenv("SHAP_PLOT_CACHE_PATH", os.path.join(XAI_PATH, "plot-cache"))
+
+# Deferred plots are rendered off the request thread and written to a content-addressed cache
+plot_executor = ThreadPoolExecutor(max_workers=SHAP_PLOT_WORKERS, thread_name_prefix="shap-plot")
+pending_plots = {}
+pending_plots_lock = threading.Lock()
+# pyplot keeps global figure state, so rendering itself is serialized
+plot_render_lock = threading.Lock()
+model_fingerprints = {}
 
 # --------------------- AUTHENTICATION ROUTES ---------------------
 
 # Helper: Hash password
 def hash_password(password):
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     return bcrypt.hashpw(password.encode('utf-8'), salt)
 
 # Helper: Verify password
 def verify_password(password, hashed):
     return bcrypt.checkpw(password.encode('utf-8'), hashed)
 
+# bcrypt is deliberately slow, so it runs on a small bounded pool: at most AUTH_WORKERS hashes at once
+# (bcrypt releases the GIL, so prediction threads keep the remaining cores) and at most
+# AUTH_MAX_PENDING auth requests in flight before new ones are turned away with 503.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+AUTH_WORKERS = int(os.getenv("AUTH_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+AUTH_MAX_PENDING = int(os.getenv("AUTH_MAX_PENDING", 64))
+auth_executor = ThreadPoolExecutor(max_workers=AUTH_WORKERS, thread_name_prefix="bcrypt")
+auth_slots = threading.BoundedSemaphore(AUTH_MAX_PENDING)
+
+class AuthBusyError(RuntimeError):
+    """Raised when the bcrypt pool already has AUTH_MAX_PENDING requests queued."""
+
+def run_auth_task(fn, *args):
+    """
+    Run a bcrypt call on the auth pool and wait for its result.
+    """
+    if not auth_slots.acquire(blocking=False):
+        raise AuthBusyError("Too many authentication requests in progress")
+    try:
+        return auth_executor.submit(fn, *args).result()
+    finally:
+        auth_slots.release()
+
+def auth_busy_response():
+    response = jsonify({"message": "Server busy, please retry"})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
 # Helper: Generate JWT Token
 def generate_token(email):
     payload = {
@@ -157,9 +513,18 @@ def signup():
 
     if users_collection.find_one({"email": email}):
         return jsonify({"message": "User already exists"}), 400
+    ensure_user_indexes_once()
 
-    hashed_password = hash_password(password)
-    users_collection.insert_one({"name": name, "email": email, "password": hashed_password})
+    try:
+        hashed_password = run_auth_task(hash_password, password)
+    except AuthBusyError:
+        return auth_busy_response()
+
+    try:
+        users_collection.insert_one({"name": name, "email": email, "password": hashed_password})
+    except DuplicateKeyError:
+        # A concurrent signup for the same email won the race (enforced by the unique index)
+        return jsonify({"message": "User already exists"}), 400
 
     return jsonify({"message": "Signup successful"}), 201
 
@@ -170,53 +535,91 @@ def login():
     email, password = data["email"], data["password"]
 
     user = users_collection.find_one({"email": email})
-    if user and verify_password(password, user["password"]):
+    try:
+        password_ok = user is not None and run_auth_task(verify_password, password, user["password"])
+    except AuthBusyError:
+        return auth_busy_response()
+
+    if password_ok:
         token = generate_token(email)
         return jsonify({"message": "Login successful", "token": token}), 200
 
     return jsonify({"message": "Invalid credentials"}), 401
 
-# --------------------- CHEMICAL RISK ANALYSIS ROUTE ---------------------
+# ---------------------- AUTH MIDDLEWARE ----------------------
+# With AUTH_REQUIRED=1 the prediction and explanation routes need an "Authorization: Bearer <token>"
+# header carrying a token issued by /login. Verified claims are cached by token digest until the
+# token expires, so repeat calls skip the signature check; users_collection is never queried.
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "0") == "1"
+token_verifier = TokenVerifier(app.config['SECRET_KEY'], max_entries=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 10000)))
 
-# Preprocessing function
-def preprocess_new_recipe(new_recipe_raw):
-    def combine_chemicals(chemicals, quantities):
-        combined = [f"{chem.strip()}:{re.sub(r'[^0-9.]+', '', qty)}"
-                    for chem, qty in zip(chemicals.split("+"), quantities.split("+"))]
-        return " + ".join(combined)
+protected_endpoints = {
+    "analyze", "analyze_batch", "predict", "importer_risk", "importer_risk_batch", "explain_prediction",
+    "explain_shap", "explain_plot", "generate_shap_summary", "create_shap_summary_job", "get_shap_summary_job",
+    "get_shap_summary_plot", "predict_risk", "predict_risk_batch", "predict_risk_stream", "risk_profile",
+}
 
-    new_recipe_raw["Combined Recipe"] = new_recipe_raw.apply(
-        lambda row: combine_chemicals(row["Chemical Names"], row["Quantities (g/mL)"]), axis=1
-    )
-    return new_recipe_raw
+@app.before_request
+def authenticate_request():
+    if not AUTH_REQUIRED or request.method == "OPTIONS" or request.endpoint not in protected_endpoints:
+        return None
 
-# Flask route for analysis
-@app.route('/analyze', methods=['POST'])
-def analyze():
-    data = request.json
-    print("Received Data:", data)
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return jsonify({"message": "Missing bearer token"}), 401
 
-    # Extract chemical names and quantities
-    chemicals = data.get("chemicals", [])
-    
-    if not chemicals:
-        return jsonify({"error": "No chemicals provided"}), 400
+    try:
+        g.user_claims = token_verifier.verify(token.strip())
+    except ExpiredSignatureError:
+        return jsonify({"message": "Token expired"}), 401
+    except InvalidTokenError:
+        return jsonify({"message": "Invalid token"}), 401
+    return None
+
+# --------------------- CHEMICAL RISK ANALYSIS ROUTE ---------------------
+
+# Upper bound on the number of recipes accepted by the batch endpoint
+RECIPE_BATCH_MAX_ROWS = int(os.getenv("RECIPE_BATCH_MAX_ROWS", 10000))
 
-    chemical_names = " + ".join([chem["name"].strip() for chem in chemicals])
-    quantities = " + ".join([str(chem["quantity"]).strip() for chem in chemicals])
+# Build the raw recipe DataFrame from lists of {"name", "quantity"} chemicals
+def build_recipe_frame(chemical_lists):
+    rows = []
+    for chemicals in chemical_lists:
+        chemical_names = " + ".join([chem["name"].strip() for chem in chemicals])
+        quantities = " + ".join([str(chem["quantity"]).strip() for chem in chemicals])
+        rows.append({"Chemical Names": chemical_names, "Quantities (g/mL)": quantities})
 
     # Create DataFrame with expected structure
-    new_recipe_raw = pd.DataFrame([{"Chemical Names": chemical_names, "Quantities (g/mL)": quantities}])
+    return pd.DataFrame(rows, columns=["Chemical Names", "Quantities (g/mL)"])
+
+def predict_recipe_risk(new_recipe_raw):
+    """
+    Score a DataFrame of raw recipes with the multi-output regressor.
+
+    The TF-IDF features stay in CSR form all the way into the regressor, so
+    memory grows with the number of non-zero tokens rather than the vocabulary.
+
+    Args:
+        new_recipe_raw: DataFrame with "Chemical Names" and "Quantities (g/mL)" columns
 
+    Returns:
+        DataFrame with the three scores and the overall risk level, one row per recipe
+    """
     # Preprocess
-    new_recipe_processed = preprocess_new_recipe(new_recipe_raw)
+    with stage("preprocess"):
+        new_recipe_processed = preprocess_new_recipe(new_recipe_raw)
     
-    # Vectorize
-    new_recipe_tfidf = vectorizer.transform(new_recipe_processed["Combined Recipe"]).toarray()
-    new_recipe_tfidf = pd.DataFrame(new_recipe_tfidf, columns=vectorizer.get_feature_names_out())
+    combined_recipes = new_recipe_processed["Combined Recipe"].tolist()
 
-    # Predict
-    predictions = regressor.predict(new_recipe_tfidf)
+    def score(positions):
+        # Vectorize (sparse CSR matrix) and predict only the recipes missing from the cache
+        with stage("encode"):
+            new_recipe_tfidf = artifacts.get("vectorizer").transform([combined_recipes[i] for i in positions])
+        with stage("predict"):
+            return recipe_batcher.submit(new_recipe_tfidf).tolist()
+
+    # Predict (keyed on the normalized "chemical:quantity" recipe string)
+    predictions = np.array(cached_results(prediction_caches["recipe"], "recipe", combined_recipes, score))
 
     # Format predictions
     predicted_df = pd.DataFrame({
@@ -225,83 +628,158 @@ def analyze():
         "Risk Score (0-100)": predictions[:, 2] * 100
     })
 
-    # Determine overall risk level
-    def determine_risk_level(row):
-        if any([row["Explosiveness (1-10)"] > 90, row["Health Risk Score (0-100)"] > 90, row["Risk Score (0-100)"] > 90]):
-            return "Very High Risk"
-        elif any([71 <= row["Explosiveness (1-10)"] <= 90, 71 <= row["Health Risk Score (0-100)"] <= 90, 71 <= row["Risk Score (0-100)"] <= 90]):
-            return "High Risk"
-        elif any([31 <= row["Explosiveness (1-10)"] <= 70, 31 <= row["Health Risk Score (0-100)"] <= 70, 31 <= row["Risk Score (0-100)"] <= 70]):
-            return "Medium Risk"
-        else:
-            return "Low Risk"
+    predicted_df["Overall Risk Level"] = determine_risk_levels(predicted_df)
+    return predicted_df
+
+# Convert one row of recipe predictions into the API response format
+def format_recipe_result(predicted_row):
+    return {
+        "explosiveness": float(predicted_row["Explosiveness (1-10)"]),
+        "health_risk": float(predicted_row["Health Risk Score (0-100)"]),
+        "risk_score": float(predicted_row["Risk Score (0-100)"]),
+        "overall_risk_level": predicted_row["Overall Risk Level"],
+    }
 
-    predicted_df["Overall Risk Level"] = predicted_df.apply(determine_risk_level, axis=1)
+# Flask route for analysis
+@app.route('/analyze', methods=['POST'])
+def analyze():
+    data = request.json
+    debug_log.debug("Received recipe data: %s", data)
+
+    # Extract chemical names and quantities
+    chemicals = data.get("chemicals", [])
+    
+    if not chemicals:
+        return jsonify({"error": "No chemicals provided"}), 400
+
+    # Predict
+    predicted_df = predict_recipe_risk(build_recipe_frame([chemicals]))
 
     # Prepare response
-    response = {
-        "explosiveness": predicted_df["Explosiveness (1-10)"].iloc[0],
-        "health_risk": predicted_df["Health Risk Score (0-100)"].iloc[0],
-        "risk_score": predicted_df["Risk Score (0-100)"].iloc[0],
-        "overall_risk_level": predicted_df["Overall Risk Level"].iloc[0],
-    }
+    response = format_recipe_result(predicted_df.iloc[0])
 
     return jsonify(response)
 
+# Flask route for batch analysis
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """
+    Score many recipes per call: a JSON array (or {"recipes": [...]}) of {"chemicals": [...]} objects.
+    """
+    data = request.get_json(silent=True)
+    recipes = data.get("recipes") if isinstance(data, dict) else data
+
+    if not isinstance(recipes, list) or not recipes:
+        return jsonify({"error": "Expected a non-empty list of recipes"}), 400
+    if len(recipes) > RECIPE_BATCH_MAX_ROWS:
+        return jsonify({"error": f"Batch too large: {len(recipes)} recipes (max {RECIPE_BATCH_MAX_ROWS})"}), 413
+
+    results = [None] * len(recipes)
+    valid_chemicals = []
+    valid_positions = []
+    for i, recipe in enumerate(recipes):
+        chemicals = recipe.get("chemicals") if isinstance(recipe, dict) else None
+        if not chemicals or not all(isinstance(chem, dict) and "name" in chem and "quantity" in chem for chem in chemicals):
+            results[i] = {"index": i, "error": "No chemicals provided"}
+        else:
+            valid_chemicals.append(chemicals)
+            valid_positions.append(i)
+
+    try:
+        if valid_chemicals:
+            predicted_df = predict_recipe_risk(build_recipe_frame(valid_chemicals))
+            for position, (_, predicted_row) in zip(valid_positions, predicted_df.iterrows()):
+                results[position] = dict(index=position, **format_recipe_result(predicted_row))
+
+        return jsonify({
+            "results": results,
+            "count": len(results),
+            "error_count": len(recipes) - len(valid_positions)
+        })
+
+    except Exception as e:
+        print(f"Error in recipe batch analysis: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
 # --------------------- FUTURE RISK PREDICTION ROUTE ---------------------
 
+# Future Trends feature layout, compiled once from trained_columns
+future_categorical_cols = ['Compliance_History', 'Risk_Category', 'Chemical_Name', 'Country_of_Origin', 'Financial_Stability']
+future_numerical_cols = ['Import_Frequency', 'Import_Quantity (kg)', 'Compliance_Score', 'Past_Violations', 'Import_Trend']
+
+artifacts.register(
+    "future_layout",
+    loader=lambda: OneHotFeatureLayout(
+        artifacts.get("trained_columns"), future_categorical_cols, future_numerical_cols, scaler=artifacts.get("scaler_future")
+    ),
+    family="future"
+)
+
+# Predict future risk labels for one row (dict of scalars) or a list of rows
+def predict_future_risks(input_data):
+    # A single object of scalar values is one row
+    if isinstance(input_data, dict) and not any(isinstance(value, (list, tuple)) for value in input_data.values()):
+        input_data = [input_data]
+    
+    # Convert the input to DataFrame
+    with stage("preprocess"):
+        input_df = pd.DataFrame(input_data)
+        payloads = input_df.to_dict(orient="records")
+
+    def score(positions):
+        # 🔹 One-hot encode, scale and order the rows into one matrix
+        with stage("encode"):
+            model_input = artifacts.get("future_layout").transform(input_df.iloc[positions])
+
+        with stage("predict"):
+            # 🔹 Make prediction using the neural network model
+            prediction = future_batcher.submit(model_input)
+
+            # 🔹 Decode the prediction
+            return artifacts.get("le").inverse_transform(prediction).tolist()
+
+    return cached_results(prediction_caches["future"], "future", payloads, score)
+
 @app.route('/predict', methods=['POST'])
 def predict():
     # Get input data from the request
     input_data = request.json
+
+    prediction_label_nn = predict_future_risks(input_data)
     
-    # Convert the input to DataFrame
-    input_df = pd.DataFrame(input_data)
-    
-    # 🔹 Encode categorical features using One-Hot Encoding
-    categorical_cols = ['Compliance_History', 'Risk_Category', 'Chemical_Name', 'Country_of_Origin', 'Financial_Stability']
-    input_df = pd.get_dummies(input_df, columns=categorical_cols)
-    
-    # 🔹 Apply scaling to numerical columns
-    numerical_cols = ['Import_Frequency', 'Import_Quantity (kg)', 'Compliance_Score', 'Past_Violations', 'Import_Trend']
-    input_df[numerical_cols] = scaler_future.transform(input_df[numerical_cols])
-    
-    # 🔹 Add missing one-hot encoded columns
-    for col in trained_columns:
-        if col not in input_df.columns:
-            input_df[col] = 0  # Fill missing features with 0
-    
-    # 🔹 Reorder columns to match training order
-    input_df = input_df[trained_columns]
-    
-    # 🔹 Make prediction using the neural network model
-    prediction = model_future.predict(input_df)
-    
-    # 🔹 Decode the prediction
-    prediction_label_nn = le.inverse_transform(prediction)
-    
-    # 🔹 Return the result as a JSON response
-    return jsonify({"predicted_risk": prediction_label_nn[0]})
+    # 🔹 Return the result as a JSON response (one label per row)
+    return jsonify({
+        "predicted_risk": prediction_label_nn[0],
+        "predicted_risks": prediction_label_nn
+    })
 
 # --------------------- IMPORTER RISK PREDICTION ROUTE ---------------------
 
+# Mapping from frontend field names to the names expected by the model
+field_mapping = {
+    "hsCode": "HS Code",
+    "chemicalName": "Chemical_Name",
+    "countryOfOrigin": "Country_of_Origin",
+    "importationDescription": "Importation_Description",
+    "complianceHistory": "Compliance_History",
+    "financialStability": "Financial_Stability",
+    "importFrequency": "Import_Frequency",
+    "importVolume": "Import_Quantity (kg)",
+    "pastViolations": "Past_Violations"
+}
+
+# Frontend fields that must be present for an importer risk prediction
+importer_required_fields = list(field_mapping.keys())
+
+# Upper bound on the number of rows accepted by the batch endpoint
+IMPORTER_BATCH_MAX_ROWS = int(os.getenv("IMPORTER_BATCH_MAX_ROWS", 10000))
+
 def preprocess_importer_data(input_data):
     """
     Map frontend field names to the names expected by the model.
     """
-    # Create a mapping from frontend field names to model field names
-    field_mapping = {
-        "hsCode": "HS Code",
-        "chemicalName": "Chemical_Name",
-        "countryOfOrigin": "Country_of_Origin",
-        "importationDescription": "Importation_Description",
-        "complianceHistory": "Compliance_History",
-        "financialStability": "Financial_Stability",
-        "importFrequency": "Import_Frequency",
-        "importVolume": "Import_Quantity (kg)",
-        "pastViolations": "Past_Violations"
-    }
-    
     # Create a new dictionary with the mapped field names
     processed_data = {}
     for frontend_key, model_key in field_mapping.items():
@@ -333,25 +811,19 @@ def preprocess_importer_data(input_data):
     
     return processed_data
 
-def predict_importer_risk(input_data):
+def encode_importer_features(input_df):
     """
-    Process Importer Risk Data and Predict Risk Category & Probability.
+    Encode and scale a DataFrame of preprocessed importer rows.
+
+    Args:
+        input_df: DataFrame with one row per importer, using model field names
+
+    Returns:
+        DataFrame of model features (scaled numericals followed by one-hot categoricals)
     """
-    # Preprocess the input data to match model expectations
-    processed_data = preprocess_importer_data(input_data)
-    
-    # Convert input into DataFrame
-    input_df = pd.DataFrame([processed_data])
-    
-    # Debug information
-    print("Debug - Input DataFrame:")
-    print(input_df)
-    print("Debug - Categorical columns expected by encoder:")
-    for i, col in enumerate(categorical_cols):
-        if hasattr(encoder, 'categories_'):
-            print(f"{col}: Expected categories: {encoder.categories_[i]}")
-            print(f"{col}: Actual value: {input_df[col].values[0]}")
-    
+    encoder = artifacts.get("encoder")
+    scaler = artifacts.get("scaler")
+
     # Process categorical features
     cat_features = encoder.transform(input_df[categorical_cols])
     cat_df = pd.DataFrame(cat_features, columns=encoder.get_feature_names_out(categorical_cols))
@@ -361,86 +833,326 @@ def predict_importer_risk(input_data):
     num_df = pd.DataFrame(num_features, columns=numerical_cols)
     
     # Combine processed features
-    processed_input = pd.concat([num_df, cat_df], axis=1)
-    
+    return pd.concat([num_df, cat_df], axis=1)
+
+def unknown_importer_categories(processed_data):
+    """
+    Categorical values of a preprocessed row that the one-hot encoder has not seen (encoded as all zeros).
+    """
+    encoder = artifacts.get("encoder")
+    return {col: processed_data[col] for col, categories in zip(categorical_cols, encoder.categories_)
+            if processed_data[col] not in categories}
+
+def predict_importer_risk(input_data):
+    """
+    Process Importer Risk Data and Predict Risk Category & Probability.
+    """
+    # Preprocess the input data to match model expectations
+    with stage("preprocess"):
+        processed_data = preprocess_importer_data(input_data)
+
+        # Convert input into DataFrame
+        input_df = pd.DataFrame([processed_data])
+
+    # Debug information (only formatted when debug logging is on and the call is sampled)
+    debug_log.debug("Importer input: %s; categories unknown to the encoder: %s",
+                    lambda: processed_data, lambda: unknown_importer_categories(processed_data))
+
+    # Encode and scale features
+    with stage("encode"):
+        processed_input = encode_importer_features(input_df)
+
     # Make predictions
-    predicted_class = clf.predict(processed_input)
-    predicted_category = label_encoder.inverse_transform(predicted_class)[0]
-    predicted_prob = reg.predict(processed_input)[0]
+    with stage("predict"):
+        predicted_class, predicted_probs = importer_batcher.submit(processed_input)
+        predicted_category = artifacts.get("label_encoder").inverse_transform(predicted_class)[0]
+        predicted_prob = predicted_probs[0]
     
     return predicted_category, predicted_prob, processed_input
 
+def validate_importer_record(record):
+    """
+    Return a list of validation errors for a single importer record.
+    """
+    if not isinstance(record, dict):
+        return ["Row must be an object"]
+
+    missing_fields = [field for field in importer_required_fields if not record.get(field)]
+    if missing_fields:
+        return [f"Missing fields: {', '.join(missing_fields)}"]
+    return []
+
+def predict_importer_risk_batch(records):
+    """
+    Predict risk category & probability for many importers in one vectorized pass.
+
+    Args:
+        records: List of importer dictionaries using frontend field names
+
+    Returns:
+        List of per-row result dictionaries, in input order. Invalid rows carry
+        an "error" key instead of a prediction.
+    """
+    results = [None] * len(records)
+    valid_rows = []
+    valid_positions = []
+
+    with stage("preprocess"):
+        for i, record in enumerate(records):
+            errors = validate_importer_record(record)
+            if not errors:
+                try:
+                    valid_rows.append(preprocess_importer_data(record))
+                    valid_positions.append(i)
+                    continue
+                except Exception as e:
+                    errors = [f"Invalid row: {str(e)}"]
+            results[i] = {"index": i, "error": "; ".join(errors)}
+
+    def score(positions):
+        # Build one DataFrame for the rows missing from the cache and score them in one go
+        with stage("encode"):
+            input_df = pd.DataFrame([valid_rows[i] for i in positions])
+            processed_input = encode_importer_features(input_df)
+
+        with stage("predict"):
+            predicted_classes, predicted_probs = importer_batcher.submit(processed_input)
+            predicted_categories = artifacts.get("label_encoder").inverse_transform(predicted_classes)
+            return [(category, float(prob)) for category, prob in zip(predicted_categories, predicted_probs)]
+
+    if valid_rows:
+        predictions = cached_results(prediction_caches["importer"], "importer", valid_rows, score)
+        for position, (category, prob) in zip(valid_positions, predictions):
+            results[position] = {
+                "index": position,
+                "risk_category": category,
+                "risk_probability": round(float(prob), 4)
+            }
+
+    return results
+
+def read_importer_batch_request(max_rows=None):
+    """
+    Extract the list of importer records from a JSON array or a CSV upload.
+
+    A CSV upload is parsed only up to max_rows + 1 rows, so an oversized
+    manifest is rejected without being read into memory.
+    """
+    upload = request.files.get("file")
+    if upload is not None or request.mimetype == "text/csv":
+        source = upload if upload is not None else BytesIO(request.get_data())
+        # Read every cell as a string so empty cells stay "" instead of NaN
+        csv_df = pd.read_csv(source, dtype=str, keep_default_na=False, nrows=None if max_rows is None else max_rows + 1)
+        return csv_df.to_dict(orient="records")
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get("records")
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array of importer records or a CSV file upload")
+    return data
+
+# Helper function to read LIME options from a request body
+def read_lime_options(data):
+    """
+    Extract per-request LIME options, validated and capped by the engine.
+
+    Raises:
+        ValueError: If an option is not valid
+    """
+    options = {
+        "num_features": data.get("num_features", 5),
+        "num_samples": data.get("num_samples"),
+        "discretize_continuous": data.get("discretize_continuous", True),
+        "discretizer": data.get("discretizer", "quartile"),
+        "feature_selection": data.get("feature_selection", "auto"),
+    }
+    lime_engine = artifacts.get_optional("lime_engine")
+    if lime_engine is not None:
+        options = lime_engine.resolve_options(**options)
+    options["random_state"] = data.get("random_state")
+    return options
+
+# Helper function to get LIME explanations for many rows
+def get_lime_explanations_batch(processed_input, num_features=5, **options):
+    """
+    Generate LIME explanations for every row of a processed importer batch.
+
+    Args:
+        processed_input: The processed input data (one row per importer)
+        num_features: Number of top features to include in each explanation
+        options: num_samples, discretize_continuous, discretizer, feature_selection, random_state
+
+    Returns:
+        List of dictionaries with feature importance information
+    """
+    lime_engine = artifacts.get_optional("lime_engine")
+    if lime_engine is None:
+        return [{"error": "Could not initialize LIME explainer"}] * len(processed_input)
+
+    try:
+        with stage("explain"):
+            return lime_engine.explain_batch(processed_input.values, num_features=num_features, **options)
+    except ValueError as e:
+        return [{"error": str(e)}] * len(processed_input)
+    except Exception as e:
+        print(f"Error generating LIME explanation: {e}")
+        return [{"error": str(e)}] * len(processed_input)
+
 # Helper function to get LIME explanations
-def get_lime_explanations(processed_input, num_features=5):
+def get_lime_explanations(processed_input, num_features=5, **options):
     """
     Generate LIME explanations for the importer risk prediction.
     
     Args:
         processed_input: The processed input data
         num_features: Number of top features to include in explanation
+        options: num_samples, discretize_continuous, discretizer, feature_selection, random_state
     
     Returns:
         Dictionary with feature importance information
     """
-    global lime_explainer
-    
-    # Check if we have a training dataset loaded to initialize LIME
+    return get_lime_explanations_batch(processed_input.iloc[:1], num_features=num_features, **options)[0]
+
+# Helper function to build a SHAP explainer for a model
+def build_shap_explainer(model):
+    """
+    Build a SHAP explainer for a model over SHAP_BACKGROUND_SIZE background rows
+    (see shap_jobs.make_shap_explainer).
+    """
+    return make_shap_explainer(import_xai_module("shap"), model, artifacts.get("X_train_sample"), SHAP_BACKGROUND_SIZE)
+
+# Helper function to get the cached SHAP explainer for a model
+def get_shap_explainer(model):
+    """
+    Return the SHAP explainer for a model, building it on first use.
+    """
+    key = id(model)
+    cached = shap_explainers.get(key)
+    if cached is not None and cached[0] is model:
+        return cached[1]
+
+    with shap_explainers_lock:
+        cached = shap_explainers.get(key)
+        if cached is None or cached[0] is not model:
+            start = time.perf_counter()
+            explainer = build_shap_explainer(model)
+            print(f"✅ SHAP explainer for {type(model).__name__} built in {(time.perf_counter() - start) * 1000:.1f} ms")
+            shap_explainers[key] = (model, explainer)
+            cached = shap_explainers[key]
+    return cached[1]
+
+# Build SHAP explainers ahead of the first request (part of warm-up)
+def warm_shap_explainers():
     try:
-        # Initialize LIME explainer if not already done
-        if lime_explainer is None and X_train_sample is not None:
-            lime_explainer = lime.lime_tabular.LimeTabularExplainer(
-                X_train_sample.values,
-                feature_names=X_train_sample.columns.tolist(),
-                class_names=label_encoder.classes_,
-                mode="classification"
-            )
+        get_shap_explainer(artifacts.get("clf"))
     except Exception as e:
-        print(f"Error initializing LIME explainer: {e}")
-        return {"error": "Could not initialize LIME explainer"}
-    
-    try:
-        # Get LIME explanation
-        instance = processed_input.values[0]
-        exp = lime_explainer.explain_instance(instance, clf.predict_proba, num_features=num_features)
-        
-        # Extract feature importance
-        feature_importance = []
-        for feature, importance in exp.as_list():
-            feature_importance.append({
-                "feature": feature,
-                "importance": importance
-            })
+        print(f"❌ Error Building SHAP Explainer: {e}")
+
+# Helper function to fingerprint a model (or sample) for the plot and summary caches
+def get_model_fingerprint(model):
+    key = id(model)
+    cached = model_fingerprints.get(key)
+    if cached is None or cached[0] is not model:
+        cached = (model, joblib.hash(model))
+        model_fingerprints[key] = cached
+    return cached[1]
+
+# Helper function to compute the plot cache key for an explanation
+def get_shap_plot_digest(processed_input, model):
+    """
+    Hash the model, the SHAP settings and the processed input into a cache key.
+    """
+    digest = hashlib.sha256()
+    digest.update(get_model_fingerprint(model).encode("utf-8"))
+    digest.update(str(SHAP_BACKGROUND_SIZE).encode("utf-8"))
+    digest.update("|".join(processed_input.columns).encode("utf-8"))
+    digest.update(np.ascontiguousarray(processed_input.to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+def get_shap_plot_path(digest):
+    return os.path.join(SHAP_PLOT_CACHE_PATH, f"{digest}.png")
+
+# Helper function to render a SHAP beeswarm plot to PNG bytes
+def render_shap_plot(shap_values):
+    shap = import_xai_module("shap")
+    plt = import_xai_module("matplotlib.pyplot")
+    with plot_render_lock:
+        plt.figure(figsize=(10, 6))
+        shap.plots.beeswarm(shap_values, show=False)
+        plt.tight_layout(pad=2.0)
         
-        return {
-            "feature_importance": feature_importance,
-            "model_confidence": exp.score
-        }
-    except Exception as e:
-        print(f"Error generating LIME explanation: {e}")
-        return {"error": str(e)}
+        # Save plot to a bytes buffer
+        buf = BytesIO()
+        plt.savefig(buf, format='png', bbox_inches='tight', dpi=100)
+        plt.close()
+    return buf.getvalue()
+
+# Background job: render a plot and store it in the on-disk cache
+def render_shap_plot_to_cache(digest, shap_values):
+    try:
+        png = render_shap_plot(shap_values)
+        os.makedirs(SHAP_PLOT_CACHE_PATH, exist_ok=True)
+        # Write to a temporary file first so readers never see a partial PNG
+        tmp_path = f"{get_shap_plot_path(digest)}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(png)
+        os.replace(tmp_path, get_shap_plot_path(digest))
+    finally:
+        with pending_plots_lock:
+            pending_plots.pop(digest, None)
+
+# Helper function to schedule a deferred SHAP plot
+def schedule_shap_plot(processed_input, model, shap_values):
+    """
+    Queue a plot for background rendering unless it is already cached or pending.
+
+    Returns:
+        The content digest identifying the plot
+    """
+    digest = get_shap_plot_digest(processed_input, model)
+    if os.path.exists(get_shap_plot_path(digest)):
+        return digest
+
+    with pending_plots_lock:
+        if digest not in pending_plots:
+            pending_plots[digest] = plot_executor.submit(render_shap_plot_to_cache, digest, shap_values)
+    return digest
 
 # Helper function to get SHAP explanations
-def get_shap_explanations(processed_input, model):
+def get_shap_explanations(processed_input, model, plot_mode=None):
     """
     Generate SHAP explanations for the importer risk prediction.
     
     Args:
         processed_input: The processed input data
         model: The trained model (classifier)
+        plot_mode: "none" (no plot), "inline" (base64 PNG in the response) or
+            "deferred" (rendered in the background, served from /explain-plot/<digest>).
+            Defaults to SHAP_PLOT_MODE.
     
     Returns:
         Dictionary with SHAP values and feature importance plot
     """
+    plot_mode = (plot_mode or SHAP_PLOT_MODE).lower()
+    if plot_mode not in SHAP_PLOT_MODES:
+        return {"error": f"Invalid plot_mode '{plot_mode}'. Expected one of: {', '.join(SHAP_PLOT_MODES)}"}
+
     try:
         # Use the loaded sample training data for the explainer
-        if X_train_sample is None:
+        if artifacts.get_optional("X_train_sample") is None:
             return {"error": "Training sample data not available for SHAP explainer"}
         
-        # Initialize SHAP explainer
-        explainer = shap.Explainer(model, X_train_sample)
+        # Get the cached SHAP explainer
+        explainer = get_shap_explainer(model)
         
         # Compute SHAP values for the input
-        shap_values = explainer(processed_input)
+        start = time.perf_counter()
+        with stage("explain"):
+            shap_values = explainer(processed_input)
+        latency_ms = (time.perf_counter() - start) * 1000
+        if latency_ms > SHAP_LATENCY_TARGET_MS:
+            logger.warning("SHAP explanation took %.1f ms (target %.0f ms)", latency_ms, SHAP_LATENCY_TARGET_MS)
         
         # Convert SHAP values to list for JSON serialization
         shap_values_list = shap_values.values.tolist()[0]
@@ -459,24 +1171,21 @@ def get_shap_explanations(processed_input, model):
         # Get top features and their SHAP values
         top_features = [{"feature": feature, "shap_value": value} for feature, value in sorted_features[:10]]
         
-        # Generate SHAP summary plot
-        plt.figure(figsize=(10, 6))
-        shap.plots.beeswarm(shap_values, show=False)
-        plt.tight_layout(pad=2.0)
-        
-        # Save plot to a bytes buffer
-        buf = BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight', dpi=100)
-        plt.close()
-        buf.seek(0)
-        
-        # Convert plot to base64 for embedding in response
-        plot_base64 = base64.b64encode(buf.read()).decode('utf-8')
-        
-        return {
+        result = {
             "top_features": top_features,
-            "plot": plot_base64,
+            "latency_ms": round(latency_ms, 2),
+            "plot_mode": plot_mode,
         }
+
+        if plot_mode == "inline":
+            # Convert plot to base64 for embedding in response
+            with stage("plot"):
+                result["plot"] = base64.b64encode(render_shap_plot(shap_values)).decode('utf-8')
+        elif plot_mode == "deferred":
+            digest = schedule_shap_plot(processed_input, model, shap_values)
+            result["plot_url"] = f"/explain-plot/{digest}"
+        
+        return result
     
     except Exception as e:
         print(f"Error generating SHAP explanation: {e}")
@@ -487,47 +1196,16 @@ def get_shap_explanations(processed_input, model):
 @app.route('/importer-risk', methods=['POST'])
 def importer_risk():
     data = request.json
-    print("✅ Received Importer Data:", data)
+    debug_log.debug("Received importer data: %s", data)
 
     try:
         # Ensure all necessary fields are present
-        required_fields = ["hsCode", "chemicalName", "countryOfOrigin", 
-                           "importationDescription", "complianceHistory", "financialStability", "importFrequency", "importVolume", "pastViolations"]
-
-        missing_fields = [field for field in required_fields if not data.get(field)]
+        missing_fields = [field for field in importer_required_fields if not data.get(field)]
         if missing_fields:
             return jsonify({"error": f"Missing fields: {', '.join(missing_fields)}"}), 400
 
-        # Get predictions
-        predicted_category, predicted_prob, processed_input = predict_importer_risk(data)
-        print("✅ Prediction - Category:", predicted_category, "Probability:", predicted_prob)
-        
-        # Include XAI explanations
         xai_method = data.get("xai_method", "lime")  # Default to LIME if not specified
-        xai_data = {}
-        
-        if xai_method.lower() == "lime":
-            try:
-                xai_data = get_lime_explanations(processed_input)
-                print("✅ LIME Explanations:", xai_data)
-            except Exception as e:
-                print(f"Error generating LIME explanations: {e}")
-                xai_data = {"error": f"Failed to generate LIME explanations: {str(e)}"}
-        elif xai_method.lower() == "shap":
-            try:
-                xai_data = get_shap_explanations(processed_input, clf)
-                print("✅ SHAP Explanations:", xai_data)
-            except Exception as e:
-                print(f"Error generating SHAP explanations: {e}")
-                xai_data = {"error": f"Failed to generate SHAP explanations: {str(e)}"}
-        
-        response = {
-            "risk_category": predicted_category,
-            "risk_probability": round(float(predicted_prob), 4),
-            "xai_explanations": xai_data,
-            "xai_method": xai_method
-        }
-        return jsonify(response)
+        return jsonify(cached_importer_request(data, xai_method))
 
     except Exception as e:
         print(f"Error: {e}")
@@ -536,6 +1214,136 @@ def importer_risk():
         traceback.print_exc()
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
+def cached_importer_request(data, xai_method):
+    """
+    score_importer_request through the explanation cache.
+    """
+    options = {"route": "importer-risk", "xai_method": xai_method, "plot_mode": data.get("plot_mode")}
+
+    # The whole response (prediction + explanation) is cached on the normalized input
+    [response] = cached_results(
+        explanation_cache, "importer", [preprocess_importer_data(data)],
+        lambda positions: [score_importer_request(data, xai_method)],
+        options=options, cacheable=lambda result: "error" not in result["xai_explanations"]
+    )
+    return response
+
+def score_importer_request(data, xai_method):
+    """
+    Predict one importer and explain the prediction with the requested XAI method.
+    """
+    # Get predictions
+    predicted_category, predicted_prob, processed_input = predict_importer_risk(data)
+    debug_log.debug("Importer prediction: %s (probability %s)", predicted_category, predicted_prob)
+
+    # Include XAI explanations
+    xai_data = {}
+
+    if xai_method.lower() == "lime":
+        try:
+            xai_data = get_lime_explanations(processed_input)
+            debug_log.debug("LIME explanations: %s", xai_data)
+        except Exception as e:
+            print(f"Error generating LIME explanations: {e}")
+            xai_data = {"error": f"Failed to generate LIME explanations: {str(e)}"}
+    elif xai_method.lower() == "shap":
+        try:
+            xai_data = get_shap_explanations(processed_input, artifacts.get("clf"), plot_mode=data.get("plot_mode"))
+            debug_log.debug("SHAP explanations: %s", xai_data)
+        except Exception as e:
+            print(f"Error generating SHAP explanations: {e}")
+            xai_data = {"error": f"Failed to generate SHAP explanations: {str(e)}"}
+
+    return {
+        "risk_category": predicted_category,
+        "risk_probability": round(float(predicted_prob), 4),
+        "xai_explanations": xai_data,
+        "xai_method": xai_method
+    }
+
+@app.route('/importer-risk/batch', methods=['POST'])
+def importer_risk_batch():
+    """
+    Score a whole shipment manifest (JSON array or CSV upload) in one pass.
+    """
+    try:
+        records = read_importer_batch_request(max_rows=IMPORTER_BATCH_MAX_ROWS)
+    except Exception as e:
+        return jsonify({"error": f"Invalid batch request: {str(e)}"}), 400
+
+    if not records:
+        return jsonify({"error": "No records provided"}), 400
+    if len(records) > IMPORTER_BATCH_MAX_ROWS:
+        return jsonify({"error": f"Batch too large: more than {IMPORTER_BATCH_MAX_ROWS} rows"}), 413
+
+    try:
+        results = predict_importer_risk_batch(records)
+        error_count = sum(1 for result in results if "error" in result)
+
+        return jsonify({
+            "results": results,
+            "count": len(results),
+            "error_count": error_count
+        })
+
+    except Exception as e:
+        print(f"Error in importer risk batch: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+# --------------------- MICRO-BATCHER STATS ---------------------
+
+@app.route('/batcher-stats', methods=['GET'])
+def batcher_stats():
+    """
+    Queue-depth and batch-size statistics for each model's micro-batcher.
+    """
+    return jsonify({batcher.name: batcher.stats() for batcher in model_batchers})
+
+@app.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    """
+    Hit/miss/eviction counters for each result cache and the verified-token cache.
+    """
+    stats = {cache.name: cache.stats() for cache in result_caches}
+    stats["auth_tokens"] = token_verifier.stats()
+    return jsonify(stats)
+
+# --------------------- METRICS ---------------------
+
+# Cache, micro-batcher and token-cache statistics are read at scrape time
+def collect_component_metrics():
+    cache_stats = [(cache.name, cache.stats()) for cache in result_caches]
+    batcher_stats = [(batcher.name, batcher.stats()) for batcher in model_batchers]
+    token_stats = token_verifier.stats()
+    return [
+        ("result_cache_lookups_total", "counter", "Result cache lookups, by cache and outcome.",
+         [({"cache": name, "result": result}, stats[key]) for name, stats in cache_stats
+          for result, key in (("hit", "hits"), ("miss", "misses"))]),
+        ("result_cache_evictions_total", "counter", "Result cache entries evicted to stay within bounds.",
+         [({"cache": name}, stats["evictions"]) for name, stats in cache_stats]),
+        ("result_cache_entries", "gauge", "Entries currently held by each result cache.",
+         [({"cache": name}, stats["entries"]) for name, stats in cache_stats]),
+        ("microbatch_requests_total", "counter", "Prediction requests submitted to each model's micro-batcher.",
+         [({"model": name}, stats["requests"]) for name, stats in batcher_stats]),
+        ("microbatch_batches_total", "counter", "Batches run by each model's micro-batcher.",
+         [({"model": name}, stats["batches"]) for name, stats in batcher_stats]),
+        ("microbatch_queue_depth", "gauge", "Requests waiting in each model's micro-batcher.",
+         [({"model": name}, stats["queue_depth"]) for name, stats in batcher_stats]),
+        ("auth_token_cache_lookups_total", "counter", "Verified-token cache lookups, by outcome.",
+         [({"result": "hit"}, token_stats["hits"]), ({"result": "miss"}, token_stats["misses"])]),
+    ]
+
+metrics.add_collector(collect_component_metrics)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Request, per-stage latency and component metrics in the Prometheus text format.
+    """
+    return Response(metrics.render(), mimetype=None, content_type=MetricsRegistry.CONTENT_TYPE)
+
 # --------------------- ALTERNATIVE XAI ENDPOINTS ---------------------
 
 @app.route('/explain-prediction', methods=['POST'])
@@ -546,12 +1354,24 @@ def explain_prediction():
     data = request.json
     
     try:
-        # Process the input data the same way as in importer-risk
-        _, _, processed_input = predict_importer_risk(data)
-        
-        # Get explanations
-        num_features = data.get("num_features", 5)
-        xai_data = get_lime_explanations(processed_input, num_features=num_features)
+        # A list of inputs (or {"inputs": [...]}) is explained in one batched pass
+        if isinstance(data, list) or isinstance(data.get("inputs"), list):
+            return explain_prediction_batch(data)
+
+        try:
+            options = read_lime_options(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        def explain(positions):
+            # Process the input data the same way as in importer-risk
+            _, _, processed_input = predict_importer_risk(data)
+
+            # Get explanations
+            return [get_lime_explanations(processed_input, **options)]
+
+        [xai_data] = cached_results(explanation_cache, "importer", [preprocess_importer_data(data)], explain,
+                                    options=dict(options, route="explain-prediction"))
         
         return jsonify({
             "lime_explanations": xai_data
@@ -563,6 +1383,44 @@ def explain_prediction():
         traceback.print_exc()
         return jsonify({"error": f"Error generating LIME explanation: {str(e)}"}), 500
 
+def explain_prediction_batch(data):
+    """
+    Explain a list of importer inputs, scoring all LIME perturbations at once.
+    """
+    records = data if isinstance(data, list) else data["inputs"]
+    try:
+        options = read_lime_options(data if isinstance(data, dict) else {})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if len(records) > LIME_MAX_BATCH_ROWS:
+        return jsonify({"error": f"Too many inputs: {len(records)} (max {LIME_MAX_BATCH_ROWS})"}), 413
+
+    results = [None] * len(records)
+    valid_rows = []
+    valid_positions = []
+    for i, record in enumerate(records):
+        errors = validate_importer_record(record)
+        if errors:
+            results[i] = {"error": "; ".join(errors)}
+        else:
+            valid_rows.append(preprocess_importer_data(record))
+            valid_positions.append(i)
+
+    def explain(positions):
+        processed_input = encode_importer_features(pd.DataFrame([valid_rows[i] for i in positions]))
+        return get_lime_explanations_batch(processed_input, **options)
+
+    if valid_rows:
+        explanations = cached_results(explanation_cache, "importer", valid_rows, explain,
+                                      options=dict(options, route="explain-prediction"))
+        for position, explanation in zip(valid_positions, explanations):
+            results[position] = explanation
+
+    return jsonify({
+        "lime_explanations": results
+    })
+
 @app.route('/explain-shap', methods=['POST'])
 def explain_shap():
     """
@@ -571,11 +1429,15 @@ def explain_shap():
     data = request.json
     
     try:
-        # Process the input data the same way as in importer-risk
-        _, _, processed_input = predict_importer_risk(data)
-        
-        # Get SHAP explanations
-        shap_data = get_shap_explanations(processed_input, clf)
+        def explain(positions):
+            # Process the input data the same way as in importer-risk
+            _, _, processed_input = predict_importer_risk(data)
+
+            # Get SHAP explanations
+            return [get_shap_explanations(processed_input, artifacts.get("clf"), plot_mode=data.get("plot_mode"))]
+
+        [shap_data] = cached_results(explanation_cache, "importer", [preprocess_importer_data(data)], explain,
+                                     options={"route": "explain-shap", "plot_mode": data.get("plot_mode")})
         
         return jsonify({
             "shap_explanations": shap_data
@@ -587,67 +1449,135 @@ def explain_shap():
         traceback.print_exc()
         return jsonify({"error": f"Error generating SHAP explanation: {str(e)}"}), 500
 
-# Function to generate a summary SHAP plot for the training data
-def generate_shap_summary_plot(output_path="shap_summary_plot.png"):
+@app.route('/explain-plot/<digest>', methods=['GET'])
+def explain_plot(digest):
+    """
+    Stream a deferred SHAP plot by its content digest.
+    """
+    if not re.fullmatch(r"[0-9a-f]{64}", digest):
+        return jsonify({"error": "Invalid plot id"}), 400
+
+    plot_path = get_shap_plot_path(digest)
+    if os.path.exists(plot_path):
+        return send_file(plot_path, mimetype="image/png", max_age=86400)
+
+    with pending_plots_lock:
+        future = pending_plots.get(digest)
+    if future is not None:
+        return jsonify({"status": "pending"}), 202
+
+    return jsonify({"error": "Plot not found"}), 404
+
+# Helper function to compute the summary job id for the current importer model
+def get_shap_summary_job_id():
+    """
+    Hash the model, the training sample and the SHAP settings into the summary key.
+
+    The key doubles as the job id, so a retrained model or sample gets a new summary
+    while repeated requests for the current one share a single job.
+    """
+    digest = hashlib.sha256()
+    digest.update(get_model_fingerprint(artifacts.get("clf")).encode("utf-8"))
+    digest.update(get_model_fingerprint(artifacts.get("X_train_sample")).encode("utf-8"))
+    digest.update(str(SHAP_BACKGROUND_SIZE).encode("utf-8"))
+    return digest.hexdigest()
+
+# Helper function to start (or join) the SHAP summary job for the current model
+def submit_shap_summary_job():
     """
-    Generate and save a SHAP summary plot for the training data.
-    
-    Args:
-        output_path: Path to save the generated plot
-    
     Returns:
-        True if successful, False otherwise
+        The job status dictionary; status is "done" (with the summary) when a
+        summary for the current model already exists on disk
+    """
+    paths = artifacts.paths("importer")
+    return shap_summary_jobs.submit(get_shap_summary_job_id(), paths["clf"], paths["X_train_sample"], SHAP_BACKGROUND_SIZE)
+
+# Helper function to shape a job status for the API
+def shap_summary_job_response(status):
+    response = dict(status)
+    response["status_url"] = f"/shap-summary/jobs/{status['job_id']}"
+    if status["status"] == "done":
+        response["plot_url"] = f"/shap-summary/jobs/{status['job_id']}/plot"
+    return response
+
+def is_valid_job_id(job_id):
+    return re.fullmatch(r"[0-9a-f]{64}", job_id) is not None
+
+@app.route('/shap-summary/jobs', methods=['POST'])
+def create_shap_summary_job():
+    """
+    Start a SHAP summary job for the current importer model.
+
+    Returns 200 with the summary if one already exists for this model,
+    otherwise 202 with the job id to poll.
     """
     try:
-        # Check if training samples are available
-        if X_train_sample is None or y_train_sample is None:
-            return False
-        
-        # Initialize SHAP explainer
-        explainer = shap.Explainer(clf, X_train_sample)
-        
-        # Compute SHAP values for the sample data
-        shap_values = explainer(X_train_sample)
-        
-        # Set figure size and adjust margins
-        plt.figure(figsize=(12, 8))
-        plt.subplots_adjust(left=0.1, right=0.9, top=0.9, bottom=0.1)
-        
-        # Generate the summary plot
-        shap.summary_plot(shap_values, X_train_sample, show=False)
-        
-        # Adjust layout and save
-        plt.tight_layout(pad=2.0)
-        plt.savefig(output_path, bbox_inches='tight', dpi=150)
-        plt.close()
-        
-        return True
-    
+        if artifacts.get_optional("X_train_sample") is None:
+            return jsonify({"error": "Training sample data not available for SHAP summary"}), 500
+
+        status = submit_shap_summary_job()
+        return jsonify(shap_summary_job_response(status)), 200 if status["status"] == "done" else 202
+
     except Exception as e:
-        print(f"Error generating SHAP summary plot: {e}")
+        print(f"Error starting SHAP summary job: {e}")
         import traceback
         traceback.print_exc()
-        return False
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+@app.route('/shap-summary/jobs/<job_id>', methods=['GET'])
+def get_shap_summary_job(job_id):
+    """
+    Poll a SHAP summary job. Once done, the response carries the per-feature mean |SHAP| table.
+    """
+    if not is_valid_job_id(job_id):
+        return jsonify({"error": "Invalid job id"}), 400
+
+    status = shap_summary_jobs.status(job_id)
+    if status["status"] == "unknown":
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(shap_summary_job_response(status)), 500 if status["status"] == "failed" else 200
+
+@app.route('/shap-summary/jobs/<job_id>/plot', methods=['GET'])
+def get_shap_summary_plot(job_id):
+    """
+    Stream the summary plot of a finished job.
+    """
+    if not is_valid_job_id(job_id):
+        return jsonify({"error": "Invalid job id"}), 400
+
+    if shap_summary_jobs.load_summary(job_id) is None:
+        return jsonify({"error": "Summary not available"}), 404
+    return send_file(shap_summary_jobs.plot_path(job_id), mimetype="image/png", max_age=86400)
 
 @app.route('/generate-shap-summary', methods=['GET'])
 def generate_shap_summary():
     """
     Endpoint to generate a SHAP summary plot for model analysis.
+
+    Served from the summary cache when it already holds the current model's summary;
+    otherwise the summary job is started and 202 is returned with the job to poll.
     """
     try:
-        output_path = os.path.join(IMPORTER_XAI_PATH, "shap_summary_plot.png")
-        success = generate_shap_summary_plot(output_path)
-        
-        if success:
-            return jsonify({
-                "message": "SHAP summary plot generated successfully",
-                "file_path": output_path
-            })
-        else:
+        if artifacts.get_optional("X_train_sample") is None or artifacts.get_optional("y_train_sample") is None:
             return jsonify({
                 "error": "Failed to generate SHAP summary plot"
             }), 500
-        
+
+        status = submit_shap_summary_job()
+        if status["status"] != "done":
+            response = shap_summary_job_response(status)
+            response["message"] = "SHAP summary plot is being generated"
+            return jsonify(response), 202
+
+        output_path = os.path.join(IMPORTER_XAI_PATH, "shap_summary_plot.png")
+        shutil.copyfile(shap_summary_jobs.plot_path(status["job_id"]), output_path)
+        return jsonify({
+            "message": "SHAP summary plot generated successfully",
+            "file_path": output_path,
+            "job_id": status["job_id"],
+            "features": status["summary"]["features"]
+        })
+
     except Exception as e:
         print(f"Error in SHAP summary endpoint: {e}")
         import traceback
@@ -656,53 +1586,95 @@ def generate_shap_summary():
     
 # --------------------- END-USER RISK PREDICTION ---------------------    
 
+# Vectorized encoding for a batch of transactions
+def encode_end_user_batch(end_user_input_data):
+    """
+    Encode a batch of transactions into the feature matrix expected by rf_model.
+
+    Args:
+        end_user_input_data: DataFrame with 'Customer name', 'Issued Qty',
+            'Transaction Date' and 'Product code' columns (other training columns are optional)
+
+    Returns:
+        DataFrame in the model's feature order
+    """
+    # Strip column names
+    end_user_input_data = end_user_input_data.rename(columns=lambda col: col.strip())
+
+    end_user_encoding_tables = artifacts.get("end_user_encoding_tables")
+
+    encoded = pd.DataFrame(index=end_user_input_data.index)
+    for col in get_tree_model("rf_model").feature_names_in_:
+        if col == 'Transaction Date':
+            # Convert Transaction Date to numeric (seconds since epoch, independent of the parsed resolution)
+            dates = pd.to_datetime(end_user_input_data[col], errors='coerce')
+            encoded[col] = dates.astype('datetime64[ns]').astype('int64') / 10**9
+        elif col in end_user_categorical_columns:
+            # Hash lookups against the compiled encoders; unseen categories get the default code 0
+            codes = end_user_input_data[col].map(end_user_encoding_tables[col])
+            unseen = int(codes.isna().sum())
+            if unseen:
+                logger.warning("%d unseen value(s) in '%s'. Assigning default category 0.", unseen, col)
+            encoded[col] = codes.fillna(0).astype(np.int64)
+        elif col in end_user_input_data.columns:
+            encoded[col] = end_user_input_data[col]
+        else:
+            # Ensure all expected columns are present, adding missing ones as 0
+            encoded[col] = 0
+
+    # Fill missing numerical values
+    numerical_present = [col for col in end_user_numerical_columns if col in encoded.columns]
+    encoded[numerical_present] = encoded[numerical_present].fillna(0)
+
+    return encoded
+
+# Batch Prediction Function
+def predict_risk_levels(end_user_input_data):
+    """
+    Predicts the risk level for every transaction in a DataFrame.
+    """
+    with stage("encode"):
+        encoded = encode_end_user_batch(end_user_input_data)
+
+    def score(positions):
+        # Make the prediction (no scaling required)
+        with stage("predict"):
+            return end_user_batcher.submit(encoded.iloc[positions]).tolist()
+
+    # Cache on the encoded feature values
+    payloads = encoded.to_numpy(dtype=np.float64).tolist()
+    return np.array(cached_results(prediction_caches["end_user"], "end_user", payloads, score))
+
 # Prediction Function
 def predict_risk_level(customer_name, issued_qty, transaction_date, product_code):
     """
     Predicts the risk level for a given customer based on provided data.
     """
-    # Create a DataFrame for input data with all columns used during training
     end_user_input_data = pd.DataFrame({
         'Customer name': [customer_name],
         'Issued Qty': [issued_qty],
         'Transaction Date': [transaction_date],
-        'Product code': [product_code],
-        'Invoice No': [0],  
-        'UOM': [0],
-        'Warehouse': [0]
+        'Product code': [product_code]
     })
+    return predict_risk_levels(end_user_input_data)[0]
 
-    # Strip column names
-    end_user_input_data.columns = end_user_input_data.columns.str.strip()
-
-    # Convert Transaction Date to numeric
-    end_user_input_data['Transaction Date'] = pd.to_datetime(end_user_input_data['Transaction Date'], errors='coerce')
-    end_user_input_data['Transaction Date'] = end_user_input_data['Transaction Date'].astype(int) / 10**9
-
-    # Encode categorical variables using trained label encoders
-    for col in end_user_categorical_columns:
-        if col in end_user_input_data.columns:
-            if end_user_input_data[col][0] in label_encoders[col].classes_:
-                end_user_input_data[col] = label_encoders[col].transform(end_user_input_data[col])
-            else:
-                print(f"Warning: Unseen category '{end_user_input_data[col][0]}' in '{col}'. Assigning default category 0.")
-                end_user_input_data[col] = 0  # Assign unseen categories a default value
-
-    # Fill missing numerical values
-    end_user_input_data[end_user_numerical_columns] = end_user_input_data[end_user_numerical_columns].fillna(0)
-
-    # Ensure all expected columns are present, adding missing ones as 0
-    for col in rf_model.feature_names_in_:
-        if col not in end_user_input_data.columns:
-            end_user_input_data[col] = 0  
+# Validate a single transaction from the API (returns a list of errors)
+def validate_end_user_record(record):
+    if not isinstance(record, dict):
+        return ["Row must be an object"]
 
-    # Ensure correct feature order (same as during training)
-    end_user_input_data = end_user_input_data[rf_model.feature_names_in_]
+    values = [record.get('customer_name'), record.get('issued_qty'), record.get('transaction_date'), record.get('product_code')]
+    if not all(values):
+        return ["Missing required fields"]
 
-    # Make the prediction (no scaling required)
-    predicted_risk = rf_model.predict(end_user_input_data)[0]
-
-    return predicted_risk
+    errors = []
+    try:
+        float(record['issued_qty'])
+    except (TypeError, ValueError):
+        errors.append("Invalid issued_qty")
+    if pd.isna(pd.to_datetime(record['transaction_date'], errors='coerce')):
+        errors.append("Invalid transaction_date")
+    return errors
 
 # API Endpoint for Risk Prediction
 @app.route('/predict-risk', methods=['POST'])
@@ -713,7 +1685,7 @@ def predict_risk():
     try:
         # Get JSON data from the request
         data = request.get_json()
-        print("Received data:", data)  
+        debug_log.debug("Received end-user data: %s", data)
 
         # Extract input values
         customer_name = data.get('customer_name')
@@ -727,7 +1699,7 @@ def predict_risk():
 
         # Predict risk level
         predicted_risk = predict_risk_level(customer_name, issued_qty, transaction_date, product_code)
-        print("Predicted risk:", predicted_risk)    
+        debug_log.debug("Predicted end-user risk: %s", predicted_risk)
 
         # Convert numpy.int64 to a standard Python integer
         predicted_risk = int(predicted_risk)
@@ -739,7 +1711,449 @@ def predict_risk():
         print("Error in predict_risk:", str(e))  
         return jsonify({'error': str(e)}), 500    
 
+# API Endpoint for Batch Risk Prediction
+@app.route('/predict-risk/batch', methods=['POST'])
+def predict_risk_batch():
+    """
+    API endpoint to predict risk levels for a JSON array (or {"transactions": [...]}) of transactions.
+    """
+    data = request.get_json(silent=True)
+    records = data.get('transactions') if isinstance(data, dict) else data
+
+    if not isinstance(records, list) or not records:
+        return jsonify({'error': 'Expected a non-empty list of transactions'}), 400
+    if len(records) > END_USER_BATCH_MAX_ROWS:
+        return jsonify({'error': f'Batch too large: {len(records)} rows (max {END_USER_BATCH_MAX_ROWS})'}), 413
+
+    try:
+        results = [None] * len(records)
+        valid_positions = []
+        for i, record in enumerate(records):
+            errors = validate_end_user_record(record)
+            if errors:
+                results[i] = {'index': i, 'error': '; '.join(errors)}
+            else:
+                valid_positions.append(i)
+
+        if valid_positions:
+            valid_records = [records[i] for i in valid_positions]
+            end_user_input_data = pd.DataFrame({
+                'Customer name': [record['customer_name'] for record in valid_records],
+                'Issued Qty': [float(record['issued_qty']) for record in valid_records],
+                'Transaction Date': [record['transaction_date'] for record in valid_records],
+                'Product code': [record['product_code'] for record in valid_records]
+            })
+            predictions = predict_risk_levels(end_user_input_data)
+            for position, predicted_risk in zip(valid_positions, predictions):
+                results[position] = {'index': position, 'predicted_risk': int(predicted_risk)}
+
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'error_count': len(records) - len(valid_positions)
+        }), 200
+
+    except Exception as e:
+        print("Error in predict_risk_batch:", str(e))
+        return jsonify({'error': str(e)}), 500
+
+# Vectorized validation and scoring of one chunk of a transaction file
+def score_end_user_chunk(chunk):
+    """
+    Validate and score a chunk of transactions read by bulk_io.iter_chunks.
+
+    Rows are validated the same way as /predict-risk/batch, but column-wise.
+    Valid rows are scored with rf_model in one call, bypassing the micro-batcher
+    and the result cache (file rows are rarely repeated and would only evict
+    entries that interactive requests reuse).
+
+    Returns:
+        List of {"index", "predicted_risk"} or {"index", "error"} dictionaries in row order
+    """
+    required = ['Customer name', 'Issued Qty', 'Transaction Date', 'Product code']
+    missing_columns = [col for col in required if col not in chunk.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+
+    with stage("preprocess"):
+        fields = chunk[required]
+        missing = (fields.isna() | (fields.astype(str).apply(lambda col: col.str.strip()) == "")).any(axis=1)
+
+        issued_qty = pd.to_numeric(fields['Issued Qty'], errors='coerce')
+        # Parse with the inferred format first and retry the leftovers row by row (mixed formats)
+        dates = pd.to_datetime(fields['Transaction Date'], errors='coerce')
+        retry = dates.isna() & ~missing
+        if retry.any():
+            dates[retry] = pd.to_datetime(fields['Transaction Date'][retry], errors='coerce', format='mixed')
+
+        invalid_qty = issued_qty.isna() & ~missing
+        invalid_date = dates.isna() & ~missing
+        valid = ~(missing | invalid_qty | invalid_date)
+
+    predictions = {}
+    if valid.any():
+        end_user_input_data = pd.DataFrame({
+            'Customer name': fields['Customer name'][valid].astype(str),
+            'Issued Qty': issued_qty[valid].astype(float),
+            'Transaction Date': dates[valid],
+            'Product code': fields['Product code'][valid].astype(str)
+        })
+        with stage("encode"):
+            encoded = encode_end_user_batch(end_user_input_data)
+        with stage("predict"):
+            predicted = get_tree_model("rf_model", len(encoded)).predict(encoded)
+        predictions = dict(zip(encoded.index, predicted.tolist()))
+
+    results = []
+    for index, is_missing, bad_qty, bad_date in zip(chunk.index, missing, invalid_qty, invalid_date):
+        if index in predictions:
+            results.append({'index': int(index), 'predicted_risk': int(predictions[index])})
+        elif is_missing:
+            results.append({'index': int(index), 'error': "Missing required fields"})
+        else:
+            errors = (["Invalid issued_qty"] if bad_qty else []) + (["Invalid transaction_date"] if bad_date else [])
+            results.append({'index': int(index), 'error': '; '.join(errors)})
+    return results
+
+# Score a transaction file chunk by chunk
+def score_end_user_file(source, fmt, chunk_rows=None):
+    """
+    Yield the scored rows of a CSV/NDJSON/Parquet file one chunk (list of results) at a time,
+    followed by a {"summary": ...} entry with row counts and throughput.
+    """
+    start = time.perf_counter()
+    rows = errors = 0
+    for chunk in iter_chunks(source, fmt, chunk_rows or BULK_CHUNK_ROWS):
+        results = score_end_user_chunk(chunk)
+        rows += len(results)
+        errors += sum(1 for result in results if 'error' in result)
+        yield results
+
+    seconds = time.perf_counter() - start
+    yield [{'summary': {
+        'rows': rows,
+        'error_count': errors,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(rows / seconds, 1) if seconds > 0 else None
+    }}]
+
+# API Endpoint for streaming file scoring
+@app.route('/predict-risk/stream', methods=['POST'])
+def predict_risk_stream():
+    """
+    Score a CSV, NDJSON or Parquet file sent as the request body and stream the results as NDJSON.
+
+    The format comes from ?format= or the Content-Type header; ?chunk_rows= overrides
+    BULK_CHUNK_ROWS. One line is written per input row, then a final {"summary": ...} line.
+    """
+    try:
+        fmt = request.args.get('format') or detect_format(content_type=request.content_type)
+        chunk_rows = int(request.args.get('chunk_rows', BULK_CHUNK_ROWS))
+        if chunk_rows <= 0:
+            raise ValueError("chunk_rows must be positive")
+        if fmt not in BULK_FORMATS:
+            raise ValueError(f"Invalid format '{fmt}'. Expected one of: {', '.join(BULK_FORMATS)}")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # The whole file is scored with the models this request started with
+    state = artifacts.capture()
+    if fmt == "parquet":
+        # Parquet readers need a seekable file; spool the body (to disk beyond 16 MB)
+        source = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+        shutil.copyfileobj(request.stream, source)
+        source.seek(0)
+    else:
+        source = request.stream
+
+    def generate():
+        # The body is produced after the request hooks have run, so the route is set again here
+        stage_timer.set_route("predict_risk_stream")
+        try:
+            with artifacts.pinned(state):
+                for results in score_end_user_file(source, fmt, chunk_rows):
+                    with stage("serialize"):
+                        lines = to_ndjson(results)
+                    yield lines
+        except Exception as e:
+            # Headers are already sent, so the failure is reported in-band
+            print("Error in predict_risk_stream:", str(e))
+            yield to_ndjson([{'error': str(e)}])
+        finally:
+            stage_timer.clear_route()
+            if source is not request.stream:
+                source.close()
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={"X-Model-Version": model_version_header(["end_user"])})
+
+# --------------------- UNIFIED RISK PROFILE ---------------------
+
+# The four model pipelines of a risk profile run concurrently on this pool
+RISK_PROFILE_WORKERS = int(os.getenv("RISK_PROFILE_WORKERS", 8))
+# Sections still running after this many seconds are reported as timed out
+RISK_PROFILE_TIMEOUT_SECONDS = float(os.getenv("RISK_PROFILE_TIMEOUT_SECONDS", 30))
+profile_executor = ThreadPoolExecutor(max_workers=RISK_PROFILE_WORKERS, thread_name_prefix="risk-profile")
+
+def profile_importer(section):
+    """
+    Importer risk for the profile; explained only when the section asks for an xai_method.
+    """
+    errors = validate_importer_record(section)
+    if errors:
+        raise ValueError("; ".join(errors))
+    if section.get("xai_method"):
+        return cached_importer_request(section, section["xai_method"])
+    result = predict_importer_risk_batch([section])[0]
+    if "error" in result:
+        raise ValueError(result["error"])
+    return {"risk_category": result["risk_category"], "risk_probability": result["risk_probability"]}
+
+def profile_future(section):
+    if not isinstance(section, dict) or not section:
+        raise ValueError("Expected an object of future trend fields")
+    return {"predicted_risk": predict_future_risks(section)[0]}
+
+def profile_recipe(section):
+    chemicals = section.get("chemicals") if isinstance(section, dict) else None
+    if not chemicals or not all(isinstance(chem, dict) and "name" in chem and "quantity" in chem for chem in chemicals):
+        raise ValueError("No chemicals provided")
+    return format_recipe_result(predict_recipe_risk(build_recipe_frame([chemicals])).iloc[0])
+
+def profile_end_user(section):
+    errors = validate_end_user_record(section)
+    if errors:
+        raise ValueError("; ".join(errors))
+    predicted_risk = predict_risk_level(section['customer_name'], float(section['issued_qty']),
+                                        section['transaction_date'], section['product_code'])
+    return {"predicted_risk": int(predicted_risk)}
+
+# Payload section -> pipeline
+risk_profile_sections = {
+    "importer": profile_importer,
+    "future": profile_future,
+    "recipe": profile_recipe,
+    "end_user": profile_end_user,
+}
+
+def run_profile_section(pipeline, section, submitted_at, state):
+    """
+    Run one section on a pool thread, with the model versions of the request (state), and time it.
+
+    Returns:
+        (status, result or error message, latency breakdown in ms)
+    """
+    started_at = time.perf_counter()
+    stage_timer.set_route("risk_profile")
+    try:
+        with artifacts.pinned(state):
+            status, value = "ok", pipeline(section)
+    except ValueError as e:
+        status, value = "invalid", str(e)
+    except Exception as e:
+        print(f"Error in risk profile section {pipeline.__name__}: {e}")
+        status, value = "error", str(e)
+    finally:
+        stages = stage_timer.durations()
+        stage_timer.clear_route()
+    finished_at = time.perf_counter()
+    return status, value, {
+        "queued_ms": round((started_at - submitted_at) * 1000, 2),
+        "compute_ms": round((finished_at - started_at) * 1000, 2),
+        "stages_ms": {name: round(seconds * 1000, 2) for name, seconds in stages.items()},
+    }
+
+@app.route('/risk-profile', methods=['POST'])
+def risk_profile():
+    """
+    Importer, future trend, recipe and end-user risk of one consignment in a single call.
+
+    The payload holds any of the sections "importer" (as for /importer-risk, optionally
+    with "xai_method"), "future" (as for /predict), "recipe" ({"chemicals": [...]}) and
+    "end_user" (as for /predict-risk). The sections run concurrently; each comes back
+    with its own status ("ok", "invalid", "error" or "timeout") and latency, so one
+    failing model does not hold back the others.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+
+    sections = {name: data[name] for name in risk_profile_sections if data.get(name) is not None}
+    if not sections:
+        return jsonify({"error": f"Expected at least one of: {', '.join(risk_profile_sections)}"}), 400
+
+    start = time.perf_counter()
+    state = artifacts.capture()
+    futures = {
+        name: profile_executor.submit(run_profile_section, risk_profile_sections[name], section, time.perf_counter(), state)
+        for name, section in sections.items()
+    }
+
+    # One deadline for the whole profile: sections run in parallel, so waiting on each in turn is fine
+    deadline = start + RISK_PROFILE_TIMEOUT_SECONDS
+    response = {}
+    for name, future in futures.items():
+        try:
+            status, value, latency = future.result(timeout=max(deadline - time.perf_counter(), 0))
+        except FutureTimeoutError:
+            status, value = "timeout", f"No result within {RISK_PROFILE_TIMEOUT_SECONDS:g} s"
+            latency = {"total_ms": round((time.perf_counter() - start) * 1000, 2)}
+        else:
+            latency["total_ms"] = round(latency["queued_ms"] + latency["compute_ms"], 2)
+
+        # Section names are the model family names
+        entry = {"status": status, "model_version": artifacts.version(name), "latency_ms": latency}
+        entry["result" if status == "ok" else "error"] = value
+        response[name] = entry
+
+    return jsonify({
+        "profile": response,
+        "error_count": sum(1 for entry in response.values() if entry["status"] != "ok"),
+        "latency_ms": round((time.perf_counter() - start) * 1000, 2)
+    })
+
+# --------------------- MODEL RELEASES ---------------------
+
+# Families with a release in the model registry (see model_registry.py) serve its CURRENT version.
+# Every worker polls CURRENT every MODEL_REGISTRY_POLL_SECONDS (0 = only on POST /models/<family>/activate);
+# a new release is loaded and warmed up in the background, then swapped in without a restart.
+MODEL_REGISTRY_POLL_SECONDS = float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", 5))
+MODEL_RELEASE_WAIT_SECONDS = float(os.getenv("MODEL_RELEASE_WAIT_SECONDS", 300))
+# POST /models/<family>/activate needs "Authorization: Bearer <MODEL_ADMIN_TOKEN>" whatever AUTH_REQUIRED
+# is (user tokens from /login are not enough); without MODEL_ADMIN_TOKEN the route is disabled
+MODEL_ADMIN_TOKEN = os.getenv("MODEL_ADMIN_TOKEN", "")
+model_registry = ModelRegistry(MODEL_REGISTRY_PATH, verify_checksums=artifact_loader.verify_checksums)
+release_watcher = ReleaseWatcher(model_registry, artifacts, poll_seconds=MODEL_REGISTRY_POLL_SECONDS)
+release_watcher.activate_current()
+
+def warm_release(family):
+    """
+    Build the explainers of a release being staged, if the current ones are in use.
+    """
+    if family == "importer" and (WARMUP_ON_START or shap_explainers):
+        import_xai_module("shap")
+        warm_shap_explainers()
+
+def release_replaced_models(family):
+    """
+    Drop explainers and fingerprints of models that are no longer served (called after a swap).
+    """
+    if family != "importer":
+        return
+    live = {id(artifacts.get(name)) for name in artifacts.names(family) if artifacts.is_loaded(name)}
+    for cache in (shap_explainers, model_fingerprints):
+        for key in [key for key in list(cache) if key not in live]:
+            cache.pop(key, None)
+
+artifacts.on_stage(warm_release)
+artifacts.on_reload(release_replaced_models)
+
+def model_version_header(families):
+    return ",".join(f"{family}={artifacts.version(family)}" for family in sorted(families) if family is not None)
+
+@app.before_request
+def pin_model_versions():
+    # Every lookup of the request sees the same model versions, even if a release is swapped in meanwhile
+    release_watcher.ensure_started()
+    artifacts.pin()
+
+@app.after_request
+def add_model_version_header(response):
+    families = artifacts.used_families()
+    if families and "X-Model-Version" not in response.headers:
+        response.headers["X-Model-Version"] = model_version_header(families)
+    return response
+
+@app.teardown_request
+def unpin_model_versions(exc):
+    artifacts.unpin()
+
+@app.route('/models', methods=['GET'])
+def list_model_releases():
+    """
+    Active, current and published versions of every model family.
+    """
+    return jsonify(release_watcher.status())
+
+def is_model_admin():
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(token.strip().encode("utf-8"), MODEL_ADMIN_TOKEN.encode("utf-8"))
+
+@app.route('/models/<family>/activate', methods=['POST'])
+def activate_model_release(family):
+    """
+    Stage a published release in this worker and point the family's CURRENT at it
+    once it has been loaded, checked against its manifest and swapped in (the other
+    workers pick it up on their next poll). A release that fails is never written
+    to CURRENT. With ?wait=1 the response is sent once the release serves traffic
+    here; otherwise staging continues in the background.
+    """
+    if not MODEL_ADMIN_TOKEN:
+        return jsonify({"error": "Activating releases over HTTP is disabled (MODEL_ADMIN_TOKEN is not set)"}), 403
+    if not is_model_admin():
+        return jsonify({"error": "Model admin token required"}), 401
+    if family not in artifacts.families():
+        return jsonify({"error": f"Unknown model family '{family}'"}), 404
+    data = request.get_json(silent=True) or {}
+    version = data.get("version")
+    if not isinstance(version, str) or not version:
+        return jsonify({"error": "Expected a release 'version'"}), 400
+
+    try:
+        model_registry.manifest(family, version)
+    except ReleaseError as e:
+        return jsonify({"error": str(e)}), 404
+
+    future = release_watcher.stage(family, version, promote=True)
+    if request.args.get("wait", "0").lower() not in ("1", "true", "yes"):
+        return jsonify({"family": family, "version": version, "status": "staging"}), 202
+    try:
+        future.result(timeout=MODEL_RELEASE_WAIT_SECONDS)
+    except FutureTimeoutError:
+        return jsonify({"family": family, "version": version, "status": "staging"}), 202
+    except Exception as e:
+        return jsonify({"family": family, "version": version, "status": "failed", "error": str(e)}), 409
+    return jsonify({"family": family, "version": version, "status": "active"})
+
+# --------------------- WARM-UP AND STARTUP REPORT ---------------------
+
+# Load every artifact and build the explainers before serving (otherwise they load on first use)
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "0") == "1"
+
+def warm_up():
+    """
+    Load all registered artifacts, import the XAI libraries and build the explainers.
+    """
+    failures = artifacts.warm_up()
+    for name in ("shap", "matplotlib.pyplot"):
+        import_xai_module(name)
+    warm_shap_explainers()
+    print(f"✅ Warm-up complete ({len(artifacts.names()) - len(failures)} artifacts loaded, {len(failures)} failed)")
+    return failures
+
+# Spawned helper processes (SHAP summary jobs) re-import the entry point; they load what they need themselves
+if WARMUP_ON_START and multiprocessing.parent_process() is None:
+    warm_up()
+
+startup_seconds = time.perf_counter() - startup_began
+print(f"✅ Backend ready in {startup_seconds * 1000:.0f} ms "
+      f"(imports {artifacts.report()['total_import_ms']:.0f} ms, warm-up {'on' if WARMUP_ON_START else 'off'})")
+
+@app.route('/startup-report', methods=['GET'])
+def startup_report():
+    """
+    Breakdown of import time and per-artifact load time.
+    """
+    report = artifacts.report()
+    report["startup_ms"] = round(startup_seconds * 1000, 2)
+    report["warmup_on_start"] = WARMUP_ON_START
+    for entry in report["artifacts"].values():
+        if entry["path"] in artifact_loader.sources:
+            entry["source"] = artifact_loader.sources[entry["path"]]
+    return jsonify(report)
+
 # --------------------- RUN FLASK APP ---------------------
 if __name__ == '__main__':
+    ensure_user_indexes_once()
     app.run(host="0.0.0.0", port=5000, debug=True)
     
\ No newline at end of file
@@ -0,0 +1,352 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import joblib
+
+
+class ArtifactLoadError(RuntimeError):
+    """Raised when an artifact (or a component built from artifacts) cannot be loaded."""
+
+
+class RegistryState:
+    """
+    One consistent view of the registry: the loaded entries, the active release
+    of each family (versioned artifact paths) and the swap generations.
+
+    A state only ever gains lazily loaded entries; a new release creates a new
+    state, so a request pinned to a state keeps seeing the same model versions
+    while another version is swapped in.
+    """
+
+    def __init__(self, values=None, errors=None, releases=None, generations=None):
+        self.values = values if values is not None else {}
+        self.errors = errors if errors is not None else {}
+        self.releases = releases if releases is not None else {}
+        self.generations = generations if generations is not None else {}
+        self.versions = {}
+        # Entries are loaded under the lock of their own state, so staging a release does not block live traffic
+        self.lock = threading.RLock()
+
+    def without(self, names, family):
+        """
+        Copy of the state with the given entries dropped and the family generation bumped.
+        """
+        generations = dict(self.generations)
+        generations[family] = generations.get(family, 0) + 1
+        return RegistryState(
+            values={name: value for name, value in self.values.items() if name not in names},
+            errors={name: error for name, error in self.errors.items() if name not in names},
+            releases=dict(self.releases),
+            generations=generations,
+        )
+
+
+class ArtifactRegistry:
+    """
+    Registry of model artifacts and derived components, loaded on first use.
+
+    Each entry is either a file loaded with joblib or a component built by a
+    factory function (which may itself pull other entries from the registry).
+    Load times are recorded for the startup report, and load failures are
+    remembered so a broken artifact is not re-read on every request.
+
+    Lookups resolve against the current RegistryState, or against the state
+    pinned to the thread (see pin/pinned), so every lookup of a request sees
+    the same versions even if activate_release swaps in a new one meanwhile.
+    """
+
+    def __init__(self, default_loader=None):
+        self.default_loader = default_loader or joblib.load
+        self._specs = {}
+        self._state = RegistryState()
+        self._load_seconds = {}
+        self._import_seconds = {}
+        self._reload_listeners = []
+        self._stage_listeners = []
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self.created_at = time.perf_counter()
+
+    def register(self, name, path=None, loader=None, family=None):
+        """
+        Register an artifact file (loaded with the registry's default_loader) or a component factory.
+
+        Args:
+            name: Registry key
+            path: Artifact file path (optional for factory-built components)
+            loader: Callable taking the path (for files, defaults to the registry's
+                default_loader) or no arguments (for components)
+            family: Model family the entry belongs to (e.g. "importer")
+        """
+        if path is None and loader is None:
+            raise ValueError(f"Artifact '{name}' needs a path or a loader")
+        self._specs[name] = {"path": path, "loader": loader, "family": family}
+
+    def names(self, family=None):
+        return [name for name, spec in self._specs.items() if family is None or spec["family"] == family]
+
+    def family(self, name):
+        return self._specs[name]["family"]
+
+    def families(self):
+        return sorted({spec["family"] for spec in self._specs.values() if spec["family"] is not None})
+
+    def _path(self, name, state):
+        spec = self._specs[name]
+        release = state.releases.get(spec["family"])
+        if release is not None and name in release["paths"]:
+            return release["paths"][name]
+        return spec["path"]
+
+    def paths(self, family=None, default=False):
+        """
+        File-backed entries as {name: path}: the files of the active release, or
+        the registered paths if there is none (or default is set).
+        """
+        state = self.current()
+        return {name: spec["path"] if default else self._path(name, state) for name, spec in self._specs.items()
+                if spec["path"] is not None and (family is None or spec["family"] == family)}
+
+    # ---------------------- thread pinning ----------------------
+
+    def current(self):
+        """
+        The state lookups on this thread resolve against (the pinned one, else the latest).
+        """
+        return getattr(self._local, "state", None) or self._state
+
+    def capture(self):
+        """
+        Token for the state of the current thread, to be passed to pinned() on another thread.
+        """
+        return self.current()
+
+    def pin(self):
+        """
+        Pin the latest state to the current thread (e.g. for the duration of a request).
+        """
+        self._local.state = self._state
+        self._local.used = set()
+
+    def unpin(self):
+        self._local.state = None
+        self._local.used = None
+
+    @contextmanager
+    def pinned(self, state):
+        """
+        Resolve lookups on the current thread against a captured state inside the block.
+        """
+        previous = getattr(self._local, "state", None), getattr(self._local, "used", None)
+        self._local.state = state
+        self._local.used = set()
+        try:
+            yield
+        finally:
+            self._local.state, self._local.used = previous
+
+    def used_families(self):
+        """
+        Families looked up on the current thread since its state was pinned.
+        """
+        return set(getattr(self._local, "used", None) or ())
+
+    # ---------------------- lookups ----------------------
+
+    def get(self, name):
+        """
+        Return a loaded entry, loading it on first use.
+
+        Raises:
+            ArtifactLoadError: If the entry cannot be loaded
+        """
+        state = self.current()
+        used = getattr(self._local, "used", None)
+        if used is not None:
+            used.add(self._specs[name]["family"])
+
+        try:
+            return state.values[name]
+        except KeyError:
+            pass
+
+        with state.lock:
+            if name in state.values:
+                return state.values[name]
+            if name in state.errors:
+                raise ArtifactLoadError(state.errors[name])
+
+            spec = self._specs[name]
+            path = self._path(name, state)
+            start = time.perf_counter()
+            try:
+                if path is None:
+                    value = spec["loader"]()
+                else:
+                    value = (spec["loader"] or self.default_loader)(path)
+            except Exception as e:
+                state.errors[name] = f"Error loading '{name}': {e}"
+                print(f"❌ {state.errors[name]}")
+                raise ArtifactLoadError(state.errors[name]) from e
+
+            self._load_seconds[name] = time.perf_counter() - start
+            state.values[name] = value
+            return value
+
+    def get_optional(self, name):
+        """
+        Return a loaded entry, or None if it cannot be loaded.
+        """
+        try:
+            return self.get(name)
+        except ArtifactLoadError:
+            return None
+
+    def is_loaded(self, name):
+        return name in self.current().values
+
+    def warm_up(self, names=None):
+        """
+        Load every registered entry (or the given names) up front.
+
+        Returns:
+            Dictionary of entry name -> error message for entries that failed
+        """
+        failures = {}
+        for name in names or list(self._specs):
+            try:
+                self.get(name)
+            except ArtifactLoadError as e:
+                failures[name] = str(e)
+        return failures
+
+    # ---------------------- versions and releases ----------------------
+
+    def version(self, family):
+        """
+        Version string for a model family: the version of the active release, or else
+        the swap generation plus a digest of the family's artifact files (path,
+        size, mtime), computed once per generation. Counts as a use of the family
+        (see used_families).
+        """
+        state = self.current()
+        used = getattr(self._local, "used", None)
+        if used is not None:
+            used.add(family)
+        version = state.versions.get(family)
+        if version is None:
+            release = state.releases.get(family)
+            if release is not None:
+                version = release["version"]
+            else:
+                signature = []
+                for name, path in sorted(self.paths(family).items()):
+                    stat = os.stat(path) if os.path.exists(path) else None
+                    signature.append((name, path, stat.st_size if stat else None, stat.st_mtime_ns if stat else None))
+                digest = hashlib.sha256(repr(signature).encode("utf-8")).hexdigest()[:12]
+                version = f"{state.generations.get(family, 0)}-{digest}"
+            state.versions[family] = version
+        return version
+
+    def release(self, family):
+        """
+        The active release of a family ({"version", "paths", "manifest"}), or None.
+        """
+        return self.current().releases.get(family)
+
+    def on_reload(self, callback):
+        """
+        Register callback(family) to be called after a new release of a family is swapped in.
+        """
+        self._reload_listeners.append(callback)
+
+    def on_stage(self, callback):
+        """
+        Register callback(family) to warm up a new release before it is swapped in
+        (called on the loading thread with the new state pinned).
+        """
+        self._stage_listeners.append(callback)
+
+    def _swap(self, family, staged):
+        """
+        Make the family's entries and release from the staged state live and bump its generation.
+
+        Everything else is taken from the live state at swap time, so a release of
+        another family swapped in while this one was being staged is kept.
+        """
+        names = set(self.names(family))
+        with self._lock:
+            live = self._state
+            generations = dict(live.generations)
+            generations[family] = generations.get(family, 0) + 1
+            releases = dict(live.releases)
+            releases[family] = staged.releases.get(family)
+            state = RegistryState(
+                values={name: value for name, value in live.values.items() if name not in names},
+                errors={name: error for name, error in live.errors.items() if name not in names},
+                releases={key: value for key, value in releases.items() if value is not None},
+                generations=generations,
+            )
+            state.values.update((name, value) for name, value in staged.values.items() if name in names)
+            state.errors.update((name, error) for name, error in staged.errors.items() if name in names)
+            self._state = state
+
+        for callback in self._reload_listeners:
+            callback(family)
+
+    def activate_release(self, family, release, preload=True):
+        """
+        Make a release of a family ({"version", "paths", "manifest"}) the active one.
+
+        With preload, every entry of the family is loaded and the stage callbacks
+        run on the calling thread before the swap, so no request waits for the new
+        version; requests already running finish on the state they pinned.
+
+        Raises:
+            ArtifactLoadError: If an entry of the release cannot be loaded (the
+                previous release stays active)
+        """
+        with self._lock:
+            state = self._state.without(set(self.names(family)), family)
+        state.releases[family] = release
+
+        if preload:
+            with self.pinned(state):
+                for name in self.names(family):
+                    self.get(name)
+                for callback in self._stage_listeners:
+                    callback(family)
+
+        self._swap(family, state)
+
+    def record_import(self, module_name, seconds):
+        """
+        Record how long importing a library took (for the startup report).
+        """
+        self._import_seconds[module_name] = seconds
+
+    def report(self):
+        """
+        Startup-time report: import time per library group and load time per artifact.
+        """
+        state = self.current()
+        artifacts = {}
+        for name, spec in self._specs.items():
+            path = self._path(name, state)
+            artifacts[name] = {
+                "family": spec["family"],
+                "path": path,
+                "size_bytes": os.path.getsize(path) if path and os.path.exists(path) else None,
+                "loaded": name in state.values,
+                "load_ms": round(self._load_seconds[name] * 1000, 2) if name in self._load_seconds else None,
+                "error": state.errors.get(name),
+            }
+        return {
+            "imports_ms": {name: round(seconds * 1000, 2) for name, seconds in self._import_seconds.items()},
+            "artifacts": artifacts,
+            "total_import_ms": round(sum(self._import_seconds.values()) * 1000, 2),
+            "total_load_ms": round(sum(self._load_seconds.values()) * 1000, 2),
+        }
@@ -0,0 +1,86 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+
+
+class TokenVerifier:
+    """
+    Verifies JWTs with jwt.decode and remembers the verified claims.
+
+    Entries are keyed by the SHA-256 digest of the token (raw tokens are not
+    kept) and live until the token's own exp claim, in a bounded LRU. A cached
+    token therefore costs one hash and one dictionary lookup instead of a
+    signature check, and never outlives its expiry.
+    """
+
+    def __init__(self, secret, algorithms=("HS256",), max_entries=10000):
+        self.secret = secret
+        self.algorithms = list(algorithms)
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._rejected = 0
+        self._evictions = 0
+
+    def verify(self, token):
+        """
+        Return the claims of a valid token.
+
+        Raises:
+            jwt.ExpiredSignatureError: If the token has expired
+            jwt.InvalidTokenError: If the token is malformed or its signature does not verify
+        """
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                expires_at, claims = entry
+                if expires_at > now:
+                    self._entries.move_to_end(digest)
+                    self._hits += 1
+                    return claims
+                del self._entries[digest]
+            self._misses += 1
+
+        try:
+            claims = jwt.decode(token, self.secret, algorithms=self.algorithms)
+        except jwt.InvalidTokenError:
+            with self._lock:
+                self._rejected += 1
+            raise
+
+        # Tokens without an exp claim are verified every time rather than cached forever
+        expires_at = claims.get("exp")
+        if isinstance(expires_at, (int, float)) and self.max_entries > 0:
+            with self._lock:
+                self._entries[digest] = (float(expires_at), claims)
+                self._entries.move_to_end(digest)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+        return claims
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "rejected": self._rejected,
+                "evictions": self._evictions,
+            }
@@ -0,0 +1,107 @@
+"""
+Load test for the auth path against the in-memory MongoDB stand-in.
+
+Signs up --users accounts, then runs concurrent logins while other threads
+send /predict-risk requests, and reports login throughput and prediction
+latency. Compare pool sizes by setting AUTH_WORKERS (and BCRYPT_ROUNDS)
+in the environment, e.g.:
+
+    AUTH_WORKERS=1 python benchmarks/bench_auth.py
+    AUTH_WORKERS=4 python benchmarks/bench_auth.py
+
+Usage:
+    python benchmarks/bench_auth.py [--users 50] [--login-threads 8] [--predict-threads 4] [--seconds 10]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+os.environ.setdefault("MONGO_URI", "memory://?latency_ms=1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+
+TRANSACTION = {"customer_name": "Ansell Lanka", "issued_qty": "100", "transaction_date": "2024-05-01", "product_code": "Acetone"}
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000) if samples else float("nan")
+
+
+def run_load(client, users, login_threads, predict_threads, seconds):
+    stop = threading.Event()
+    lock = threading.Lock()
+    login_latencies, predict_latencies, statuses = [], [], {}
+
+    def login_loop(worker):
+        i = worker
+        while not stop.is_set():
+            email = f"user{i % users}@example.com"
+            start = time.perf_counter()
+            response = client.post("/login", json={"email": email, "password": "correct horse"})
+            with lock:
+                login_latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            i += login_threads
+
+    def predict_loop(worker):
+        qty = worker
+        while not stop.is_set():
+            # Vary the quantity so the result cache does not answer every request
+            qty += 1
+            start = time.perf_counter()
+            client.post("/predict-risk", json=dict(TRANSACTION, issued_qty=str(qty)))
+            with lock:
+                predict_latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=login_threads + predict_threads) as pool:
+        futures = [pool.submit(login_loop, i) for i in range(login_threads)]
+        futures += [pool.submit(predict_loop, i * 1000000) for i in range(predict_threads)]
+        time.sleep(seconds)
+        stop.set()
+        for future in futures:
+            future.result()
+
+    return login_latencies, predict_latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--login-threads", type=int, default=8)
+    parser.add_argument("--predict-threads", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    app.ensure_user_indexes()
+    client = app.app.test_client()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.login_threads) as pool:
+        statuses = list(pool.map(
+            lambda i: client.post("/signup", json={"name": f"User {i}", "email": f"user{i}@example.com",
+                                                   "password": "correct horse"}).status_code,
+            range(args.users)
+        ))
+    print(f"Signed up {statuses.count(201)}/{args.users} users in {time.perf_counter() - start:.2f} s")
+    duplicate = client.post("/signup", json={"name": "Dup", "email": "user0@example.com", "password": "x"})
+    print(f"Duplicate signup -> {duplicate.status_code}")
+
+    # Prediction latency on its own, then under login load
+    _, baseline, _ = run_load(client, args.users, 0, args.predict_threads, min(args.seconds, 3.0))
+    logins, predictions, statuses = run_load(client, args.users, args.login_threads, args.predict_threads, args.seconds)
+
+    print(f"AUTH_WORKERS={app.AUTH_WORKERS} AUTH_MAX_PENDING={app.AUTH_MAX_PENDING} BCRYPT_ROUNDS={app.BCRYPT_ROUNDS} "
+          f"MONGO_URI={app.MONGO_URI}")
+    print(f"logins: {len(logins) / args.seconds:.1f}/s, p50 {percentile_ms(logins, 50):.1f} ms, "
+          f"p99 {percentile_ms(logins, 99):.1f} ms, statuses {statuses}")
+    print(f"/predict-risk alone:      p50 {percentile_ms(baseline, 50):.1f} ms, p99 {percentile_ms(baseline, 99):.1f} ms")
+    print(f"/predict-risk with logins: p50 {percentile_ms(predictions, 50):.1f} ms, p99 {percentile_ms(predictions, 99):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
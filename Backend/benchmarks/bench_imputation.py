@@ -0,0 +1,112 @@
+"""
+Scaling benchmark for the chunked imputers against sklearn's KNNImputer and IterativeImputer.
+
+Synthetic import statistics (label-encoded MONTH/COUNTRY/HSCODE, YEAR,
+QUANTITY, VALUE_RS) get a share of their values removed; a held-out set of
+the removed values, whose true value is known, measures the mean absolute
+error of each method next to its run time.
+
+KNNImputer is quadratic in the number of rows, so it is only run up to
+--max-knn-baseline-rows rows (IterativeImputer runs at every size).
+
+Usage:
+    python benchmarks/bench_imputation.py [--rows 10000 100000 1000000] [--missing 0.05] [--seed 0]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.experimental import enable_iterative_imputer  # noqa: F401
+from sklearn.impute import IterativeImputer, KNNImputer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from imputation import ChunkedIterativeImputer, ChunkedKNNImputer  # noqa: E402
+
+KNN_FEATURES = ["MONTH", "COUNTRY", "HSCODE", "QUANTITY"]
+ITERATIVE_COLUMNS = ["YEAR", "MONTH", "QUANTITY", "VALUE_RS"]
+
+
+def make_import_statistics(rows, rng):
+    country = rng.integers(0, 40, rows)
+    hscode = rng.integers(0, 25, rows)
+    month = rng.integers(0, 12, rows)
+    # Seasonal, country- and product-dependent quantities; value follows quantity
+    quantity = np.exp(6 + 0.04 * country + 0.08 * hscode + 0.3 * np.sin(month / 12 * 2 * np.pi) + rng.normal(0, 0.4, rows))
+    value = quantity * np.exp(5 + 0.05 * hscode + rng.normal(0, 0.2, rows))
+    year = 2019 + (month + rng.integers(0, 60, rows)) // 12
+    return pd.DataFrame({"YEAR": year, "MONTH": month, "COUNTRY": country, "HSCODE": hscode,
+                         "QUANTITY": quantity, "VALUE_RS": value}).astype(np.float64)
+
+
+def remove_values(data, columns, share, rng):
+    """
+    Blank out a share of each column; returns the data and {column: (positions, true values)}.
+    """
+    data = data.copy()
+    removed = {}
+    for col in columns:
+        positions = np.flatnonzero(rng.random(len(data)) < share)
+        removed[col] = (positions, data[col].to_numpy()[positions].copy())
+        data.iloc[positions, data.columns.get_loc(col)] = np.nan
+    return data, removed
+
+
+def mean_abs_error(imputed, removed, col):
+    positions, truth = removed[col]
+    return float(np.abs(imputed[col].to_numpy()[positions] - truth).mean())
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--missing", type=float, default=0.05, help="Share of values removed per column")
+    parser.add_argument("--max-knn-baseline-rows", type=int, default=100_000)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'rows':>9}  {'method':<32}{'seconds':>10}{'MAE':>14}")
+    for rows in args.rows:
+        rng = np.random.default_rng(args.seed)
+        complete = make_import_statistics(rows, rng)
+
+        # MONTH by k-nearest neighbours over the other label-encoded columns and QUANTITY
+        data, removed = remove_values(complete, ["MONTH"], args.missing, rng)
+        results = []
+        if rows <= args.max_knn_baseline_rows:
+            imputed, seconds = timed(lambda: pd.DataFrame(KNNImputer(n_neighbors=5).fit_transform(data[KNN_FEATURES]),
+                                                          columns=KNN_FEATURES))
+            results.append(("KNNImputer", seconds, mean_abs_error(imputed, removed, "MONTH")))
+        else:
+            results.append(("KNNImputer", None, None))
+        imputer = ChunkedKNNImputer(["MONTH"], feature_columns=KNN_FEATURES, n_jobs=args.n_jobs)
+        imputed, seconds = timed(lambda: imputer.fit_transform(data))
+        results.append(("ChunkedKNNImputer", seconds, mean_abs_error(imputed, removed, "MONTH")))
+
+        # YEAR, MONTH, QUANTITY and VALUE_RS modelled together
+        data, removed = remove_values(complete, ["YEAR", "QUANTITY"], args.missing, rng)
+        imputed, seconds = timed(lambda: pd.DataFrame(IterativeImputer(random_state=42).fit_transform(data[ITERATIVE_COLUMNS]),
+                                                      columns=ITERATIVE_COLUMNS))
+        results.append(("IterativeImputer (YEAR)", seconds, mean_abs_error(imputed, removed, "YEAR")))
+        imputer = ChunkedIterativeImputer(ITERATIVE_COLUMNS, random_state=42, n_jobs=args.n_jobs)
+        imputed, seconds = timed(lambda: imputer.fit_transform(data))
+        results.append(("ChunkedIterativeImputer (YEAR)", seconds, mean_abs_error(imputed, removed, "YEAR")))
+
+        for method, seconds, error in results:
+            if seconds is None:
+                print(f"{rows:>9}  {method:<32}{'skipped':>10}{'':>14}")
+            else:
+                print(f"{rows:>9}  {method:<32}{seconds:>10.2f}{error:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
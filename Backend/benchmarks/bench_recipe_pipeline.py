@@ -0,0 +1,113 @@
+"""
+Equivalence check and micro-benchmark for the recipe preprocessing and risk banding stages.
+
+Compares the vectorized preprocess_new_recipe / determine_risk_levels
+(recipe_pipeline.py) against the original row-wise implementations over
+synthetic recipes. tests/test_recipe_pipeline.py runs the same comparison on a
+fixed, seeded sample under pytest.
+
+Usage:
+    python benchmarks/bench_recipe_pipeline.py [--rows 100000] [--seed 0]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recipe_pipeline import determine_risk_levels, preprocess_new_recipe  # noqa: E402
+
+CHEMICALS = ["Acetone", "Hydrogen peroxide", "Nitric acid", "Sulphuric acid", "Glycerol",
+             "Ammonium Nitrate", "Potassium chlorate", "Sodium hydroxide", "Chlorine", "Ethanol"]
+QUANTITY_FORMATS = ["{}", "{}g", " {} mL", "{} g/mL ", "~{}", "{}kg"]
+SCORE_EDGES = [0.0, 30.5, 31.0, 70.0, 70.5, 71.0, 90.0, 90.5, 100.0, np.nan]
+
+
+# --------------------- ORIGINAL ROW-WISE IMPLEMENTATIONS ---------------------
+
+def legacy_preprocess_new_recipe(new_recipe_raw):
+    def combine_chemicals(chemicals, quantities):
+        combined = [f"{chem.strip()}:{re.sub(r'[^0-9.]+', '', qty)}"
+                    for chem, qty in zip(chemicals.split("+"), quantities.split("+"))]
+        return " + ".join(combined)
+
+    new_recipe_raw["Combined Recipe"] = new_recipe_raw.apply(
+        lambda row: combine_chemicals(row["Chemical Names"], row["Quantities (g/mL)"]), axis=1
+    )
+    return new_recipe_raw
+
+
+def legacy_determine_risk_level(row):
+    if any([row["Explosiveness (1-10)"] > 90, row["Health Risk Score (0-100)"] > 90, row["Risk Score (0-100)"] > 90]):
+        return "Very High Risk"
+    elif any([71 <= row["Explosiveness (1-10)"] <= 90, 71 <= row["Health Risk Score (0-100)"] <= 90, 71 <= row["Risk Score (0-100)"] <= 90]):
+        return "High Risk"
+    elif any([31 <= row["Explosiveness (1-10)"] <= 70, 31 <= row["Health Risk Score (0-100)"] <= 70, 31 <= row["Risk Score (0-100)"] <= 70]):
+        return "Medium Risk"
+    else:
+        return "Low Risk"
+
+
+# --------------------- SYNTHETIC DATA ---------------------
+
+def make_recipes(rows, rng):
+    names, quantities = [], []
+    for _ in range(rows):
+        n_chem = rng.integers(1, 6)
+        # Occasionally mismatch the number of quantities to exercise zip truncation
+        n_qty = max(1, n_chem + rng.integers(-1, 2)) if rng.random() < 0.1 else n_chem
+        chem = rng.choice(CHEMICALS, size=n_chem)
+        qty = [QUANTITY_FORMATS[rng.integers(len(QUANTITY_FORMATS))].format(round(rng.uniform(0, 500), 2))
+               for _ in range(n_qty)]
+        names.append(" + ".join(chem))
+        quantities.append(" + ".join(qty))
+    return pd.DataFrame({"Chemical Names": names, "Quantities (g/mL)": quantities})
+
+
+def make_scores(rows, rng):
+    scores = rng.uniform(0, 100, size=(rows, 3))
+    # Put a share of the scores exactly on or around the band edges
+    edge_mask = rng.random(size=scores.shape) < 0.2
+    scores[edge_mask] = rng.choice(SCORE_EDGES, size=edge_mask.sum())
+    return pd.DataFrame(scores, columns=["Explosiveness (1-10)", "Health Risk Score (0-100)", "Risk Score (0-100)"])
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    recipes = make_recipes(args.rows, rng)
+    scores = make_scores(args.rows, rng)
+
+    legacy_recipes, legacy_prep_s = timed(legacy_preprocess_new_recipe, recipes.copy())
+    new_recipes, new_prep_s = timed(preprocess_new_recipe, recipes.copy())
+    assert legacy_recipes["Combined Recipe"].tolist() == new_recipes["Combined Recipe"].tolist(), \
+        "preprocess_new_recipe differs from the row-wise implementation"
+
+    legacy_levels, legacy_band_s = timed(lambda df: df.apply(legacy_determine_risk_level, axis=1), scores)
+    new_levels, new_band_s = timed(determine_risk_levels, scores)
+    assert legacy_levels.tolist() == new_levels.tolist(), \
+        "determine_risk_levels differs from the row-wise implementation"
+
+    print(f"{args.rows} synthetic recipes: results identical")
+    print(f"{'stage':<24}{'row-wise (s)':>14}{'vectorized (s)':>16}{'speedup':>10}")
+    for stage, old_s, new_s in [("preprocess_new_recipe", legacy_prep_s, new_prep_s),
+                                ("risk level banding", legacy_band_s, new_band_s)]:
+        print(f"{stage:<24}{old_s:>14.3f}{new_s:>16.3f}{old_s / new_s:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
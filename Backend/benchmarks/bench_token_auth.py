@@ -0,0 +1,86 @@
+"""
+Overhead of the JWT auth middleware on prediction calls.
+
+Reports:
+  - jwt.decode on every call vs the verified-token cache (per-call cost)
+  - end-to-end /predict-risk latency with AUTH_REQUIRED off, and on with a cached token
+
+The same comparison runs in the benchmark suite (run_suite.py: endpoints
+predict-risk[auth-off]/[auth-on], micro-benchmarks verify_token[...]), so it
+can be diffed between commits; this script is the quick standalone version.
+
+Usage:
+    python benchmarks/bench_token_auth.py [--calls 20000] [--requests 500]
+"""
+import argparse
+import os
+import sys
+import time
+
+import jwt
+import numpy as np
+
+os.environ.setdefault("MONGO_URI", "memory://")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+from auth_tokens import TokenVerifier  # noqa: E402
+
+TRANSACTION = {"customer_name": "Ansell Lanka", "issued_qty": "100", "transaction_date": "2024-05-01", "product_code": "Acetone"}
+
+
+def per_call_us(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def request_latencies(client, n_requests, headers):
+    latencies = []
+    for _ in range(n_requests):
+        start = time.perf_counter()
+        response = client.post("/predict-risk", json=TRANSACTION, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.get_json()
+    return np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    secret = app.app.config["SECRET_KEY"]
+    token = app.generate_token("bench@example.com")
+
+    decode_us = per_call_us(lambda: jwt.decode(token, secret, algorithms=["HS256"]), args.calls)
+    verifier = TokenVerifier(secret)
+    verifier.verify(token)
+    cached_us = per_call_us(lambda: verifier.verify(token), args.calls)
+    print(f"jwt.decode per call:      {decode_us:8.2f} us")
+    print(f"cached verify per call:   {cached_us:8.2f} us ({decode_us / cached_us:.1f}x faster)")
+
+    client = app.app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    # Warm the models and the result cache so the comparison isolates the middleware
+    request_latencies(client, 20, headers)
+
+    original = app.AUTH_REQUIRED
+    try:
+        app.AUTH_REQUIRED = False
+        off = request_latencies(client, args.requests, headers)
+        app.AUTH_REQUIRED = True
+        assert client.post("/predict-risk", json=TRANSACTION).status_code == 401
+        on = request_latencies(client, args.requests, headers)
+    finally:
+        app.AUTH_REQUIRED = original
+
+    print(f"/predict-risk auth off:   p50 {np.percentile(off, 50):.3f} ms, mean {off.mean():.3f} ms")
+    print(f"/predict-risk auth on:    p50 {np.percentile(on, 50):.3f} ms, mean {on.mean():.3f} ms")
+    print(f"middleware overhead:      {(np.median(on) - np.median(off)) * 1000:+.1f} us at p50")
+    print(f"token cache: {app.token_verifier.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Seeded synthetic request payloads for the benchmark suite.
+
+Categorical values are drawn from the loaded artifacts (encoder categories,
+label encoder classes, trained column names), so the payloads stay valid when
+the models are retrained; numerical values follow the ranges of the training
+data. End-user transactions come from synthetic_transactions, the same
+generator used for the retraining data and bulk scoring files.
+"""
+import numpy as np
+
+from synthetic_transactions import TransactionDistribution, TransactionGenerator
+
+RECIPE_CHEMICALS = ["Acetone", "Hydrogen peroxide", "Nitric acid", "Sulfuric acid", "Glycerin", "Ammonium nitrate",
+                    "Potassium permanganate", "Sodium hydroxide", "Chlorine", "Ethanol", "Acetic acid", "Sulfur",
+                    "Charcoal", "Magnesium", "Barium nitrate", "Hydrochloric acid", "Sodium cyanide", "Table salt"]
+RECIPE_UNITS = ["g", "mL", " g", " mL", ""]
+RISK_CATEGORIES = ["Low", "Medium", "High"]
+
+
+class PayloadFactory:
+    """
+    Builds request bodies for the importer, future trend, recipe and end-user routes.
+    """
+
+    def __init__(self, backend, seed=0):
+        self.rng = np.random.default_rng(seed)
+
+        encoder = backend.artifacts.get("encoder")
+        self.importer_categories = {col: [str(value) for value in categories]
+                                    for col, categories in zip(backend.categorical_cols, encoder.categories_)}
+
+        trained_columns = list(backend.artifacts.get("trained_columns"))
+        self.future_categories = {}
+        for col in backend.future_categorical_cols:
+            values = [name[len(col) + 1:] for name in trained_columns if name.startswith(f"{col}_")]
+            self.future_categories[col] = values or self.importer_categories.get(col, RISK_CATEGORIES)
+
+        distribution = TransactionDistribution.from_label_encoders(backend.artifacts.get("label_encoders"))
+        self.transactions = TransactionGenerator(distribution, seed=seed)
+        self._end_users = []
+        self._end_user_batches = 0
+
+    def choice(self, values):
+        return values[self.rng.integers(len(values))]
+
+    def importer(self):
+        return {
+            "hsCode": str(self.rng.integers(280100, 284800)),
+            "chemicalName": self.choice(self.importer_categories["Chemical_Name"]),
+            "countryOfOrigin": self.choice(self.importer_categories["Country_of_Origin"]),
+            "importationDescription": self.choice(self.importer_categories["Importation_Description"]),
+            "complianceHistory": self.choice(self.importer_categories["Compliance_History"]),
+            "financialStability": self.choice(self.importer_categories["Financial_Stability"]),
+            "importFrequency": str(self.rng.integers(1, 150)),
+            "importVolume": str(round(float(self.rng.lognormal(9.5, 1.2)), 1)),
+            "pastViolations": str(self.rng.integers(0, 6)),
+        }
+
+    def future(self):
+        row = {col: self.choice(values) for col, values in self.future_categories.items()}
+        row.update({
+            "Import_Frequency": int(self.rng.integers(1, 150)),
+            "Import_Quantity (kg)": round(float(self.rng.lognormal(10.5, 1.3)), 1),
+            "Compliance_Score": int(self.rng.integers(1, 4)),
+            "Past_Violations": int(self.rng.integers(0, 6)),
+            "Import_Trend": round(float(self.rng.normal(0, 50)), 2),
+        })
+        return row
+
+    def recipe(self):
+        count = int(self.rng.integers(1, 6))
+        names = self.rng.choice(RECIPE_CHEMICALS, size=count, replace=False)
+        return {"chemicals": [{"name": str(name), "quantity": f"{int(self.rng.integers(1, 100))}{self.choice(RECIPE_UNITS)}"}
+                              for name in names]}
+
+    def end_user(self):
+        if not self._end_users:
+            self._end_users = self.transactions.records(1024, index=self._end_user_batches)[::-1]
+            self._end_user_batches += 1
+        return self._end_users.pop()
+
+    def end_user_chunk(self, rows, index=0):
+        """
+        Transactions as a stock report DataFrame, as read from a bulk scoring file.
+        """
+        return self.transactions.chunk(index, rows)
@@ -0,0 +1,358 @@
+"""
+Benchmark and load-test suite for the Flask backend.
+
+Boots app.py with the real artifacts and an in-memory MongoDB stand-in
+(MONGO_URI=memory://), drives each endpoint with seeded synthetic payloads at
+several concurrency levels through the Flask test client (in process: no
+network or WSGI server overhead), and times the main pipeline functions on
+their own. /predict-risk is also run with the auth middleware off and on
+(AUTH_REQUIRED, with a cached bearer token), next to cached and uncached
+token verification, so the middleware overhead is part of every run. Results
+(p50/p95/p99 latency, throughput, errors, RSS) are written as JSON so runs on
+two commits can be compared. Result caches are disabled
+unless --with-cache is given, so repeated payloads measure the models rather
+than the cache.
+
+Usage:
+    python benchmarks/run_suite.py run [--concurrency 1,4,16] [--seconds 5] [--scenarios analyze,predict]
+                                       [--output results.json] [--seed 0] [--with-cache] [--skip-auth]
+    python benchmarks/run_suite.py compare BASE.json NEW.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+BACKEND_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+RESULTS_FORMAT = 1
+
+# Scenario -> (route, payload builder taking a PayloadFactory)
+SCENARIOS = {
+    "importer-risk-lime": ("/importer-risk", lambda f: dict(f.importer(), xai_method="lime")),
+    "importer-risk-shap": ("/importer-risk", lambda f: dict(f.importer(), xai_method="shap", plot_mode="none")),
+    "explain-prediction": ("/explain-prediction", lambda f: f.importer()),
+    "explain-shap": ("/explain-shap", lambda f: dict(f.importer(), plot_mode="inline")),
+    "analyze": ("/analyze", lambda f: f.recipe()),
+    "predict": ("/predict", lambda f: f.future()),
+    "predict-risk": ("/predict-risk", lambda f: f.end_user()),
+}
+
+# Route run with the auth middleware off and on
+AUTH_SCENARIO = "predict-risk"
+
+
+def rss_mb():
+    """
+    Current and peak resident set size of this process in MB (None where /proc is unavailable).
+    """
+    try:
+        with open("/proc/self/status") as f:
+            fields = {line.split(":")[0]: int(line.split()[1]) for line in f if line.startswith(("VmRSS", "VmHWM"))}
+    except OSError:
+        return None, None
+    return round(fields["VmRSS"] / 1024, 1), round(fields["VmHWM"] / 1024, 1)
+
+
+def latency_stats(latencies):
+    if not latencies:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None}
+    samples = np.array(latencies) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p95_ms": round(float(np.percentile(samples, 95)), 3),
+        "p99_ms": round(float(np.percentile(samples, 99)), 3),
+        "mean_ms": round(float(samples.mean()), 3),
+    }
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_PATH,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_PATH,
+                               capture_output=True, text=True, check=True).stdout.strip() != ""
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def run_load(client, route, payloads, concurrency, seconds, headers=None):
+    """
+    Send payloads (cycling) from `concurrency` threads for `seconds` and collect the latencies.
+    """
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies, statuses = [], {}
+
+    def worker(offset):
+        i = offset
+        while not stop.is_set():
+            start = time.perf_counter()
+            response = client.post(route, json=payloads[i % len(payloads)], headers=headers)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            i += concurrency
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        futures = [pool.submit(worker, i) for i in range(concurrency)]
+        time.sleep(seconds)
+        stop.set()
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start
+
+    result = latency_stats(latencies)
+    result.update({
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    })
+    result["rss_mb"], result["peak_rss_mb"] = rss_mb()
+    return result
+
+
+def run_micro(fn, inputs, seconds, max_iterations):
+    """
+    Call fn on each input in turn (cycling) for up to `seconds` or `max_iterations` calls.
+    """
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while len(latencies) < max_iterations and (not latencies or time.perf_counter() < deadline):
+        args = inputs[len(latencies) % len(inputs)]
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - start)
+
+    result = latency_stats(latencies)
+    result.update({"calls": len(latencies), "min_ms": round(min(latencies) * 1000, 3)})
+    return result
+
+
+def micro_benchmarks(backend, factory, args):
+    """
+    Per-function timings of the request pipelines, without Flask in the way.
+    """
+    import pandas as pd
+
+    importer_payloads = [factory.importer() for _ in range(args.pool)]
+    end_user_payloads = [factory.end_user() for _ in range(args.pool)]
+    processed_inputs = [
+        backend.encode_importer_features(pd.DataFrame([backend.preprocess_importer_data(payload)]))
+        for payload in importer_payloads[:50]
+    ]
+    end_user_chunks = [factory.end_user_chunk(1000, index) for index in range(5)]
+    clf = backend.artifacts.get("clf")
+
+    from auth_tokens import TokenVerifier
+
+    tokens = [(backend.generate_token(f"bench-{i}@example.com"),) for i in range(50)]
+    # max_entries=0 caches nothing, so every call checks the signature
+    uncached_verifier = TokenVerifier(backend.app.config["SECRET_KEY"], max_entries=0)
+    cached_verifier = TokenVerifier(backend.app.config["SECRET_KEY"])
+    for (token,) in tokens:
+        cached_verifier.verify(token)
+
+    cases = {
+        "preprocess_importer_data": (backend.preprocess_importer_data, [(payload,) for payload in importer_payloads]),
+        "verify_token[uncached]": (uncached_verifier.verify, tokens),
+        "verify_token[cached]": (cached_verifier.verify, tokens),
+        "predict_risk_level": (backend.predict_risk_level, [
+            (p["customer_name"], float(p["issued_qty"]), p["transaction_date"], p["product_code"]) for p in end_user_payloads
+        ]),
+        "score_end_user_chunk[1000]": (backend.score_end_user_chunk, [(chunk,) for chunk in end_user_chunks]),
+        "get_lime_explanations": (backend.get_lime_explanations, [(processed,) for processed in processed_inputs]),
+        "get_shap_explanations[none]": (
+            lambda processed: backend.get_shap_explanations(processed, clf, plot_mode="none"),
+            [(processed,) for processed in processed_inputs]
+        ),
+        "get_shap_explanations[inline]": (
+            lambda processed: backend.get_shap_explanations(processed, clf, plot_mode="inline"),
+            [(processed,) for processed in processed_inputs]
+        ),
+    }
+
+    results = {}
+    for name, (fn, inputs) in cases.items():
+        fn(*inputs[0])  # warm-up
+        results[name] = run_micro(fn, inputs, args.micro_seconds, args.micro_iterations)
+        print(f"  {name:32s} p50 {results[name]['p50_ms']:9.3f} ms  p95 {results[name]['p95_ms']:9.3f} ms "
+              f"({results[name]['calls']} calls)")
+    return results
+
+
+def auth_scenarios(backend, client, factory, levels, args):
+    """
+    The AUTH_SCENARIO route with AUTH_REQUIRED off and on, sending the same bearer token
+    (cached after the first call) either way, as endpoints "<scenario>[auth-off]" and "[auth-on]".
+    """
+    route, build = SCENARIOS[AUTH_SCENARIO]
+    payloads = [build(factory) for _ in range(args.pool)]
+    headers = {"Authorization": f"Bearer {backend.generate_token('bench@example.com')}"}
+    client.post(route, json=payloads[0], headers=headers)
+
+    endpoints = {}
+    original = backend.AUTH_REQUIRED
+    try:
+        for mode, required in (("auth-off", False), ("auth-on", True)):
+            backend.AUTH_REQUIRED = required
+            name = f"{AUTH_SCENARIO}[{mode}]"
+            endpoints[name] = {"route": route, "auth_required": required, "levels": {}}
+            for concurrency in levels:
+                result = run_load(client, route, payloads, concurrency, args.seconds, headers=headers)
+                endpoints[name]["levels"][str(concurrency)] = result
+                print(f"{name:20s} c={concurrency:<3d} {result['throughput_rps']:9.1f} req/s  p50 {result['p50_ms']:9.2f} ms  "
+                      f"p95 {result['p95_ms']:9.2f} ms  p99 {result['p99_ms']:9.2f} ms  errors {result['errors']}")
+    finally:
+        backend.AUTH_REQUIRED = original
+    endpoints[f"{AUTH_SCENARIO}[auth-on]"]["token_cache"] = backend.token_verifier.stats()
+    return endpoints
+
+
+def run_suite(args):
+    # The environment must be set before app.py is imported
+    os.environ["MONGO_URI"] = args.mongo_uri
+    if not args.with_cache:
+        os.environ["RESULT_CACHE_ENABLED"] = "0"
+    sys.path.insert(0, BACKEND_PATH)
+    import app as backend
+    from payloads import PayloadFactory
+
+    scenarios = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s): {', '.join(unknown)}. Available: {', '.join(SCENARIOS)}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    warm_up_started = time.perf_counter()
+    backend.warm_up()
+    warm_up_seconds = time.perf_counter() - warm_up_started
+    client = backend.app.test_client()
+    factory = PayloadFactory(backend, seed=args.seed)
+
+    endpoints = {}
+    for name in scenarios:
+        route, build = SCENARIOS[name]
+        payloads = [build(factory) for _ in range(args.pool)]
+        client.post(route, json=payloads[0])  # first-call costs (lazy imports, explainers) stay out of the numbers
+        endpoints[name] = {"route": route, "levels": {}}
+        for concurrency in levels:
+            result = run_load(client, route, payloads, concurrency, args.seconds)
+            endpoints[name]["levels"][str(concurrency)] = result
+            print(f"{name:20s} c={concurrency:<3d} {result['throughput_rps']:9.1f} req/s  p50 {result['p50_ms']:9.2f} ms  "
+                  f"p95 {result['p95_ms']:9.2f} ms  p99 {result['p99_ms']:9.2f} ms  errors {result['errors']}")
+
+    if not args.skip_auth:
+        endpoints.update(auth_scenarios(backend, client, factory, levels, args))
+
+    print("Micro-benchmarks:")
+    micro = micro_benchmarks(backend, factory, args) if not args.skip_micro else {}
+
+    commit, dirty = git_revision()
+    rss, peak_rss = rss_mb()
+    report = {
+        "format": RESULTS_FORMAT,
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "seconds_per_level": args.seconds,
+            "payload_pool": args.pool,
+            "result_cache": args.with_cache,
+            "auth_required": backend.AUTH_REQUIRED,
+            "mongo_uri": args.mongo_uri,
+            "tree_engine": backend.TREE_ENGINE,
+            "warm_up_ms": round(warm_up_seconds * 1000, 1),
+            "rss_mb": rss,
+            "peak_rss_mb": peak_rss,
+        },
+        "endpoints": endpoints,
+        "micro": micro,
+    }
+
+    output = args.output or os.path.join(RESULTS_PATH, f"suite-{commit or 'unknown'}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"✅ Results written to {output}")
+
+
+def percent_change(base, new):
+    if base in (None, 0) or new is None:
+        return "n/a"
+    return f"{(new - base) / base * 100:+.1f}%"
+
+
+def compare(base_path, new_path):
+    """
+    Print p50/p95 latency and throughput changes between two result files.
+    """
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    print(f"base {base['meta']['commit']} -> new {new['meta']['commit']}")
+    for name, entry in new["endpoints"].items():
+        for level, result in entry["levels"].items():
+            before = base["endpoints"].get(name, {}).get("levels", {}).get(level)
+            if before is None:
+                continue
+            print(f"{name:20s} c={level:<3s} p50 {percent_change(before['p50_ms'], result['p50_ms']):>8s}  "
+                  f"p95 {percent_change(before['p95_ms'], result['p95_ms']):>8s}  "
+                  f"throughput {percent_change(before['throughput_rps'], result['throughput_rps']):>8s}")
+    for name, result in new["micro"].items():
+        before = base["micro"].get(name)
+        if before is not None:
+            print(f"{name:32s} p50 {percent_change(before['p50_ms'], result['p50_ms']):>8s}  "
+                  f"p95 {percent_change(before['p95_ms'], result['p95_ms']):>8s}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the suite and write a results file")
+    run_parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    run_parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each concurrency level")
+    run_parser.add_argument("--scenarios", help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    run_parser.add_argument("--pool", type=int, default=500, help="Distinct payloads generated per scenario")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--micro-seconds", type=float, default=3.0, help="Time budget per micro-benchmark")
+    run_parser.add_argument("--micro-iterations", type=int, default=1000, help="Call limit per micro-benchmark")
+    run_parser.add_argument("--skip-micro", action="store_true")
+    run_parser.add_argument("--with-cache", action="store_true", help="Keep the result caches enabled")
+    run_parser.add_argument("--skip-auth", action="store_true", help="Skip the auth middleware off/on runs")
+    run_parser.add_argument("--mongo-uri", default="memory://", help="MongoDB URI (default: in-memory stand-in)")
+    run_parser.add_argument("--output", help="Results file (default: benchmarks/results/suite-<commit>.json)")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two results files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run_suite(args)
+    else:
+        compare(args.base, args.new)
+
+
+if __name__ == "__main__":
+    main()
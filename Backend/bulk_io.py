@@ -0,0 +1,114 @@
+"""
+Chunked readers for bulk transaction files and an NDJSON writer.
+
+Files are read in fixed-size chunks (CSV and NDJSON through pandas'
+chunksize readers, Parquet through pyarrow record batches), so memory use is
+bounded by the chunk size rather than by the file size. Column names may be
+either the stock report headers ('Customer name', 'Issued Qty', ...) or the
+API field names (customer_name, issued_qty, ...).
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+FORMATS = ("csv", "ndjson", "parquet")
+
+EXTENSION_FORMATS = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+}
+
+CONTENT_TYPE_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+}
+
+# API field name -> stock report column
+END_USER_COLUMNS = {
+    "customer_name": "Customer name",
+    "issued_qty": "Issued Qty",
+    "transaction_date": "Transaction Date",
+    "product_code": "Product code",
+}
+
+
+def detect_format(path=None, content_type=None):
+    """
+    Infer the input format from a file extension or a Content-Type header.
+
+    Raises:
+        ValueError: If the format cannot be determined
+    """
+    if path is not None:
+        fmt = EXTENSION_FORMATS.get(os.path.splitext(path)[1].lower())
+        if fmt is not None:
+            return fmt
+    if content_type is not None:
+        fmt = CONTENT_TYPE_FORMATS.get(content_type.split(";")[0].strip().lower())
+        if fmt is not None:
+            return fmt
+    raise ValueError(f"Cannot determine the input format; expected one of: {', '.join(FORMATS)}")
+
+
+def normalize_end_user_columns(frame):
+    """
+    Rename API field names to the stock report headers (report headers are kept as they are).
+    """
+    frame = frame.rename(columns=lambda col: str(col).strip())
+    return frame.rename(columns={key: col for key, col in END_USER_COLUMNS.items() if col not in frame.columns})
+
+
+def iter_parquet_chunks(source, chunk_rows):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ValueError("Parquet input requires pyarrow (pip install pyarrow)") from e
+
+    parquet_file = pq.ParquetFile(source)
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+        yield batch.to_pandas()
+
+
+def iter_chunks(source, fmt, chunk_rows=5000):
+    """
+    Yield DataFrames of at most chunk_rows rows from a path or binary file object.
+
+    Every column is read as text except in Parquet files, which carry their own
+    types; values are parsed when the chunk is scored. Row positions continue
+    across chunks (the index of each chunk is its row numbers in the file).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Invalid format '{fmt}'. Expected one of: {', '.join(FORMATS)}")
+
+    if fmt == "csv":
+        chunks = pd.read_csv(source, chunksize=chunk_rows, dtype=str, keep_default_na=False, na_values=[""])
+    elif fmt == "ndjson":
+        chunks = pd.read_json(source, lines=True, chunksize=chunk_rows, dtype=False, convert_dates=False)
+    else:
+        chunks = iter_parquet_chunks(source, chunk_rows)
+
+    offset = 0
+    for chunk in chunks:
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield normalize_end_user_columns(chunk)
+
+
+def to_ndjson(records):
+    """
+    Serialize an iterable of dictionaries as NDJSON text (one object per line).
+    """
+    def default(obj):
+        if isinstance(obj, np.generic):
+            return obj.item()
+        return str(obj)
+
+    return "".join(json.dumps(record, default=default) + "\n" for record in records)
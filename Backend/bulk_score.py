@@ -0,0 +1,61 @@
+"""
+Score a transaction file with the end-user risk model and write the results as NDJSON.
+
+The input (CSV, NDJSON or Parquet, e.g. the TCC sheet of the stock report
+exported to CSV) is read in chunks of --chunk-rows rows, so memory stays
+constant however large the file is. Each output line is
+{"index": <row>, "predicted_risk": <level>} or {"index": <row>, "error": ...};
+a final {"summary": ...} line carries the row counts and throughput, which
+is also reported on stderr.
+
+Usage:
+    python bulk_score.py transactions.csv [--output scores.ndjson] [--format csv] [--chunk-rows 5000]
+"""
+import argparse
+import contextlib
+import sys
+import time
+
+from process_stats import peak_memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="Transaction file (.csv, .ndjson/.jsonl or .parquet)")
+    parser.add_argument("--output", help="NDJSON output file (default: stdout)")
+    parser.add_argument("--format", choices=("csv", "ndjson", "parquet"), help="Input format (default: from the extension)")
+    parser.add_argument("--chunk-rows", type=int, default=None, help="Rows per chunk (default: BULK_CHUNK_ROWS)")
+    args = parser.parse_args()
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    summary = None
+    try:
+        # Keep stdout for the results: the backend's own messages go to stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            import app
+            from bulk_io import detect_format, to_ndjson
+
+            fmt = args.format or detect_format(path=args.input)
+            start = time.perf_counter()
+            rows = 0
+            for results in app.score_end_user_file(args.input, fmt, args.chunk_rows):
+                output.write(to_ndjson(results))
+                if "summary" in results[0]:
+                    summary = results[0]["summary"]
+                else:
+                    rows += len(results)
+                    elapsed = time.perf_counter() - start
+                    print(f"\r{rows} rows scored ({rows / elapsed:.0f} rows/s)", end="", file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if summary is None:
+        print("\n❌ Scoring stopped before the summary line", file=sys.stderr)
+        sys.exit(1)
+    print(f"\n✅ Scored {summary['rows']} rows ({summary['error_count']} errors) in {summary['seconds']:.2f} s: "
+          f"{summary['rows_per_second']} rows/s{peak_memory()}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
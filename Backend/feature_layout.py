@@ -0,0 +1,71 @@
+import numpy as np
+
+
+class OneHotFeatureLayout:
+    """
+    Precompiled feature layout for models trained on pd.get_dummies output.
+
+    Built once from the trained column list. It maps every categorical value
+    straight to its output column index and writes scaled numericals and one-hot
+    flags into a single preallocated matrix, reproducing
+    get_dummies -> scale -> add missing columns -> reorder without building
+    intermediate DataFrames.
+    """
+
+    def __init__(self, trained_columns, categorical_cols, numerical_cols, scaler=None, prefix_sep="_"):
+        self.trained_columns = list(trained_columns)
+        self.categorical_cols = list(categorical_cols)
+        self.numerical_cols = list(numerical_cols)
+        self.scaler = scaler
+        self.width = len(self.trained_columns)
+
+        column_index = {col: i for i, col in enumerate(self.trained_columns)}
+        self.column_index = column_index
+
+        # Categorical value -> output column index, one table per categorical column
+        self.category_index = {}
+        for col in self.categorical_cols:
+            prefix = f"{col}{prefix_sep}"
+            self.category_index[col] = {
+                name[len(prefix):]: i for name, i in column_index.items() if name.startswith(prefix)
+            }
+
+        # Output positions of the scaled numerical columns (-1 when a column is not used by the model)
+        self.numerical_index = np.array([column_index.get(col, -1) for col in self.numerical_cols])
+
+    def transform(self, input_df):
+        """
+        Build the model input matrix for a batch of raw rows.
+
+        Args:
+            input_df: DataFrame with the raw categorical and numerical columns
+
+        Returns:
+            2D float array with one row per input row, in trained column order
+        """
+        n_rows = len(input_df)
+        output = np.zeros((n_rows, self.width), dtype=np.float64)
+
+        # Scaled numericals
+        numerical = input_df[self.numerical_cols]
+        if self.scaler is not None:
+            numerical = self.scaler.transform(numerical)
+        numerical = np.asarray(numerical, dtype=np.float64)
+        used = self.numerical_index >= 0
+        output[:, self.numerical_index[used]] = numerical[:, used]
+
+        # One-hot flags: look each value up directly (unknown values and NaN set no flag)
+        rows = np.arange(n_rows)
+        for col, value_index in self.category_index.items():
+            values = input_df[col]
+            indices = values.astype(str).map(value_index).where(values.notna())
+            found = indices.notna().to_numpy()
+            output[rows[found], indices[found].to_numpy(dtype=np.int64)] = 1.0
+
+        # Any other input column the model was trained on is passed through unchanged
+        handled = set(self.categorical_cols) | set(self.numerical_cols)
+        for col in input_df.columns:
+            if col not in handled and col in self.column_index:
+                output[:, self.column_index[col]] = np.asarray(input_df[col], dtype=np.float64)
+
+        return output
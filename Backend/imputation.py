@@ -0,0 +1,214 @@
+"""
+Chunked imputation for the import statistics (replaces the whole-column
+KNNImputer / IterativeImputer passes of the preprocessing notebooks).
+
+KNNImputer compares every row with a missing value against every other row,
+which is quadratic, and IterativeImputer refits its estimators over the full
+table in every round. Both stop fitting in time and memory as the yearly data
+grows. The imputers here fit on a bounded sample and then impute in chunks:
+
+- ChunkedKNNImputer indexes up to max_reference_rows complete rows in a KD-tree
+  (exact k-nearest neighbours within that reference sample, approximate with
+  respect to the full table) and queries it one chunk of rows at a time.
+- ChunkedIterativeImputer fits sklearn's IterativeImputer on up to
+  max_fit_rows rows and applies the fitted estimators chunk by chunk.
+
+Chunks are imputed on a thread pool (n_jobs); KD-tree queries and the NumPy
+work of the fitted estimators release the GIL. Fitted imputers are plain
+picklable objects: ImputationStage.save/load persist them with joblib, and
+the import statistics pipeline (import_statistics.py, imputation_path=...)
+applies a saved stage to new data as its last step.
+"""
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.experimental import enable_iterative_imputer  # noqa: F401
+from sklearn.impute import IterativeImputer
+from sklearn.neighbors import KDTree
+
+
+def iter_chunks(n_rows, chunk_rows):
+    return [slice(start, min(start + chunk_rows, n_rows)) for start in range(0, n_rows, chunk_rows)]
+
+
+def sample_rows(n_rows, max_rows, rng):
+    """
+    Sorted positions of at most max_rows rows, drawn without replacement.
+    """
+    if n_rows <= max_rows:
+        return np.arange(n_rows)
+    return np.sort(rng.choice(n_rows, size=max_rows, replace=False))
+
+
+class ChunkedKNNImputer:
+    """
+    Fills missing values of the given columns with the mean of the target value
+    of the n_neighbors nearest rows, measured on standardized feature_columns
+    (as KNNImputer with uniform weights, or weights="distance").
+
+    Missing feature values of a query row are replaced by the feature mean.
+    A column with no other feature column to compare on (e.g. MONTH imputed
+    from itself alone, as in the notebook) is filled with its mean, which is
+    also what KNNImputer does in that case.
+
+    Args:
+        columns: Columns to impute
+        feature_columns: Numerical columns the distance is measured on
+        n_neighbors: Number of neighbours averaged
+        weights: "uniform" or "distance"
+        max_reference_rows: Upper bound on the rows indexed per column (all rows if fewer)
+        chunk_rows: Rows queried per chunk
+        n_jobs: Threads imputing chunks in parallel (-1 = one per core)
+        random_state: Seed of the reference sample
+    """
+
+    def __init__(self, columns, feature_columns=(), n_neighbors=5, weights="uniform", max_reference_rows=200_000,
+                 chunk_rows=20_000, n_jobs=-1, random_state=0):
+        if weights not in ("uniform", "distance"):
+            raise ValueError("weights must be 'uniform' or 'distance'")
+        self.columns = list(columns)
+        self.feature_columns = list(feature_columns)
+        self.n_neighbors = n_neighbors
+        self.weights = weights
+        self.max_reference_rows = max_reference_rows
+        self.chunk_rows = chunk_rows
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+    def _features(self, data, features):
+        values = data[features].to_numpy(dtype=np.float64, copy=True)
+        values = (values - self.means_[features].to_numpy()) / self.scales_[features].to_numpy()
+        # Standardized, so a missing feature at the mean is 0
+        values[np.isnan(values)] = 0.0
+        return values
+
+    def fit(self, data):
+        rng = np.random.default_rng(self.random_state)
+        numeric = data[list(dict.fromkeys(self.feature_columns + self.columns))].astype(np.float64)
+        self.means_ = numeric.mean()
+        self.scales_ = numeric.std().replace(0.0, 1.0).fillna(1.0)
+
+        self.references_ = {}
+        for col in self.columns:
+            features = [feature for feature in self.feature_columns if feature != col]
+            known = np.flatnonzero(data[col].notna().to_numpy())
+            if not features or len(known) == 0:
+                self.references_[col] = None
+                continue
+            known = known[sample_rows(len(known), self.max_reference_rows, rng)]
+            reference = data.iloc[known]
+            self.references_[col] = (features, KDTree(self._features(reference, features)),
+                                     reference[col].to_numpy(dtype=np.float64))
+        return self
+
+    def _impute_chunk(self, tree, targets, queries):
+        k = min(self.n_neighbors, len(targets))
+        distances, indices = tree.query(queries, k=k)
+        neighbours = targets[indices]
+        if self.weights == "uniform":
+            return neighbours.mean(axis=1)
+        weights = 1.0 / np.maximum(distances, 1e-12)
+        return (neighbours * weights).sum(axis=1) / weights.sum(axis=1)
+
+    def transform(self, data):
+        data = data.copy()
+        for col in self.columns:
+            missing = np.flatnonzero(data[col].isna().to_numpy())
+            if len(missing) == 0:
+                continue
+            position = data.columns.get_loc(col)
+            reference = self.references_[col]
+            if reference is None:
+                data.iloc[missing, position] = self.means_[col]
+                continue
+
+            features, tree, targets = reference
+            queries = self._features(data.iloc[missing], features)
+            parts = Parallel(n_jobs=self.n_jobs, prefer="threads")(
+                delayed(self._impute_chunk)(tree, targets, queries[chunk]) for chunk in iter_chunks(len(queries), self.chunk_rows)
+            )
+            data.iloc[missing, position] = np.concatenate(parts)
+        return data
+
+    def fit_transform(self, data):
+        return self.fit(data).transform(data)
+
+
+class ChunkedIterativeImputer:
+    """
+    IterativeImputer fitted on a sample of the rows and applied in chunks.
+
+    Args:
+        columns: Numerical columns modelled together (e.g. YEAR, MONTH, QUANTITY, VALUE_RS)
+        target_columns: Columns written back (default: all of columns)
+        max_fit_rows: Upper bound on the rows the estimators are fitted on
+        chunk_rows: Rows transformed per chunk
+        n_jobs: Threads transforming chunks in parallel (-1 = one per core)
+        random_state: Seed of the fit sample and of IterativeImputer
+        **iterative_options: Passed to IterativeImputer (max_iter, estimator, ...)
+    """
+
+    def __init__(self, columns, target_columns=None, max_fit_rows=50_000, chunk_rows=50_000, n_jobs=-1, random_state=0,
+                 **iterative_options):
+        self.columns = list(columns)
+        self.target_columns = list(target_columns) if target_columns is not None else list(columns)
+        self.max_fit_rows = max_fit_rows
+        self.chunk_rows = chunk_rows
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.iterative_options = iterative_options
+
+    def fit(self, data):
+        rng = np.random.default_rng(self.random_state)
+        sample = data[self.columns].iloc[sample_rows(len(data), self.max_fit_rows, rng)]
+        self.imputer_ = IterativeImputer(random_state=self.random_state, **self.iterative_options)
+        self.imputer_.fit(sample.to_numpy(dtype=np.float64))
+        return self
+
+    def transform(self, data):
+        data = data.copy()
+        values = data[self.columns].to_numpy(dtype=np.float64)
+        # Only rows with a gap go through the estimators
+        missing = np.flatnonzero(np.isnan(values).any(axis=1))
+        if len(missing) == 0:
+            return data
+
+        rows = values[missing]
+        parts = Parallel(n_jobs=self.n_jobs, prefer="threads")(
+            delayed(self.imputer_.transform)(rows[chunk]) for chunk in iter_chunks(len(rows), self.chunk_rows)
+        )
+        imputed = pd.DataFrame(np.concatenate(parts), columns=self.columns)
+        for col in self.target_columns:
+            data.iloc[missing, data.columns.get_loc(col)] = imputed[col].to_numpy()
+        return data
+
+    def fit_transform(self, data):
+        return self.fit(data).transform(data)
+
+
+class ImputationStage:
+    """
+    Imputers applied in order (each one sees the output of the previous one),
+    persisted together as one joblib file.
+    """
+
+    def __init__(self, imputers):
+        self.imputers = list(imputers)
+
+    def fit_transform(self, data):
+        for imputer in self.imputers:
+            data = imputer.fit_transform(data)
+        return data
+
+    def transform(self, data):
+        for imputer in self.imputers:
+            data = imputer.transform(data)
+        return data
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
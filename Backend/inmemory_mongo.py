@@ -0,0 +1,120 @@
+"""
+In-memory stand-in for the small part of the MongoDB API the backend uses.
+
+Selected with MONGO_URI=memory:// (optionally memory://?latency_ms=2 to add a
+simulated round-trip per operation), so the auth path can be load-tested
+without a database server. Data lives in the process and is lost on exit.
+"""
+import copy
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+
+def matches(document, query):
+    return all(document.get(field) == value for field, value in query.items())
+
+
+class InMemoryCollection:
+    def __init__(self, name, latency_seconds=0.0):
+        self.name = name
+        self.latency_seconds = latency_seconds
+        self._documents = []
+        self._unique_fields = set()
+        self._lock = threading.Lock()
+
+    def _round_trip(self):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def create_index(self, keys, unique=False, **kwargs):
+        """
+        Only single-field unique indexes are enforced; other indexes are accepted and ignored.
+        """
+        self._round_trip()
+        field = keys if isinstance(keys, str) else keys[0][0]
+        with self._lock:
+            if unique:
+                seen = set()
+                for document in self._documents:
+                    value = document.get(field)
+                    if value in seen:
+                        raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {field}_1")
+                    seen.add(value)
+                self._unique_fields.add(field)
+        return f"{field}_1"
+
+    def find_one(self, query=None):
+        self._round_trip()
+        with self._lock:
+            for document in self._documents:
+                if matches(document, query or {}):
+                    return copy.deepcopy(document)
+        return None
+
+    def insert_one(self, document):
+        self._round_trip()
+        document = copy.deepcopy(document)
+        document.setdefault("_id", ObjectId())
+        with self._lock:
+            for field in self._unique_fields:
+                if any(existing.get(field) == document.get(field) for existing in self._documents):
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {field}_1")
+            self._documents.append(document)
+        return document["_id"]
+
+    def count_documents(self, query):
+        self._round_trip()
+        with self._lock:
+            return sum(1 for document in self._documents if matches(document, query))
+
+    def delete_many(self, query):
+        self._round_trip()
+        with self._lock:
+            before = len(self._documents)
+            self._documents = [document for document in self._documents if not matches(document, query)]
+            return before - len(self._documents)
+
+
+class InMemoryDatabase:
+    def __init__(self, name, latency_seconds=0.0):
+        self.name = name
+        self.latency_seconds = latency_seconds
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = InMemoryCollection(name, self.latency_seconds)
+            return self._collections[name]
+
+
+class InMemoryMongoClient:
+    def __init__(self, latency_seconds=0.0):
+        self.latency_seconds = latency_seconds
+        self._databases = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_uri(cls, uri):
+        query = parse_qs(urlparse(uri).query)
+        return cls(latency_seconds=float(query.get("latency_ms", [0])[0]) / 1000.0)
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = InMemoryDatabase(name, self.latency_seconds)
+            return self._databases[name]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        pass
@@ -0,0 +1,208 @@
+import copy
+import threading
+
+import numpy as np
+
+# LimeTabularExplainer's private neighbourhood sampler (lime 0.2.0.1, pinned in requirements.txt).
+# explain_batch draws with it directly and hands the samples back to explain_instance; without it,
+# rows are explained one predict_proba call at a time.
+DATA_INVERSE = "_LimeTabularExplainer__data_inverse"
+
+TRUE_STRINGS = ("true", "1", "yes", "on")
+FALSE_STRINGS = ("false", "0", "no", "off")
+
+
+def parse_bool(value, name):
+    """
+    A JSON boolean, or one of the usual true/false strings.
+
+    Raises:
+        ValueError: For any other value
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in TRUE_STRINGS + FALSE_STRINGS:
+        return value.strip().lower() in TRUE_STRINGS
+    raise ValueError(f"{name} must be true or false")
+
+
+class LimeExplanationEngine:
+    """
+    Reusable LIME engine for tabular classifiers.
+
+    Explainers are built once per discretization setting and shared between
+    requests. Each explanation runs on a private copy of the explainer with
+    its own random state, so concurrent requests never touch shared state.
+
+    Batched explanations draw the perturbations of every row once, score them
+    all with a single predict_proba call and then fit each row's explanation on
+    its share of the scores.
+    """
+
+    DISCRETIZERS = ("quartile", "decile", "entropy")
+    FEATURE_SELECTIONS = ("auto", "forward_selection", "highest_weights", "lasso_path", "none")
+
+    def __init__(self, training_data, feature_names, class_names, predict_proba,
+                 training_labels=None, default_num_samples=5000, max_num_samples=5000,
+                 max_num_features=20, max_batch_rows=100):
+        self.training_data = np.asarray(training_data)
+        self.feature_names = list(feature_names)
+        self.class_names = list(class_names)
+        self.predict_proba = predict_proba
+        self.training_labels = training_labels
+        self.default_num_samples = default_num_samples
+        self.max_num_samples = max_num_samples
+        self.max_num_features = max_num_features
+        self.max_batch_rows = max_batch_rows
+
+        self._explainers = {}
+        self._lock = threading.Lock()
+
+    def get_explainer(self, discretize_continuous=True, discretizer="quartile"):
+        """
+        Return the shared explainer for a discretization setting, building it once.
+        """
+        key = (bool(discretize_continuous), discretizer if discretize_continuous else None)
+        explainer = self._explainers.get(key)
+        if explainer is not None:
+            return explainer
+
+        with self._lock:
+            explainer = self._explainers.get(key)
+            if explainer is None:
+                # Imported here so the backend starts without loading lime
+                import lime.lime_tabular
+
+                explainer = lime.lime_tabular.LimeTabularExplainer(
+                    self.training_data,
+                    feature_names=self.feature_names,
+                    class_names=self.class_names,
+                    training_labels=self.training_labels,
+                    discretize_continuous=key[0],
+                    discretizer=key[1] or "quartile",
+                    mode="classification"
+                )
+                self._explainers[key] = explainer
+        return explainer
+
+    def warm_up(self):
+        """
+        Build the default explainer up front so the first request does not pay for it.
+        """
+        self.get_explainer()
+
+    def resolve_options(self, num_features=5, num_samples=None, discretize_continuous=True, discretizer="quartile",
+                        feature_selection="auto"):
+        """
+        Validate per-request options and clamp them to the server-side caps.
+
+        Raises:
+            ValueError: If an option is not valid
+        """
+        try:
+            num_features = int(num_features)
+            num_samples = self.default_num_samples if num_samples is None else int(num_samples)
+        except (TypeError, ValueError):
+            raise ValueError("num_features and num_samples must be integers") from None
+        discretize_continuous = parse_bool(discretize_continuous, "discretize_continuous")
+        if num_features < 1 or num_samples < 1:
+            raise ValueError("num_features and num_samples must be positive")
+
+        if discretizer not in self.DISCRETIZERS:
+            raise ValueError(f"Invalid discretizer '{discretizer}'. Expected one of: {', '.join(self.DISCRETIZERS)}")
+        if discretizer == "entropy" and self.training_labels is None:
+            raise ValueError("The entropy discretizer requires training labels")
+        if feature_selection not in self.FEATURE_SELECTIONS:
+            raise ValueError(f"Invalid feature_selection '{feature_selection}'. "
+                             f"Expected one of: {', '.join(self.FEATURE_SELECTIONS)}")
+
+        return {
+            "num_features": min(num_features, self.max_num_features),
+            "num_samples": min(num_samples, self.max_num_samples),
+            "discretize_continuous": discretize_continuous,
+            "discretizer": discretizer,
+            "feature_selection": feature_selection,
+        }
+
+    @staticmethod
+    def _fork(explainer, seed, feature_selection="auto"):
+        # Shallow copy with a private random state. The discretizer and the
+        # LIME base share the explainer's RandomState, so they are re-pointed too.
+        forked = copy.copy(explainer)
+        forked.feature_selection = feature_selection
+        forked.random_state = np.random.RandomState(seed)
+        forked.base = copy.copy(explainer.base)
+        forked.base.random_state = forked.random_state
+        if explainer.discretizer is not None:
+            forked.discretizer = copy.copy(explainer.discretizer)
+            forked.discretizer.random_state = forked.random_state
+        return forked
+
+    def explain_batch(self, rows, num_features=5, num_samples=None, discretize_continuous=True,
+                      discretizer="quartile", feature_selection="auto", random_state=None):
+        """
+        Explain many processed rows at once.
+
+        Args:
+            rows: 2D array of processed model inputs
+            num_features: Number of top features to include in each explanation
+            num_samples: Perturbation samples per row (capped server-side)
+            discretize_continuous: Whether continuous features are discretized
+            discretizer: "quartile", "decile" or "entropy"
+            feature_selection: LIME feature selection method ("auto" uses forward
+                selection for up to 6 features, which dominates the cost; "highest_weights"
+                needs a single ridge fit)
+            random_state: Optional seed for reproducible explanations
+
+        Returns:
+            List of dictionaries with feature importance information, one per row
+        """
+        rows = np.asarray(rows)
+        if len(rows) > self.max_batch_rows:
+            raise ValueError(f"Too many rows to explain: {len(rows)} (max {self.max_batch_rows})")
+
+        options = self.resolve_options(num_features, num_samples, discretize_continuous, discretizer, feature_selection)
+        explainer = self.get_explainer(options["discretize_continuous"], options["discretizer"])
+        seeds = np.random.default_rng(random_state).integers(0, 2**31 - 1, size=len(rows))
+
+        if not hasattr(explainer, DATA_INVERSE):
+            # A lime release without the private sampler: explain row by row through the public API
+            return [
+                self._summarize(self._fork(explainer, seed, options["feature_selection"]).explain_instance(
+                    row, self.predict_proba, num_features=options["num_features"], num_samples=options["num_samples"]))
+                for row, seed in zip(rows, seeds)
+            ]
+
+        # Draw every row's perturbations once, on the row's own forked explainer
+        forks, perturbations = [], []
+        for row, seed in zip(rows, seeds):
+            forked = self._fork(explainer, seed, options["feature_selection"])
+            forks.append(forked)
+            perturbations.append(getattr(forked, DATA_INVERSE)(row, options["num_samples"]))
+
+        # Score all perturbations with a single predict_proba call
+        if perturbations:
+            all_probabilities = self.predict_proba(np.vstack([inverse for _, inverse in perturbations]))
+        offsets = np.cumsum([0] + [len(inverse) for _, inverse in perturbations])
+
+        # Fit each row's explanation on the drawn perturbations and their scores
+        explanations = []
+        for i, (row, forked) in enumerate(zip(rows, forks)):
+            sampled = perturbations[i]
+            probabilities = all_probabilities[offsets[i]:offsets[i + 1]]
+            setattr(forked, DATA_INVERSE, lambda data_row, num_samples, sampled=sampled: sampled)
+            exp = forked.explain_instance(row, lambda data, probabilities=probabilities: probabilities,
+                                          num_features=options["num_features"], num_samples=options["num_samples"])
+            explanations.append(self._summarize(exp))
+
+        return explanations
+
+    @staticmethod
+    def _summarize(exp):
+        return {
+            "feature_importance": [
+                {"feature": feature, "importance": importance}
+                for feature, importance in exp.as_list()
+            ],
+            "model_confidence": exp.score,
+        }
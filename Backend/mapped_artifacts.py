@@ -0,0 +1,223 @@
+"""
+Memory-mapped artifact format.
+
+convert: rewrite the registered artifacts as uncompressed joblib files under
+Mapped/ (same relative layout as the originals) and write a checksum
+manifest. Their NumPy arrays can then be mapped straight from disk with
+joblib.load(mmap_mode='r') instead of being copied into the process heap.
+Mapped pages live in the page cache, so every worker process shares them.
+
+Not every artifact benefits: scikit-learn copies tree nodes into its own
+buffers when a tree is unpickled, so mapping a forest only adds one mmap call
+per tree array. convert times both load paths and records per artifact
+whether the mapped load is worth using (--mode always forces it). The tree
+models are additionally exported as compiled flat-array engines
+(Mapped/compiled/), which are plain arrays and always map cleanly.
+
+verify: recompute the checksums of the sources and the mapped files against the manifest.
+
+Usage:
+    python mapped_artifacts.py convert
+    python mapped_artifacts.py verify
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import sys
+import time
+
+import joblib
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+MAPPED_ARTIFACTS_PATH = os.getenv("MAPPED_ARTIFACTS_PATH", os.path.join(BASE_PATH, "Mapped"))
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = 1
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def relative_key(path):
+    return os.path.relpath(os.path.abspath(path), BASE_PATH).replace(os.sep, "/")
+
+
+class MappedArtifactLoader:
+    """
+    Loads an artifact from its memory-mapped copy when the manifest has a valid
+    entry for it, and from the original pickle otherwise.
+
+    By default an entry is trusted when the source and mapped file sizes match
+    the manifest. Set verify_checksums to also compare SHA-256 digests; that
+    reads both files in full, so it costs part of the startup the mapping saves.
+    """
+
+    def __init__(self, mapped_path=MAPPED_ARTIFACTS_PATH, verify_checksums=False):
+        self.mapped_path = mapped_path
+        self.verify_checksums = verify_checksums
+        self.entries = {}
+        self.compiled = {}
+        self.sources = {}
+
+        manifest_path = os.path.join(mapped_path, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get("format") == MANIFEST_FORMAT:
+                self.entries = manifest.get("artifacts", {})
+                self.compiled = manifest.get("compiled", {})
+
+    def mapped_file(self, path):
+        """
+        Return the mapped copy of path if it is present and matches the manifest, else None.
+        """
+        entry = self.entries.get(relative_key(path))
+        if entry is None:
+            return None
+
+        mapped = os.path.join(self.mapped_path, entry["mapped"])
+        if not os.path.exists(mapped) or not os.path.exists(path):
+            return None
+        if os.path.getsize(path) != entry["source_size"] or os.path.getsize(mapped) != entry["size"]:
+            return None
+        if self.verify_checksums and (file_sha256(path) != entry["source_sha256"] or file_sha256(mapped) != entry["sha256"]):
+            return None
+        return mapped
+
+    def compiled_file(self, name, source_path):
+        """
+        Return the exported compiled engine for a tree model, or None if it is
+        missing or the source model no longer matches the manifest.
+        """
+        entry = self.compiled.get(name)
+        if entry is None or self.mapped_file(source_path) is None:
+            return None
+
+        compiled = os.path.join(self.mapped_path, entry["mapped"])
+        if not os.path.exists(compiled) or os.path.getsize(compiled) != entry["size"]:
+            return None
+        if self.verify_checksums and file_sha256(compiled) != entry["sha256"]:
+            return None
+        return compiled
+
+    def load(self, path):
+        mapped = self.mapped_file(path)
+        if mapped is None:
+            self.sources[path] = "pickle"
+            return joblib.load(path)
+
+        entry = self.entries[relative_key(path)]
+        self.sources[path] = "mmap" if entry["mmap"] else "pickle"
+        return joblib.load(mapped, mmap_mode="r" if entry["mmap"] else None)
+
+
+def time_load(path, mmap_mode=None, repeat=3):
+    """
+    Best-of-n load time in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        joblib.load(path, mmap_mode=mmap_mode)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def load_app():
+    sys.path.insert(0, BASE_PATH)
+    import app
+
+    return app
+
+
+def convert(mapped_path=MAPPED_ARTIFACTS_PATH, mode="auto"):
+    app = load_app()
+    artifacts = {}
+    for name, path in app.artifacts.paths().items():
+        key = relative_key(path)
+        mapped = os.path.join(mapped_path, key)
+        os.makedirs(os.path.dirname(mapped), exist_ok=True)
+
+        # Uncompressed dump: NumPy arrays are stored as raw aligned buffers that can be mapped
+        joblib.dump(joblib.load(path), mapped)
+        pickle_ms = time_load(mapped) * 1000
+        mmap_ms = time_load(mapped, mmap_mode="r") * 1000
+        artifacts[key] = {
+            "name": name,
+            "mapped": key,
+            "source_size": os.path.getsize(path),
+            "source_sha256": file_sha256(path),
+            "size": os.path.getsize(mapped),
+            "sha256": file_sha256(mapped),
+            "mmap": mode == "always" or mmap_ms <= pickle_ms,
+            "load_ms": {"pickle": round(pickle_ms, 2), "mmap": round(mmap_ms, 2)},
+        }
+        print(f"✅ {name}: {key} ({artifacts[key]['size'] / 1024:.0f} KB, "
+              f"load {pickle_ms:.1f} ms, mapped {mmap_ms:.1f} ms -> {'mmap' if artifacts[key]['mmap'] else 'pickle'})")
+
+    # Compiled flat-array engines for the tree ensembles
+    from tree_engine import CompiledTreeEnsemble
+
+    compiled = {}
+    for name in app.COMPILED_TREE_MODELS:
+        key = f"compiled/{name}.joblib"
+        target = os.path.join(mapped_path, key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        CompiledTreeEnsemble.from_model(joblib.load(app.artifacts.paths()[name])).save(target)
+        mmap_ms = time_load(target, mmap_mode="r") * 1000
+        compiled[name] = {"mapped": key, "size": os.path.getsize(target), "sha256": file_sha256(target)}
+        print(f"✅ {name} engine: {key} ({compiled[name]['size'] / 1024:.0f} KB, mapped {mmap_ms:.1f} ms)")
+
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "created": datetime.datetime.utcnow().isoformat() + "Z",
+        "joblib_version": joblib.__version__,
+        "artifacts": artifacts,
+        "compiled": compiled,
+    }
+    with open(os.path.join(mapped_path, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"✅ Wrote {len(artifacts)} artifacts and {MANIFEST_NAME} to {mapped_path}")
+
+
+def verify(mapped_path=MAPPED_ARTIFACTS_PATH):
+    loader = MappedArtifactLoader(mapped_path, verify_checksums=True)
+    if not loader.entries:
+        print(f"❌ No manifest found in {mapped_path}")
+        return False
+
+    ok = True
+    for key in loader.entries:
+        valid = loader.mapped_file(os.path.join(BASE_PATH, key)) is not None
+        ok = ok and valid
+        print(f"{'✅' if valid else '❌'} {key}")
+    for name, entry in loader.compiled.items():
+        source = next((key for key, artifact in loader.entries.items() if artifact["name"] == name), None)
+        valid = source is not None and loader.compiled_file(name, os.path.join(BASE_PATH, source)) is not None
+        ok = ok and valid
+        print(f"{'✅' if valid else '❌'} {entry['mapped']}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["convert", "verify"])
+    parser.add_argument("--mapped-path", default=MAPPED_ARTIFACTS_PATH)
+    parser.add_argument("--mode", choices=["auto", "always"], default="auto",
+                        help="auto: map an artifact only when that loads faster; always: map everything")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        convert(args.mapped_path, args.mode)
+        return 0
+    return 0 if verify(args.mapped_path) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+import scipy.sparse
+
+
+def stack_inputs(inputs):
+    """
+    Stack model inputs (DataFrames, NumPy arrays or sparse matrices) row-wise.
+    """
+    first = inputs[0]
+    if len(inputs) == 1:
+        return first
+    if isinstance(first, pd.DataFrame):
+        return pd.concat(inputs, ignore_index=True)
+    if scipy.sparse.issparse(first):
+        return scipy.sparse.vstack(inputs, format="csr")
+    return np.vstack(inputs)
+
+
+def slice_output(output, start, stop):
+    """
+    Slice rows out of a predict output (an array or a tuple of arrays).
+    """
+    if isinstance(output, tuple):
+        return tuple(part[start:stop] for part in output)
+    return output[start:stop]
+
+
+class MicroBatcher:
+    """
+    In-process micro-batcher in front of a model's predict function.
+
+    Concurrent callers submit small inputs. A background thread collects them
+    for up to max_wait_ms or until max_batch_size rows are queued, runs one
+    vectorized predict, and hands each caller back its own rows of the output.
+    Inputs that are already max_batch_size rows or larger skip the queue.
+
+    With a context (an object with capture() and pinned(token), such as the
+    ArtifactRegistry), each submission carries the caller's captured token and
+    is predicted under it, so a batch never mixes model versions.
+    """
+
+    # Upper bounds of the batch size histogram buckets
+    BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+    def __init__(self, name, predict_fn, max_batch_size=32, max_wait_ms=2.0, enabled=True, context=None):
+        self.name = name
+        self.predict_fn = predict_fn
+        self.context = context
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.enabled = enabled
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_pid = None
+        self._start_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._rows = 0
+        self._batches = 0
+        self._max_queue_depth = 0
+        self._wait_seconds = 0.0
+        self._batch_size_counts = [0] * (len(self.BATCH_SIZE_BUCKETS) + 1)
+
+    @classmethod
+    def from_env(cls, name, predict_fn, max_batch_size=32, max_wait_ms=2.0, context=None):
+        """
+        Build a batcher configured by MICROBATCH_<NAME>_MAX_BATCH_SIZE / _MAX_WAIT_MS
+        and the global MICROBATCH_ENABLED switch.
+        """
+        prefix = f"MICROBATCH_{name.upper()}"
+        return cls(
+            name,
+            predict_fn,
+            max_batch_size=int(os.getenv(f"{prefix}_MAX_BATCH_SIZE", max_batch_size)),
+            max_wait_ms=float(os.getenv(f"{prefix}_MAX_WAIT_MS", max_wait_ms)),
+            enabled=os.getenv("MICROBATCH_ENABLED", "1") == "1",
+            context=context
+        )
+
+    def submit(self, model_input):
+        """
+        Predict for model_input, batching it with concurrent submissions.
+
+        Returns:
+            The rows of the predict output that belong to model_input
+        """
+        n_rows = model_input.shape[0]
+        if not self.enabled or n_rows >= self.max_batch_size:
+            self._record_batch(n_rows, requests=1, wait_seconds=0.0)
+            return self.predict_fn(model_input)
+
+        self._ensure_worker()
+        future = Future()
+        token = self.context.capture() if self.context is not None else None
+        self._queue.put((model_input, n_rows, time.perf_counter(), future, token))
+        with self._stats_lock:
+            self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+        return future.result()
+
+    def _ensure_worker(self):
+        # Threads do not survive fork, so a forked worker process starts its own
+        if self._worker is not None and self._worker_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._worker is None or self._worker_pid != os.getpid():
+                self._queue = queue.Queue()
+                self._worker = threading.Thread(target=self._run, name=f"microbatch-{self.name}", daemon=True)
+                self._worker_pid = os.getpid()
+                self._worker.start()
+
+    def _run(self):
+        work_queue = self._queue
+        while True:
+            batch = [work_queue.get()]
+            n_rows = batch[0][1]
+            deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+
+            # Collect more requests until the batch is full or the wait window closes
+            while n_rows < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = work_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                n_rows += item[1]
+
+            self._process(batch, n_rows)
+
+    def _process(self, batch, n_rows):
+        now = time.perf_counter()
+        self._record_batch(n_rows, requests=len(batch), wait_seconds=sum(now - item[2] for item in batch))
+
+        if self.context is None:
+            self._predict_batch(batch)
+            return
+
+        # Predict the submissions of each captured context (model version) together
+        groups = {}
+        for item in batch:
+            groups.setdefault(id(item[4]), []).append(item)
+        for group in groups.values():
+            with self.context.pinned(group[0][4]):
+                self._predict_batch(group)
+
+    def _predict_batch(self, batch):
+        try:
+            output = self.predict_fn(stack_inputs([item[0] for item in batch]))
+        except Exception:
+            # Isolate failures: score each request on its own so one bad input does not fail the others
+            for model_input, _, _, future, _ in batch:
+                try:
+                    future.set_result(self.predict_fn(model_input))
+                except Exception as e:
+                    future.set_exception(e)
+            return
+
+        start = 0
+        for _, rows, _, future, _ in batch:
+            future.set_result(slice_output(output, start, start + rows))
+            start += rows
+
+    def _record_batch(self, n_rows, requests, wait_seconds):
+        bucket = next((i for i, bound in enumerate(self.BATCH_SIZE_BUCKETS) if n_rows <= bound), len(self.BATCH_SIZE_BUCKETS))
+        with self._stats_lock:
+            self._requests += requests
+            self._rows += n_rows
+            self._batches += 1
+            self._wait_seconds += wait_seconds
+            self._batch_size_counts[bucket] += 1
+
+    def stats(self):
+        """
+        Return queue-depth and batch-size statistics.
+        """
+        with self._stats_lock:
+            bounds = [str(bound) for bound in self.BATCH_SIZE_BUCKETS] + ["+Inf"]
+            return {
+                "enabled": self.enabled,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "requests": self._requests,
+                "rows": self._rows,
+                "batches": self._batches,
+                "mean_batch_size": self._rows / self._batches if self._batches else 0.0,
+                "mean_wait_ms": self._wait_seconds * 1000.0 / self._requests if self._requests else 0.0,
+                "batch_size_histogram": dict(zip(bounds, self._batch_size_counts)),
+            }
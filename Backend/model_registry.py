@@ -0,0 +1,421 @@
+"""
+Versioned model registry.
+
+Each model family (importer, future, recipe, end_user) gets a directory of
+immutable releases, plus a CURRENT file naming the release to serve:
+
+    Registry/<family>/<version>/<artifact files>
+    Registry/<family>/<version>/manifest.json
+    Registry/<family>/CURRENT
+
+The manifest records the SHA-256 and size of every artifact file, the
+feature columns of the models (feature_names_in_, or the trained column list)
+and a digest of the classes/categories of each encoder, so a release whose
+files were changed or whose encoders do not match what was published is
+rejected before it serves traffic.
+
+A running backend polls CURRENT (every MODEL_REGISTRY_POLL_SECONDS) in each
+worker process. A new release is loaded and warmed up on a background thread
+and then swapped in; requests already running finish on the release they
+started with.
+
+publish: copy a family's artifacts (from the backend's configured paths, or
+from a directory holding the retrained files under the same names) into a
+new release. activate: point CURRENT at a release. list: show the releases.
+
+Usage:
+    python model_registry.py publish importer --source-dir ~/Downloads/importer-retrained --activate
+    python model_registry.py activate importer 20250301-120000-3f2a9c1d
+    python model_registry.py list
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+
+from mapped_artifacts import file_sha256
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+MODEL_REGISTRY_PATH = os.getenv("MODEL_REGISTRY_PATH", os.path.join(BASE_PATH, "Registry"))
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = 1
+CURRENT_NAME = "CURRENT"
+
+
+class ReleaseError(ValueError):
+    """Raised when a release is missing, incomplete or does not match its manifest."""
+
+
+def encoder_digest(value):
+    """
+    Digest of the classes/categories of an encoder (or a dict of encoders), or None for other objects.
+    """
+    if isinstance(value, dict):
+        digests = {str(key): encoder_digest(item) for key, item in value.items()}
+        if not digests or not all(digests.values()):
+            return None
+        labels = sorted(digests.items())
+    elif hasattr(value, "categories_"):
+        labels = [[str(label) for label in categories] for categories in value.categories_]
+    elif hasattr(value, "classes_") and type(value).__name__.endswith("Encoder"):
+        labels = [str(label) for label in value.classes_]
+    else:
+        return None
+    return hashlib.sha256(json.dumps(labels).encode("utf-8")).hexdigest()[:16]
+
+
+def describe_artifact(value):
+    """
+    Feature columns and encoder digest of a loaded artifact, as recorded in the manifest.
+    """
+    info = {}
+    columns = getattr(value, "feature_names_in_", None)
+    if columns is None and (isinstance(value, (list, tuple)) or type(value).__name__ == "Index"):
+        columns = value
+    if columns is not None:
+        info["feature_columns"] = [str(column) for column in columns]
+    digest = encoder_digest(value)
+    if digest is not None:
+        info["encoder_version"] = digest
+    return info
+
+
+def write_atomic(path, text):
+    temporary = f"{path}.tmp-{os.getpid()}"
+    with open(temporary, "w") as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+
+class ModelRegistry:
+    """
+    Reads and writes the releases of the model families under a registry directory.
+    """
+
+    def __init__(self, path=MODEL_REGISTRY_PATH, verify_checksums=False):
+        self.path = path
+        self.verify_checksums = verify_checksums
+
+    def family_path(self, family):
+        return os.path.join(self.path, family)
+
+    def versions(self, family):
+        """
+        Published versions of a family, oldest first.
+        """
+        family_path = self.family_path(family)
+        if not os.path.isdir(family_path):
+            return []
+        return sorted(version for version in os.listdir(family_path)
+                      if os.path.exists(os.path.join(family_path, version, MANIFEST_NAME)))
+
+    def current_version(self, family):
+        """
+        Version CURRENT points to, or None if the family has no active release.
+        """
+        try:
+            with open(os.path.join(self.family_path(family), CURRENT_NAME)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def manifest(self, family, version):
+        manifest_path = os.path.join(self.family_path(family), version, MANIFEST_NAME)
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise ReleaseError(f"No release '{version}' of '{family}'") from None
+        if manifest.get("format") != MANIFEST_FORMAT or manifest.get("family") != family:
+            raise ReleaseError(f"Release '{version}' of '{family}' has an unsupported manifest")
+        return manifest
+
+    def load_release(self, family, version):
+        """
+        Check a release's files against its manifest (sizes, and checksums with
+        verify_checksums) and return it as {"version", "paths", "manifest"}.
+
+        Raises:
+            ReleaseError: If the release is missing or a file does not match
+        """
+        manifest = self.manifest(family, version)
+        release_path = os.path.join(self.family_path(family), version)
+        paths = {}
+        for name, entry in manifest["artifacts"].items():
+            path = os.path.join(release_path, entry["file"])
+            if not os.path.exists(path) or os.path.getsize(path) != entry["size"]:
+                raise ReleaseError(f"Artifact '{name}' of {family} {version} is missing or has the wrong size")
+            if self.verify_checksums and file_sha256(path) != entry["sha256"]:
+                raise ReleaseError(f"Artifact '{name}' of {family} {version} does not match its checksum")
+            paths[name] = path
+        return {"version": version, "paths": paths, "manifest": manifest}
+
+    def publish(self, family, sources, version=None):
+        """
+        Copy artifact files into a new release of a family and write its manifest.
+
+        Args:
+            family: Model family
+            sources: Dictionary of artifact name -> file path
+            version: Release name (default: UTC timestamp plus a digest of the files)
+
+        Returns:
+            The manifest of the new release
+        """
+        artifacts = {}
+        for name, source in sorted(sources.items()):
+            entry = {"file": f"{name}{os.path.splitext(source)[1] or '.pkl'}",
+                     "sha256": file_sha256(source), "size": os.path.getsize(source)}
+            entry.update(describe_artifact(joblib.load(source)))
+            artifacts[name] = entry
+
+        if version is None:
+            digest = hashlib.sha256("".join(entry["sha256"] for entry in artifacts.values()).encode("utf-8")).hexdigest()
+            version = f"{datetime.datetime.utcnow():%Y%m%d-%H%M%S}-{digest[:8]}"
+        release_path = os.path.join(self.family_path(family), version)
+        if os.path.exists(release_path):
+            raise ReleaseError(f"Release '{version}' of '{family}' already exists")
+
+        # Build the release next to its final place, then rename it in one step
+        staging_path = f"{release_path}.tmp-{os.getpid()}"
+        os.makedirs(staging_path)
+        for name, source in sources.items():
+            shutil.copyfile(source, os.path.join(staging_path, artifacts[name]["file"]))
+        manifest = {
+            "format": MANIFEST_FORMAT,
+            "family": family,
+            "version": version,
+            "created_at": datetime.datetime.utcnow().isoformat() + "Z",
+            "joblib_version": joblib.__version__,
+            "artifacts": artifacts,
+        }
+        with open(os.path.join(staging_path, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(staging_path, release_path)
+        return manifest
+
+    def activate(self, family, version):
+        """
+        Point a family's CURRENT at a published release (whose files match its manifest).
+
+        Raises:
+            ReleaseError: If the release is missing or a file does not match
+        """
+        self.load_release(family, version)
+        write_atomic(os.path.join(self.family_path(family), CURRENT_NAME), version + "\n")
+
+
+def check_release(artifacts, family):
+    """
+    Stage callback: compare the loaded artifacts of the release being staged with
+    the feature columns and encoder versions recorded in its manifest.
+
+    Raises:
+        ReleaseError: If a loaded artifact does not match the manifest
+    """
+    release = artifacts.release(family)
+    if release is None:
+        return
+    for name, entry in release["manifest"]["artifacts"].items():
+        loaded = describe_artifact(artifacts.get(name))
+        for key in ("feature_columns", "encoder_version"):
+            if key in entry and loaded.get(key) != entry[key]:
+                raise ReleaseError(f"Artifact '{name}' of {family} {release['version']} does not match the {key} of its manifest")
+
+
+class ReleaseWatcher:
+    """
+    Follows the CURRENT files of the registry and swaps new releases into an ArtifactRegistry.
+
+    A release is loaded and warmed up (ArtifactRegistry.activate_release) on a
+    single background thread, so requests never wait for it. The polling thread
+    is started per process on first use, since threads do not survive the fork
+    of a pre-fork worker.
+    """
+
+    def __init__(self, registry, artifacts, poll_seconds=5.0):
+        self.registry = registry
+        self.artifacts = artifacts
+        self.poll_seconds = poll_seconds
+        self.errors = {}
+        self._failed = set()
+        self._pending = {}
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        artifacts.on_stage(lambda family: check_release(artifacts, family))
+
+    def activate_current(self, preload=True):
+        """
+        Make the CURRENT release of every family active right away (at startup).
+
+        With preload the release is loaded and checked like a staged one, so a
+        release that fails check_release is never served; the family then keeps
+        its configured artifact paths.
+        """
+        for family in self.artifacts.families():
+            version = self.registry.current_version(family)
+            if version is None:
+                continue
+            try:
+                self.artifacts.activate_release(family, self.registry.load_release(family, version), preload=preload)
+                print(f"✅ Serving {family} release {version}")
+            except Exception as e:
+                self._record_failure(family, version, e)
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-release")
+                self._pending = {}
+                if self.poll_seconds > 0:
+                    threading.Thread(target=self._poll, name="model-release-watcher", daemon=True).start()
+                self._pid = os.getpid()
+
+    def _poll(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                self.check()
+            except Exception as e:
+                print(f"❌ Error checking the model registry: {e}")
+
+    def check(self):
+        """
+        Stage the CURRENT release of every family whose active release differs from it.
+        """
+        for family in self.artifacts.families():
+            version = self.registry.current_version(family)
+            release = self.artifacts.release(family)
+            if version is None or (release is not None and release["version"] == version):
+                continue
+            # A release being promoted is swapped in before CURRENT is written; do not stage the old one meanwhile
+            if any(pending == family for pending, _ in list(self._pending)):
+                continue
+            if (family, version) not in self._failed:
+                self.stage(family, version)
+
+    def stage(self, family, version, promote=False):
+        """
+        Load and swap in a release in the background (once per family and version at a time).
+
+        Args:
+            promote: Point CURRENT at the release once it is swapped in, so the other
+                workers follow only a release that passed its checks here
+
+        Returns:
+            Future of the staging
+        """
+        self.ensure_started()
+        with self._lock:
+            future = self._pending.get((family, version))
+            if future is None:
+                self._failed.discard((family, version))
+                future = self._executor.submit(self._stage, family, version, promote)
+                self._pending[(family, version)] = future
+                future.add_done_callback(lambda _, key=(family, version): self._pending.pop(key, None))
+        return future
+
+    def _stage(self, family, version, promote=False):
+        start = time.perf_counter()
+        try:
+            self.artifacts.activate_release(family, self.registry.load_release(family, version))
+            if promote:
+                self.registry.activate(family, version)
+        except Exception as e:
+            self._record_failure(family, version, e)
+            raise
+        self.errors.pop(family, None)
+        print(f"✅ Swapped in {family} release {version} (loaded and warmed up in {(time.perf_counter() - start) * 1000:.0f} ms)")
+
+    def _record_failure(self, family, version, error):
+        self._failed.add((family, version))
+        self.errors[family] = {"version": version, "error": str(error)}
+        print(f"❌ Could not activate {family} release {version}: {error}")
+
+    def status(self):
+        """
+        Active, current and published versions per family, with staging state and last error.
+        """
+        pending = {family for family, _ in list(self._pending)}
+        status = {}
+        for family in self.artifacts.families():
+            release = self.artifacts.release(family)
+            status[family] = {
+                "active_version": self.artifacts.version(family),
+                "release": release is not None,
+                "created_at": release["manifest"]["created_at"] if release else None,
+                "current_version": self.registry.current_version(family),
+                "versions": self.registry.versions(family),
+                "staging": family in pending,
+                "error": self.errors.get(family),
+            }
+        return status
+
+
+def load_app():
+    sys.path.insert(0, BASE_PATH)
+    import app
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--registry-path", default=MODEL_REGISTRY_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    publish_parser = commands.add_parser("publish", help="Publish a family's artifacts as a new release")
+    publish_parser.add_argument("family")
+    publish_parser.add_argument("--source-dir", help="Directory with the retrained files (default: the configured paths)")
+    publish_parser.add_argument("--version", help="Release name (default: timestamp and digest)")
+    publish_parser.add_argument("--activate", action="store_true", help="Point CURRENT at the new release")
+
+    activate_parser = commands.add_parser("activate", help="Point a family's CURRENT at a release")
+    activate_parser.add_argument("family")
+    activate_parser.add_argument("version")
+
+    commands.add_parser("list", help="List the releases of every family")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry_path)
+    try:
+        if args.command == "publish":
+            app = load_app()
+            sources = app.artifacts.paths(args.family, default=True)
+            if not sources:
+                raise ReleaseError(f"Unknown family '{args.family}'. Expected one of: {', '.join(app.artifacts.families())}")
+            if args.source_dir:
+                sources = {name: os.path.join(args.source_dir, os.path.basename(path)) for name, path in sources.items()}
+            manifest = registry.publish(args.family, sources, version=args.version)
+            print(f"✅ Published {args.family} release {manifest['version']} ({len(manifest['artifacts'])} artifacts)")
+            if args.activate:
+                registry.activate(args.family, manifest["version"])
+                print(f"✅ {args.family} CURRENT -> {manifest['version']}")
+        elif args.command == "activate":
+            registry.activate(args.family, args.version)
+            print(f"✅ {args.family} CURRENT -> {args.version}")
+        else:
+            families = sorted(name for name in os.listdir(registry.path)
+                              if os.path.isdir(registry.family_path(name))) if os.path.isdir(registry.path) else []
+            for family in families:
+                current = registry.current_version(family)
+                for version in registry.versions(family):
+                    print(f"{family:10} {version}{'  (current)' if version == current else ''}")
+    except (ReleaseError, OSError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
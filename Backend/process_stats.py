@@ -0,0 +1,15 @@
+"""
+Process resource figures for the command-line tools' closing reports.
+"""
+
+
+def peak_memory():
+    """
+    ", peak RSS <n> MB" for the current process, or "" where the resource module is unavailable.
+    """
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows
+        return ""
+    return f", peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB"
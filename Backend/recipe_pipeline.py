@@ -0,0 +1,53 @@
+"""
+Column-wise stages of the recipe risk pipeline (used by app.predict_recipe_risk).
+
+They have no dependency on the rest of the backend, so they can be tested and
+benchmarked without importing app.
+"""
+import numpy as np
+import pandas as pd
+
+
+def preprocess_new_recipe(new_recipe_raw):
+    """
+    Build the "Combined Recipe" column ("chem:qty + chem:qty") with column-wise string operations.
+
+    The n-th chemical is paired with the n-th quantity; extra entries on either side are dropped.
+    """
+    positions = np.arange(len(new_recipe_raw))
+
+    def split_parts(column):
+        parts = pd.Series(new_recipe_raw[column].to_numpy(), index=positions).str.split("+").explode()
+        parts.index = pd.MultiIndex.from_arrays([parts.index, parts.groupby(level=0).cumcount()])
+        return parts
+
+    pairs = pd.concat(
+        [split_parts("Chemical Names").rename("chemical"), split_parts("Quantities (g/mL)").rename("quantity")],
+        axis=1, join="inner"
+    )
+    combined = pairs["chemical"].str.strip() + ":" + pairs["quantity"].str.replace(r"[^0-9.]+", "", regex=True)
+
+    # Join the pairs of each recipe column by column (one column per pair position)
+    pair_columns = combined.unstack(level=1)
+    combined_recipe = pair_columns[0]
+    for position in pair_columns.columns[1:]:
+        combined_recipe = combined_recipe + (" + " + pair_columns[position]).fillna("")
+
+    new_recipe_raw["Combined Recipe"] = combined_recipe.reindex(positions).to_numpy()
+    return new_recipe_raw
+
+
+def determine_risk_levels(predicted_df):
+    """
+    Band the three predicted scores into an overall risk level.
+
+    The highest band reached by any score wins: > 90 is "Very High Risk",
+    71-90 is "High Risk", 31-70 is "Medium Risk", anything else "Low Risk".
+    """
+    scores = predicted_df[["Explosiveness (1-10)", "Health Risk Score (0-100)", "Risk Score (0-100)"]].to_numpy()
+    conditions = [
+        (scores > 90).any(axis=1),
+        ((scores >= 71) & (scores <= 90)).any(axis=1),
+        ((scores >= 31) & (scores <= 70)).any(axis=1),
+    ]
+    return np.select(conditions, ["Very High Risk", "High Risk", "Medium Risk"], default="Low Risk")
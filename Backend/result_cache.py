@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def canonical_json(value):
+    """
+    Serialize a request payload deterministically (sorted keys, NumPy scalars as Python values).
+    """
+    def default(obj):
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        return str(obj)
+
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=default)
+
+
+class ResultCache:
+    """
+    Bounded LRU cache with a per-entry TTL for prediction and explanation results.
+
+    Keys are stable hashes of the canonical (already normalized) model input plus
+    the model version, so a reloaded model never serves results of its
+    predecessor. An optional byte budget bounds caches holding large payloads
+    (explanations with embedded plots); entry sizes are measured as canonical
+    JSON.
+    """
+
+    def __init__(self, name, max_entries=10000, ttl_seconds=300.0, max_bytes=None, enabled=True):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.enabled = enabled and max_entries > 0
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+        self._rejected = 0
+
+    @classmethod
+    def from_env(cls, name, max_entries=10000, ttl_seconds=300.0, max_bytes=None):
+        """
+        Build a cache configured by RESULT_CACHE_<NAME>_MAX_ENTRIES / _TTL_SECONDS / _MAX_BYTES
+        and the global RESULT_CACHE_ENABLED switch.
+        """
+        prefix = f"RESULT_CACHE_{name.upper()}"
+        max_bytes = os.getenv(f"{prefix}_MAX_BYTES", max_bytes)
+        return cls(
+            name,
+            max_entries=int(os.getenv(f"{prefix}_MAX_ENTRIES", max_entries)),
+            ttl_seconds=float(os.getenv(f"{prefix}_TTL_SECONDS", ttl_seconds)),
+            max_bytes=None if max_bytes is None else int(max_bytes),
+            enabled=os.getenv("RESULT_CACHE_ENABLED", "1") == "1"
+        )
+
+    @staticmethod
+    def make_key(*parts):
+        """
+        Stable hash of the key parts (e.g. model version, route options, canonical input).
+        """
+        return hashlib.sha256(canonical_json(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Return the cached value for key, or None on a miss (or an expired entry).
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            expires_at, value, size = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Store value (which must not be None), evicting least recently used entries to stay within bounds.
+        """
+        if not self.enabled or value is None:
+            return
+
+        size = len(canonical_json(value)) if self.max_bytes is not None else 0
+        with self._lock:
+            if self.max_bytes is not None and size > self.max_bytes:
+                self._rejected += 1
+                return
+
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def invalidate(self):
+        """
+        Drop every entry (e.g. after a model reload). Returns the number of entries dropped.
+        """
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+            self._invalidations += 1
+            return dropped
+
+    def stats(self):
+        """
+        Return hit/miss/eviction counters and current occupancy.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes if self.max_bytes is not None else None,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+                "rejected_too_large": self._rejected,
+            }
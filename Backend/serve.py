@@ -0,0 +1,130 @@
+"""
+Production entry point: preload the models once, then fork worker processes.
+
+The parent process imports app.py, loads every artifact and builds the
+explainers, then forks N workers that all accept connections on one shared
+listening socket. Model arrays loaded in the parent are shared with the
+workers copy-on-write, so adding workers does not duplicate them. gc.freeze()
+keeps the garbage collector from touching (and therefore copying) the
+preloaded objects. Dead workers are restarted; SIGINT/SIGTERM stops them all.
+
+On platforms without os.fork (Windows) this falls back to a single threaded
+server.
+
+Usage:
+    python serve.py [--host 0.0.0.0] [--port 5000] [--workers N]
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+from werkzeug.serving import make_server
+
+import app as backend
+
+
+def memory_usage_mb():
+    """
+    Resident, proportional (PSS) and shared memory of the current process in MB (Linux only).
+
+    Pages still shared copy-on-write with the parent count as shared, and PSS
+    splits them between the processes that map them.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = {line.split(":")[0]: int(line.split()[1]) for line in f if line.endswith("kB\n")}
+    except OSError:
+        return None
+    shared_kb = fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)
+    return fields.get("Rss", 0) / 1024, fields.get("Pss", 0) / 1024, shared_kb / 1024
+
+
+def run_worker(listener, host, port):
+    """
+    Serve requests from the shared listening socket until terminated.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    server = make_server(host, port, backend.app, threaded=True, fd=listener.fileno())
+    usage = memory_usage_mb()
+    if usage:
+        print(f"✅ Worker {os.getpid()} ready (rss {usage[0]:.0f} MB, pss {usage[1]:.0f} MB, shared {usage[2]:.0f} MB)")
+    server.serve_forever()
+
+
+def spawn_worker(listener, host, port):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(listener, host, port)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("SERVE_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVE_PORT", 5000)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SERVE_WORKERS", os.cpu_count() or 1)))
+    args = parser.parse_args()
+
+    # Preload everything once in the parent so workers share it copy-on-write
+    failures = backend.warm_up()
+    if failures:
+        print(f"❌ Artifacts failed to load: {', '.join(failures)}")
+    backend.ensure_user_indexes_once()
+
+    if not hasattr(os, "fork"):
+        print("⚠️ os.fork is not available; serving from a single process")
+        make_server(args.host, args.port, backend.app, threaded=True).serve_forever()
+        return
+
+    gc.collect()
+    gc.freeze()
+
+    listener = socket.create_server((args.host, args.port), backlog=2048, reuse_port=False)
+    listener.set_inheritable(True)
+
+    workers = {spawn_worker(listener, args.host, args.port) for _ in range(args.workers)}
+    print(f"✅ Serving on http://{args.host}:{args.port} with {len(workers)} workers")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    # Supervise: restart workers that exit unexpectedly
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            print(f"⚠️ Worker {pid} exited with status {status}; restarting")
+            time.sleep(0.5)
+            workers.add(spawn_worker(listener, args.host, args.port))
+
+    listener.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""
+Background jobs for SHAP global summaries.
+
+A summary (beeswarm PNG plus the per-feature mean |SHAP| table) is computed in
+a separate process and written to disk under a key derived from the model and
+sample hashes. Job status is kept next to the result on disk, so any worker
+process can answer a status poll, and once a summary exists for the current
+model it is served straight from disk.
+"""
+import json
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+SUMMARY_PNG = "summary.png"
+SUMMARY_JSON = "summary.json"
+STATUS_JSON = "status.json"
+
+
+def make_shap_explainer(shap, model, X_train_sample, background_size):
+    """
+    Build a SHAP explainer for a model.
+
+    Tree ensembles (such as the importer GradientBoostingClassifier) get a
+    TreeExplainer over a small summarized background set, or the exact
+    tree-path-dependent algorithm when background_size is 0. Other models fall
+    back to the generic shap.Explainer.
+    """
+    if background_size > 0:
+        background = shap.utils.sample(X_train_sample, min(background_size, len(X_train_sample)), random_state=0)
+    else:
+        background = None
+
+    if hasattr(model, "estimators_"):
+        try:
+            if background is None:
+                return shap.TreeExplainer(model, feature_perturbation="tree_path_dependent")
+            return shap.TreeExplainer(model, data=background, feature_perturbation="interventional")
+        except Exception as e:
+            print(f"TreeExplainer not supported for {type(model).__name__}, using generic explainer: {e}")
+
+    return shap.Explainer(model, background if background is not None else X_train_sample)
+
+
+def write_json_atomic(path, payload):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def compute_shap_summary(job_dir, model_path, sample_path, background_size):
+    """
+    Compute a SHAP summary in a worker process and write it to job_dir.
+
+    Runs in a fresh (spawned) process, so it loads its own copies of the
+    model and sample and imports shap/matplotlib itself.
+    """
+    write_json_atomic(os.path.join(job_dir, STATUS_JSON), {"status": "running", "pid": os.getpid(), "updated_at": time.time()})
+    start = time.perf_counter()
+
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    import joblib
+    import matplotlib.pyplot as plt
+    import shap
+
+    model = joblib.load(model_path)
+    X_train_sample = joblib.load(sample_path)
+
+    # Compute SHAP values for the sample data
+    explainer = make_shap_explainer(shap, model, X_train_sample, background_size)
+    shap_values = explainer(X_train_sample)
+
+    # Mean |SHAP| per feature (averaged over outputs for multi-output explanations)
+    magnitudes = np.abs(shap_values.values)
+    if magnitudes.ndim == 3:
+        magnitudes = magnitudes.mean(axis=2)
+    mean_abs = magnitudes.mean(axis=0)
+    order = np.argsort(mean_abs)[::-1]
+    features = [{"feature": str(X_train_sample.columns[i]), "mean_abs_shap": float(mean_abs[i])} for i in order]
+
+    # Set figure size and adjust margins
+    plt.figure(figsize=(12, 8))
+    plt.subplots_adjust(left=0.1, right=0.9, top=0.9, bottom=0.1)
+
+    # Generate the summary plot
+    shap.summary_plot(shap_values, X_train_sample, show=False)
+
+    # Adjust layout and save
+    plt.tight_layout(pad=2.0)
+    tmp_png = os.path.join(job_dir, f"{SUMMARY_PNG}.{os.getpid()}.tmp")
+    plt.savefig(tmp_png, bbox_inches='tight', dpi=150, format="png")
+    plt.close()
+    os.replace(tmp_png, os.path.join(job_dir, SUMMARY_PNG))
+
+    summary = {
+        "features": features,
+        "n_rows": int(len(X_train_sample)),
+        "background_size": background_size,
+        "compute_ms": round((time.perf_counter() - start) * 1000, 1),
+        "created_at": time.time(),
+    }
+    # The summary JSON is written last: its presence marks the result as complete
+    write_json_atomic(os.path.join(job_dir, SUMMARY_JSON), summary)
+    write_json_atomic(os.path.join(job_dir, STATUS_JSON), {"status": "done", "updated_at": time.time()})
+    return summary
+
+
+class ShapSummaryJobs:
+    """
+    Runs SHAP summary jobs on a process pool, one job per summary key.
+
+    The job ID is the summary key itself, so submitting the same model twice
+    returns the existing job (or the finished summary) instead of starting a
+    second computation.
+    """
+
+    def __init__(self, cache_path, max_workers=1, stale_after_seconds=900):
+        self.cache_path = cache_path
+        self.max_workers = max_workers
+        self.stale_after_seconds = stale_after_seconds
+
+        self._executor = None
+        self._executor_pid = None
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Process pools do not survive fork, so each worker process creates its own.
+        # Spawned children start clean instead of inheriting the server's threads and sockets.
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            self._executor_pid = os.getpid()
+            self._futures = {}
+        return self._executor
+
+    def job_dir(self, job_id):
+        return os.path.join(self.cache_path, job_id)
+
+    def plot_path(self, job_id):
+        return os.path.join(self.job_dir(job_id), SUMMARY_PNG)
+
+    def load_summary(self, job_id):
+        """
+        Return the finished summary for job_id, or None if it does not exist yet.
+        """
+        try:
+            with open(os.path.join(self.job_dir(job_id), SUMMARY_JSON)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def submit(self, job_id, model_path, sample_path, background_size):
+        """
+        Start (or join) the summary job for job_id.
+
+        Returns:
+            The job status dictionary (see status())
+        """
+        with self._lock:
+            if self.load_summary(job_id) is not None:
+                return self.status(job_id)
+
+            future = self._futures.get(job_id) if self._executor_pid == os.getpid() else None
+            if future is not None and not future.done():
+                return self.status(job_id)
+
+            disk_status = self._read_status(job_id)
+            if disk_status and disk_status["status"] in ("queued", "running") and not self._is_stale(disk_status):
+                # Started by another worker process
+                return self.status(job_id)
+
+            job_dir = self.job_dir(job_id)
+            os.makedirs(job_dir, exist_ok=True)
+            write_json_atomic(os.path.join(job_dir, STATUS_JSON), {"status": "queued", "updated_at": time.time()})
+
+            executor = self._get_executor()
+            future = executor.submit(compute_shap_summary, job_dir, model_path, sample_path, background_size)
+            future.add_done_callback(lambda done, job_id=job_id: self._on_done(job_id, done))
+            self._futures[job_id] = future
+        return self.status(job_id)
+
+    def _on_done(self, job_id, future):
+        error = future.exception()
+        if error is not None:
+            print(f"❌ SHAP summary job {job_id} failed: {error}")
+            traceback.print_exception(type(error), error, error.__traceback__)
+            write_json_atomic(os.path.join(self.job_dir(job_id), STATUS_JSON),
+                              {"status": "failed", "error": str(error), "updated_at": time.time()})
+
+    def _read_status(self, job_id):
+        try:
+            with open(os.path.join(self.job_dir(job_id), STATUS_JSON)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _is_stale(self, disk_status):
+        return time.time() - disk_status.get("updated_at", 0) > self.stale_after_seconds
+
+    def status(self, job_id):
+        """
+        Status of a job: queued, running, done (with the summary), failed or unknown.
+        """
+        summary = self.load_summary(job_id)
+        if summary is not None:
+            return {"job_id": job_id, "status": "done", "summary": summary}
+
+        disk_status = self._read_status(job_id)
+        if disk_status is None:
+            return {"job_id": job_id, "status": "unknown"}
+
+        status = {"job_id": job_id, "status": disk_status["status"]}
+        if disk_status["status"] in ("queued", "running") and self._is_stale(disk_status):
+            status.update(status="failed", error="Job did not finish (worker stopped?)")
+        elif disk_status["status"] == "failed":
+            status["error"] = disk_status.get("error")
+        return status
@@ -0,0 +1,286 @@
+"""
+Seedable synthetic end-user transactions for retraining and load tests.
+
+EndUser_Generate_Synthetic_Data.ipynb builds one row per Python call. Here a
+TransactionDistribution holds the empirical distributions of the TCC sheet of
+the stock report: (Customer name, Product code) pairs with their frequencies,
+the quantiles of Issued Qty and the frequency of each Transaction Date. A
+TransactionGenerator samples whole columns from it with NumPy, one chunk at a
+time, so millions of rows can be written to Parquet, NDJSON or CSV with memory
+bounded by the chunk size. Chunk i is drawn from a generator seeded with
+(seed, i), so the same seed and chunk size always give the same rows.
+
+Without a stock report, the customers and products come from the end-user
+label encoders (all pairs equally likely) and the quantity and date ranges
+from the notebook.
+
+In a notebook (retraining):
+    from synthetic_transactions import TransactionDistribution, TransactionGenerator
+    distribution = TransactionDistribution.from_report("Stock report Combined.xlsx")
+    synthetic = TransactionGenerator(distribution, seed=42).generate(2000)
+
+Usage:
+    python synthetic_transactions.py --rows 5000000 --output transactions.parquet
+                                     [--source "Stock report Combined.xlsx"] [--seed 0] [--chunk-rows 500000] [--api-names]
+"""
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from bulk_io import END_USER_COLUMNS, FORMATS, detect_format, normalize_end_user_columns
+from process_stats import peak_memory
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+END_USER_LABEL_ENCODERS_PATH = os.path.join(BASE_PATH, "Encoders", "End-User-Risk", "End_User_Label_Encoder.pkl")
+
+# Ranges used by the synthetic data notebook
+DEFAULT_QUANTITY_RANGE = (100, 3500)
+DEFAULT_DATE_RANGE = ("2024-11-06", "2025-02-09")
+QUANTILES = 101
+
+
+class TransactionDistribution:
+    """
+    Empirical distribution of end-user transactions.
+
+    Args:
+        customers: Customer names
+        products: Product codes
+        pairs: (customer index, product index) rows that can be drawn
+        pair_weights: Probability of each pair
+        quantity_quantiles: Issued Qty at evenly spaced probability levels (0 to 1)
+        integer_quantities: Whether quantities are rounded to whole numbers
+        dates: Transaction dates (datetime64[D])
+        date_weights: Probability of each date
+    """
+
+    def __init__(self, customers, products, pairs, pair_weights, quantity_quantiles, integer_quantities, dates, date_weights):
+        self.customers = np.asarray(customers, dtype=object)
+        self.products = np.asarray(products, dtype=object)
+        self.pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+        self.pair_weights = np.asarray(pair_weights, dtype=np.float64)
+        self.quantity_quantiles = np.asarray(quantity_quantiles, dtype=np.float64)
+        self.integer_quantities = integer_quantities
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.date_weights = np.asarray(date_weights, dtype=np.float64)
+        if len(self.pairs) == 0 or len(self.dates) == 0:
+            raise ValueError("The distribution needs at least one customer/product pair and one date")
+
+    @classmethod
+    def from_frame(cls, frame, quantiles=QUANTILES):
+        """
+        Distribution of the transactions in a DataFrame (stock report headers or API field names).
+        """
+        frame = normalize_end_user_columns(frame)
+        missing = [col for col in END_USER_COLUMNS.values() if col not in frame.columns]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+        quantities = pd.to_numeric(frame["Issued Qty"], errors="coerce")
+        dates = pd.to_datetime(frame["Transaction Date"], errors="coerce", format="mixed")
+        rows = frame[["Customer name", "Product code"]].assign(quantity=quantities, date=dates.dt.normalize()).dropna()
+        if rows.empty:
+            raise ValueError("No complete transactions to build the distribution from")
+
+        customer_codes, customers = pd.factorize(rows["Customer name"])
+        product_codes, products = pd.factorize(rows["Product code"])
+        pairs, pair_counts = np.unique(np.column_stack([customer_codes, product_codes]), axis=0, return_counts=True)
+        date_counts = rows["date"].value_counts().sort_index()
+        return cls(
+            customers, products, pairs, pair_counts / pair_counts.sum(),
+            np.quantile(rows["quantity"].to_numpy(), np.linspace(0, 1, quantiles)),
+            bool((rows["quantity"] % 1 == 0).all()),
+            date_counts.index.to_numpy().astype("datetime64[D]"), date_counts.to_numpy() / date_counts.sum(),
+        )
+
+    @classmethod
+    def from_report(cls, path, sheet_name="TCC"):
+        """
+        Distribution of a stock report workbook sheet (or a CSV/Parquet export of it).
+        """
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".csv":
+            frame = pd.read_csv(path)
+        elif extension in (".parquet", ".pq"):
+            frame = pd.read_parquet(path)
+        else:
+            frame = pd.read_excel(path, sheet_name=sheet_name)
+        return cls.from_frame(frame)
+
+    @classmethod
+    def uniform(cls, customers, products, quantity_range=DEFAULT_QUANTITY_RANGE, date_range=DEFAULT_DATE_RANGE):
+        """
+        Every customer/product pair, quantity and date in the ranges equally likely.
+        """
+        customer_codes, product_codes = np.meshgrid(np.arange(len(customers)), np.arange(len(products)), indexing="ij")
+        pairs = np.column_stack([customer_codes.ravel(), product_codes.ravel()])
+        dates = np.arange(np.datetime64(date_range[0], "D"), np.datetime64(date_range[1], "D"))
+        return cls(
+            customers, products, pairs, np.full(len(pairs), 1.0 / len(pairs)),
+            np.linspace(quantity_range[0], quantity_range[1], QUANTILES), True,
+            dates, np.full(len(dates), 1.0 / len(dates)),
+        )
+
+    @classmethod
+    def from_label_encoders(cls, encoders, **kwargs):
+        """
+        Uniform distribution over the customers and products the end-user model was trained on.
+        """
+        customers = [value for value in encoders["Customer name"].classes_ if str(value) != "nan"]
+        products = [value for value in encoders["Product code"].classes_ if str(value) != "nan"]
+        return cls.uniform(customers, products, **kwargs)
+
+    def sample(self, rng, rows):
+        """
+        Draw rows transactions as a DataFrame with the stock report headers.
+        """
+        pairs = self.pairs[rng.choice(len(self.pairs), size=rows, p=self.pair_weights)]
+        quantities = np.interp(rng.random(rows), np.linspace(0, 1, len(self.quantity_quantiles)), self.quantity_quantiles)
+        if self.integer_quantities:
+            quantities = np.rint(quantities).astype(np.int64)
+        dates = self.dates[rng.choice(len(self.dates), size=rows, p=self.date_weights)]
+        return pd.DataFrame({
+            "Customer name": self.customers[pairs[:, 0]],
+            "Issued Qty": quantities,
+            "Transaction Date": np.datetime_as_string(dates, unit="D"),
+            "Product code": self.products[pairs[:, 1]],
+        })
+
+
+class TransactionGenerator:
+    """
+    Samples transactions from a TransactionDistribution in seeded chunks.
+
+    Args:
+        distribution: TransactionDistribution to sample from
+        seed: Seed; chunk i is drawn with numpy.random.default_rng((seed, i))
+        chunk_rows: Rows per chunk
+        api_names: Name the columns customer_name, issued_qty, ... (the /predict-risk fields)
+    """
+
+    def __init__(self, distribution, seed=0, chunk_rows=100_000, api_names=False):
+        self.distribution = distribution
+        self.seed = seed
+        self.chunk_rows = chunk_rows
+        self.api_names = api_names
+
+    def chunk(self, index, rows=None):
+        """
+        Chunk number index (chunk_rows rows, or rows if given).
+        """
+        chunk = self.distribution.sample(np.random.default_rng((self.seed, index)), rows or self.chunk_rows)
+        if self.api_names:
+            chunk = chunk.rename(columns={col: name for name, col in END_USER_COLUMNS.items()})
+        return chunk
+
+    def chunks(self, rows):
+        """
+        Yield DataFrames of at most chunk_rows rows, rows rows in total.
+        """
+        for index, start in enumerate(range(0, rows, self.chunk_rows)):
+            yield self.chunk(index, min(self.chunk_rows, rows - start))
+
+    def generate(self, rows):
+        """
+        All rows in one DataFrame (for sizes that fit in memory).
+        """
+        return pd.concat(list(self.chunks(rows)), ignore_index=True)
+
+    def records(self, rows, index=0):
+        """
+        Rows of chunk number index as /predict-risk request bodies (API field names, string quantities).
+        """
+        chunk = self.distribution.sample(np.random.default_rng((self.seed, index)), rows)
+        return [
+            {"customer_name": customer, "issued_qty": str(quantity), "transaction_date": date, "product_code": product}
+            for customer, quantity, date, product in zip(
+                chunk["Customer name"], chunk["Issued Qty"], chunk["Transaction Date"], chunk["Product code"]
+            )
+        ]
+
+    def write(self, path, rows, fmt=None, progress=None):
+        """
+        Stream rows transactions to a CSV, NDJSON or Parquet file.
+
+        Args:
+            progress: Optional callable(rows written so far)
+
+        Returns:
+            Number of rows written
+        """
+        fmt = fmt or detect_format(path=path)
+        if fmt not in FORMATS:
+            raise ValueError(f"Invalid format '{fmt}'. Expected one of: {', '.join(FORMATS)}")
+
+        written = 0
+        if fmt == "parquet":
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError as e:
+                raise ValueError("Parquet output requires pyarrow (pip install pyarrow)") from e
+            writer = None
+            try:
+                for chunk in self.chunks(rows):
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(path, table.schema)
+                    writer.write_table(table)
+                    written += len(chunk)
+                    if progress is not None:
+                        progress(written)
+            finally:
+                if writer is not None:
+                    writer.close()
+            return written
+
+        with open(path, "w", newline="") as f:
+            for chunk in self.chunks(rows):
+                if fmt == "csv":
+                    chunk.to_csv(f, header=written == 0, index=False)
+                else:
+                    f.write(chunk.to_json(orient="records", lines=True, force_ascii=False))
+                written += len(chunk)
+                if progress is not None:
+                    progress(written)
+        return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--output", required=True, help="Output file (.parquet, .csv or .ndjson/.jsonl)")
+    parser.add_argument("--format", choices=FORMATS, help="Output format (default: from the extension)")
+    parser.add_argument("--source", help="Stock report (.xlsx TCC sheet, or a .csv/.parquet export) to take the distributions from "
+                                         "(default: the end-user label encoders)")
+    parser.add_argument("--sheet", default="TCC")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-rows", type=int, default=500_000)
+    parser.add_argument("--api-names", action="store_true", help="Use the API field names as column names")
+    args = parser.parse_args()
+
+    if args.source:
+        distribution = TransactionDistribution.from_report(args.source, sheet_name=args.sheet)
+    else:
+        distribution = TransactionDistribution.from_label_encoders(joblib.load(END_USER_LABEL_ENCODERS_PATH))
+    generator = TransactionGenerator(distribution, seed=args.seed, chunk_rows=args.chunk_rows, api_names=args.api_names)
+
+    start = time.perf_counter()
+    try:
+        written = generator.write(args.output, args.rows, fmt=args.format,
+                                  progress=lambda rows: print(f"\r{rows} rows written", end="", file=sys.stderr))
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    print(f"\n✅ Wrote {written} transactions to {args.output} in {elapsed:.2f} s "
+          f"({written / elapsed:.0f} rows/s{peak_memory()})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
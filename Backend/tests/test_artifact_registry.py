@@ -0,0 +1,72 @@
+"""
+Release swaps of ArtifactRegistry: pinned states and overlapping activations.
+"""
+import threading
+
+from artifact_registry import ArtifactRegistry
+
+
+def make_registry(tmp_path):
+    registry = ArtifactRegistry(default_loader=lambda path: open(path).read())
+    for family in ("a", "b"):
+        path = tmp_path / f"{family}-default"
+        path.write_text(f"{family} default")
+        registry.register(family, str(path), family=family)
+    return registry
+
+
+def make_release(tmp_path, family, version):
+    path = tmp_path / f"{family}-{version}"
+    path.write_text(f"{family} {version}")
+    return {"version": version, "paths": {family: str(path)}, "manifest": {}}
+
+
+def test_pinned_state_keeps_its_release(tmp_path):
+    registry = make_registry(tmp_path)
+    registry.activate_release("a", make_release(tmp_path, "a", "v1"))
+    registry.pin()
+    try:
+        registry.activate_release("a", make_release(tmp_path, "a", "v2"))
+        assert registry.get("a") == "a v1"
+        assert registry.version("a") == "v1"
+    finally:
+        registry.unpin()
+    assert registry.get("a") == "a v2"
+    assert registry.version("a") == "v2"
+
+
+def test_overlapping_activations_keep_both_releases(tmp_path):
+    registry = make_registry(tmp_path)
+    staging_b, finish_b = threading.Event(), threading.Event()
+
+    def slow_stage(family):
+        if family == "b":
+            staging_b.set()
+            assert finish_b.wait(5)
+
+    registry.on_stage(slow_stage)
+    activation_b = threading.Thread(target=registry.activate_release, args=("b", make_release(tmp_path, "b", "v1")))
+    activation_b.start()
+    assert staging_b.wait(5)
+
+    # Family a is swapped in while b is still being staged
+    registry.activate_release("a", make_release(tmp_path, "a", "v1"))
+    finish_b.set()
+    activation_b.join(5)
+
+    assert registry.release("a")["version"] == "v1"
+    assert registry.get("a") == "a v1"
+    assert registry.release("b")["version"] == "v1"
+    assert registry.get("b") == "b v1"
+
+
+def test_failed_preload_keeps_the_previous_release(tmp_path):
+    registry = make_registry(tmp_path)
+    registry.activate_release("a", make_release(tmp_path, "a", "v1"))
+    broken = {"version": "v2", "paths": {"a": str(tmp_path / "missing")}, "manifest": {}}
+    try:
+        registry.activate_release("a", broken)
+    except Exception:
+        pass
+    assert registry.release("a")["version"] == "v1"
+    assert registry.get("a") == "a v1"
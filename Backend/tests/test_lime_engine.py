@@ -0,0 +1,61 @@
+"""
+Batched LIME explanations must match lime's own explain_instance, row by row.
+
+explain_batch draws the perturbations through lime's private sampler, so these
+tests catch a lime release that changes it.
+"""
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+import lime_engine
+from lime_engine import LimeExplanationEngine
+
+
+@pytest.fixture(scope="module")
+def engine():
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.normal(size=500), rng.integers(0, 2, 500), rng.uniform(0, 100, 500)])
+    y = (X[:, 0] + X[:, 1] - X[:, 2] / 50 > 0).astype(int)
+    model = LogisticRegression().fit(X, y)
+    return LimeExplanationEngine(X, ["a", "b", "c"], ["low", "high"], model.predict_proba, training_labels=y,
+                                 default_num_samples=500)
+
+
+def stock_explanations(engine, rows, random_state, **options):
+    resolved = engine.resolve_options(**options)
+    explainer = engine.get_explainer(resolved["discretize_continuous"], resolved["discretizer"])
+    seeds = np.random.default_rng(random_state).integers(0, 2**31 - 1, size=len(rows))
+    return [
+        engine._summarize(engine._fork(explainer, seed, resolved["feature_selection"]).explain_instance(
+            row, engine.predict_proba, num_features=resolved["num_features"], num_samples=resolved["num_samples"]))
+        for row, seed in zip(rows, seeds)
+    ]
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"discretize_continuous": False},
+    {"discretizer": "decile", "feature_selection": "highest_weights"},
+])
+def test_explain_batch_matches_explain_instance(engine, options):
+    rows = engine.training_data[:6]
+    assert engine.explain_batch(rows, random_state=7, **options) == stock_explanations(engine, rows, 7, **options)
+
+
+def test_explain_batch_falls_back_without_the_private_sampler(engine, monkeypatch):
+    rows = engine.training_data[:3]
+    expected = engine.explain_batch(rows, random_state=1)
+    monkeypatch.setattr(lime_engine, "DATA_INVERSE", "_missing_sampler")
+    assert engine.explain_batch(rows, random_state=1) == expected
+
+
+@pytest.mark.parametrize("value, expected", [(True, True), (False, False), ("false", False), ("0", False), ("Yes", True)])
+def test_discretize_continuous_parsing(engine, value, expected):
+    assert engine.resolve_options(discretize_continuous=value)["discretize_continuous"] is expected
+
+
+@pytest.mark.parametrize("value", ["maybe", 2, None])
+def test_discretize_continuous_rejects_other_values(engine, value):
+    with pytest.raises(ValueError):
+        engine.resolve_options(discretize_continuous=value)
@@ -0,0 +1,37 @@
+"""
+The vectorized recipe stages must match the original row-wise implementations
+(kept in benchmarks/bench_recipe_pipeline.py) exactly.
+"""
+import numpy as np
+import pytest
+
+from benchmarks.bench_recipe_pipeline import (
+    legacy_determine_risk_level, legacy_preprocess_new_recipe, make_recipes, make_scores,
+)
+from recipe_pipeline import determine_risk_levels, preprocess_new_recipe
+
+
+@pytest.fixture(params=[0, 1, 2])
+def rng(request):
+    return np.random.default_rng(request.param)
+
+
+def test_preprocess_new_recipe_matches_row_wise(rng):
+    recipes = make_recipes(2000, rng)
+    expected = legacy_preprocess_new_recipe(recipes.copy())["Combined Recipe"].tolist()
+    assert preprocess_new_recipe(recipes.copy())["Combined Recipe"].tolist() == expected
+
+
+def test_preprocess_new_recipe_keeps_row_order_and_extra_columns(rng):
+    recipes = make_recipes(50, rng).iloc[::-1]
+    recipes["id"] = np.arange(len(recipes))
+    processed = preprocess_new_recipe(recipes.copy())
+    assert processed["id"].tolist() == recipes["id"].tolist()
+    assert processed["Combined Recipe"].tolist() == legacy_preprocess_new_recipe(recipes.copy())["Combined Recipe"].tolist()
+
+
+def test_determine_risk_levels_matches_row_wise(rng):
+    # make_scores puts a share of the scores on the band edges and NaN
+    scores = make_scores(5000, rng)
+    expected = scores.apply(legacy_determine_risk_level, axis=1).tolist()
+    assert determine_risk_levels(scores).tolist() == expected
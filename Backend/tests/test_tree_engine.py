@@ -0,0 +1,158 @@
+"""
+Parity of the compiled tree engine (tree_engine.py) with scikit-learn.
+
+Each model is compiled with CompiledTreeEnsemble.from_model and compared with
+sklearn's predict / predict_proba on rows around and exactly on its split
+thresholds, and with missing values where sklearn accepts them. Small models
+fitted here cover every supported type, including trees deeper than
+COMPACT_MIN_DEPTH (the compacting path of _walk); the pickled backend models
+are checked too when present. Timings are in benchmarks/bench_tree_engine.py.
+"""
+import os
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import (
+    GradientBoostingClassifier,
+    GradientBoostingRegressor,
+    RandomForestClassifier,
+    RandomForestRegressor,
+)
+from sklearn.multioutput import MultiOutputRegressor
+
+from tree_engine import CompiledTreeEnsemble
+
+BACKEND_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOLERANCE = 1e-9
+
+# Pickled models served through the compiled engine (app.COMPILED_TREE_MODELS) and the recipe regressor
+PICKLED_MODELS = {
+    "rf_model": os.path.join("Models", "End-User-Risk", "Random_forest_model.pkl"),
+    "clf": os.path.join("Models", "Importer-Risk", "gradient_boost_classifier.pkl"),
+    "reg": os.path.join("Models", "Importer-Risk", "gradient_boost_regressor.pkl"),
+    "recipe_regressor": os.path.join("Models", "Receipe-Analyser", "multi_output_regressor_model.pkl"),
+}
+
+
+def training_data(rng, n_rows=3000, n_features=6):
+    X = rng.normal(size=(n_rows, n_features))
+    # Integer-valued columns like the label-encoded features, so rows can sit exactly on thresholds
+    X[:, :2] = rng.integers(0, 20, size=(n_rows, 2))
+    signal = X[:, 0] - 2 * X[:, 2] + np.sin(3 * X[:, 3]) + rng.normal(scale=0.5, size=n_rows)
+    return X, signal
+
+
+def threshold_rows(engine, n_features, n_rows, rng):
+    """
+    Rows with every value on a split threshold of its feature (after the float32 cast) or just next to one.
+    """
+    split = ~engine._is_leaf
+    features = engine.feature[split]
+    thresholds = engine.threshold[split].astype(np.float32).astype(np.float64)
+    rows = rng.normal(size=(n_rows, n_features))
+    for j in range(n_features):
+        on_feature = thresholds[features == j]
+        if len(on_feature):
+            rows[:, j] = on_feature[rng.integers(0, len(on_feature), n_rows)]
+    nudged = rng.random(rows.shape) < 0.3
+    rows[nudged] = np.nextafter(rows[nudged].astype(np.float32), np.float32(np.inf)).astype(np.float64)
+    return rows
+
+
+def as_model_input(model, rows):
+    names = getattr(model, "feature_names_in_", None)
+    return rows if names is None else pd.DataFrame(rows, columns=names)
+
+
+def assert_parity(model, engine, rows):
+    X = as_model_input(model, rows)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        if hasattr(model, "predict_proba"):
+            np.testing.assert_allclose(engine.predict_proba(X), model.predict_proba(X), rtol=0, atol=TOLERANCE)
+            np.testing.assert_array_equal(engine.predict(X), model.predict(X))
+        else:
+            expected = model.predict(X)
+            np.testing.assert_allclose(engine.predict(X), expected, rtol=0,
+                                       atol=TOLERANCE * max(1.0, float(np.max(np.abs(expected)))))
+
+
+def check_model(model, rng, tmp_path=None):
+    engine = CompiledTreeEnsemble.from_model(model)
+    n_features = int(model.n_features_in_)
+    rows = threshold_rows(engine, n_features, 3000, rng)
+    assert_parity(model, engine, rows)
+
+    # Missing values, where the sklearn model accepts them
+    missing = np.where(rng.random(rows.shape) < 0.2, np.nan, rows)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            model.predict(as_model_input(model, missing[:1]))
+    except ValueError:
+        pass
+    else:
+        assert_parity(model, engine, missing)
+
+    # Memory-mapped copy, as written by `mapped_artifacts.py convert`
+    if tmp_path is not None:
+        path = tmp_path / "engine.joblib"
+        engine.save(str(path))
+        assert_parity(model, CompiledTreeEnsemble.load(str(path)), rows)
+    return engine
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.mark.parametrize("max_depth", [4, None])
+def test_random_forest_classifier(rng, max_depth, tmp_path):
+    X, signal = training_data(rng)
+    y = np.digitize(signal, [-1.0, 1.0])  # three classes
+    model = RandomForestClassifier(n_estimators=20, max_depth=max_depth, random_state=0).fit(X, y)
+    engine = check_model(model, rng, tmp_path)
+    if max_depth is None:
+        assert engine.max_depth > CompiledTreeEnsemble.COMPACT_MIN_DEPTH
+
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+def test_gradient_boosting_classifier(rng, n_classes, tmp_path):
+    X, signal = training_data(rng)
+    y = np.digitize(signal, np.quantile(signal, np.linspace(0, 1, n_classes + 1)[1:-1]))
+    model = GradientBoostingClassifier(n_estimators=30, max_depth=3, random_state=0).fit(X, y)
+    check_model(model, rng, tmp_path)
+
+
+def test_gradient_boosting_regressor_deep(rng, tmp_path):
+    X, signal = training_data(rng)
+    model = GradientBoostingRegressor(n_estimators=20, max_depth=12, random_state=0).fit(X, signal)
+    engine = check_model(model, rng, tmp_path)
+    assert engine.max_depth > CompiledTreeEnsemble.COMPACT_MIN_DEPTH
+
+
+def test_multi_output_random_forest_regressor(rng, tmp_path):
+    X, signal = training_data(rng)
+    Y = np.column_stack([signal, signal ** 2, X[:, 1] * 3])
+    model = MultiOutputRegressor(RandomForestRegressor(n_estimators=10, random_state=0)).fit(X, Y)
+    # One engine per output, as the multi-output wrapper holds one forest per output
+    engines = [check_model(estimator, rng) for estimator in model.estimators_]
+    assert max(engine.max_depth for engine in engines) > CompiledTreeEnsemble.COMPACT_MIN_DEPTH
+
+    rows = threshold_rows(engines[0], X.shape[1], 2000, rng)
+    compiled = np.column_stack([engine.predict(rows) for engine in engines])
+    np.testing.assert_allclose(compiled, model.predict(rows), rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize("name", list(PICKLED_MODELS))
+def test_pickled_models(name, rng):
+    path = os.path.join(BACKEND_PATH, PICKLED_MODELS[name])
+    if not os.path.exists(path):
+        pytest.skip(f"{PICKLED_MODELS[name]} is not available")
+    model = joblib.load(path)
+    for estimator in model.estimators_ if isinstance(model, MultiOutputRegressor) else [model]:
+        check_model(estimator, rng)
@@ -0,0 +1,256 @@
+import joblib
+import numpy as np
+
+from sklearn.dummy import DummyClassifier, DummyRegressor
+from sklearn.ensemble import (
+    GradientBoostingClassifier,
+    GradientBoostingRegressor,
+    RandomForestClassifier,
+    RandomForestRegressor,
+)
+
+TREE_LEAF = -1
+
+
+class CompiledTreeEnsemble:
+    """
+    Flat-array inference engine for fitted scikit-learn tree ensembles.
+
+    All trees of a RandomForest or GradientBoosting model are flattened into one
+    set of contiguous node arrays (feature, threshold, left/right child,
+    missing-value direction, leaf value). Leaves point to themselves, so a batch
+    of rows walks every tree at once in max_depth vectorized steps without
+    per-estimator dispatch or sklearn input validation.
+
+    Inputs are cast to float32 before the threshold comparison, as sklearn does,
+    so split decisions match the pickled models exactly.
+    """
+
+    ARRAY_FIELDS = ("feature", "threshold", "left", "right", "missing_left", "value", "roots")
+    # Rows walked together; keeps the per-level gathers cache-sized
+    CHUNK_ROWS = 1024
+    COMPACT_MIN_DEPTH = 8
+
+    def __init__(self, kind, feature, threshold, left, right, missing_left, value, roots, max_depth,
+                 n_features, feature_names=None, classes=None, init_raw=None, learning_rate=1.0):
+        self.kind = kind
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.feature_names = feature_names
+        self.classes = classes
+        self.init_raw = init_raw
+        self.learning_rate = learning_rate
+
+        # Traversal tables: children interleaved as (right, left) so one take() follows a split,
+        # and a leaf mask (leaves point to themselves)
+        self._children = np.empty(2 * len(left), dtype=np.intp)
+        self._children[0::2] = right
+        self._children[1::2] = left
+        self._feature = np.asarray(feature, dtype=np.intp)
+        self._is_leaf = left == np.arange(len(left))
+        self._value_columns = [np.ascontiguousarray(value[:, k]) for k in range(value.shape[1])]
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        Compile a fitted RandomForest{Classifier,Regressor} or GradientBoosting{Classifier,Regressor}.
+
+        Raises:
+            ValueError: If the model type (or its init estimator) is not supported
+        """
+        if isinstance(model, (RandomForestClassifier, RandomForestRegressor)):
+            kind = "forest_classifier" if isinstance(model, RandomForestClassifier) else "forest_regressor"
+            trees = [(est.tree_, None) for est in model.estimators_]
+            n_outputs = len(model.classes_) if kind == "forest_classifier" else 1
+            if kind == "forest_classifier" and model.n_outputs_ != 1:
+                raise ValueError("Multi-output forests are not supported")
+            init_raw, learning_rate = None, 1.0
+        elif isinstance(model, (GradientBoostingClassifier, GradientBoostingRegressor)):
+            kind = "boosting_classifier" if isinstance(model, GradientBoostingClassifier) else "boosting_regressor"
+            estimators = model.estimators_[:model.n_estimators_]
+            # One tree per boosting stage and raw output column (K columns for K > 2 classes)
+            trees = [(est.tree_, k) for stage in estimators for k, est in enumerate(stage)]
+            n_outputs = estimators.shape[1]
+            if not (model.init_ == "zero" or isinstance(model.init_, (DummyClassifier, DummyRegressor))):
+                raise ValueError(f"Unsupported init estimator: {model.init_!r}")
+            # A constant init estimator gives the same raw prediction for every row
+            init_raw = np.asarray(model._raw_predict_init(np.zeros((1, model.n_features_in_))), dtype=np.float64)[0]
+            learning_rate = float(model.learning_rate)
+        else:
+            raise ValueError(f"Unsupported model type: {type(model).__name__}")
+
+        node_counts = [tree.node_count for tree, _ in trees]
+        offsets = np.concatenate([[0], np.cumsum(node_counts)[:-1]]).astype(np.int64)
+        n_nodes = int(sum(node_counts))
+
+        feature = np.zeros(n_nodes, dtype=np.int32)
+        threshold = np.zeros(n_nodes, dtype=np.float64)
+        left = np.zeros(n_nodes, dtype=np.int32)
+        right = np.zeros(n_nodes, dtype=np.int32)
+        missing_left = np.zeros(n_nodes, dtype=bool)
+        value = np.zeros((n_nodes, n_outputs), dtype=np.float64)
+
+        for (tree, column), offset in zip(trees, offsets):
+            nodes = slice(offset, offset + tree.node_count)
+            own = np.arange(offset, offset + tree.node_count, dtype=np.int32)
+            is_leaf = tree.children_left == TREE_LEAF
+
+            feature[nodes] = np.where(is_leaf, 0, tree.feature)
+            threshold[nodes] = tree.threshold
+            left[nodes] = np.where(is_leaf, own, tree.children_left + offset)
+            right[nodes] = np.where(is_leaf, own, tree.children_right + offset)
+            missing_go_to_left = getattr(tree, "missing_go_to_left", None)
+            if missing_go_to_left is not None:
+                missing_left[nodes] = missing_go_to_left.astype(bool)
+
+            if column is None and kind == "forest_classifier":
+                # Per-tree class probabilities, normalized as DecisionTreeClassifier.predict_proba does
+                leaf_values = tree.value[:, 0, :]
+                totals = leaf_values.sum(axis=1, keepdims=True)
+                totals[totals == 0.0] = 1.0
+                value[nodes] = leaf_values / totals
+            elif column is None:
+                value[nodes, 0] = tree.value[:, 0, 0]
+            else:
+                value[nodes, column] = tree.value[:, 0, 0]
+
+        feature_names = getattr(model, "feature_names_in_", None)
+        return cls(
+            kind=kind,
+            feature=feature,
+            threshold=threshold,
+            left=left,
+            right=right,
+            missing_left=missing_left,
+            value=value,
+            roots=offsets.astype(np.int32),
+            max_depth=max(tree.max_depth for tree, _ in trees),
+            n_features=int(model.n_features_in_),
+            feature_names=None if feature_names is None else list(feature_names),
+            classes=getattr(model, "classes_", None),
+            init_raw=init_raw,
+            learning_rate=learning_rate,
+        )
+
+    @property
+    def feature_names_in_(self):
+        # Same attribute name as the sklearn model, so callers can use either
+        if self.feature_names is None:
+            raise AttributeError("Model was fitted without feature names")
+        return np.asarray(self.feature_names, dtype=object)
+
+    def save(self, path):
+        """
+        Write the flat arrays uncompressed so they can be loaded with mmap_mode='r'.
+        """
+        state = {name: getattr(self, name) for name in self.ARRAY_FIELDS}
+        state.update(kind=self.kind, max_depth=self.max_depth, n_features=self.n_features,
+                     feature_names=self.feature_names, classes=self.classes,
+                     init_raw=self.init_raw, learning_rate=self.learning_rate)
+        joblib.dump(state, path)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        return cls(**joblib.load(path, mmap_mode=mmap_mode))
+
+    def _as_matrix(self, X):
+        if self.feature_names is not None and hasattr(X, "columns"):
+            X = X[self.feature_names]
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input with {self.n_features} features, got shape {X.shape}")
+        return X
+
+    def _walk(self, X):
+        """
+        Leaf node indices for a chunk of rows, flattened row-major to (n_rows * n_trees,).
+        """
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        values = X.ravel()
+        nodes = np.tile(self.roots.astype(np.intp), n_rows)
+        row_offsets = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, n_trees)
+
+        # Deep forests: drop (row, tree) pairs that reached a leaf so later levels do less work.
+        # Shallow boosting trees finish in a few levels, where compaction costs more than it saves.
+        compact = self.max_depth > self.COMPACT_MIN_DEPTH
+        active = np.arange(len(nodes)) if compact else None
+        current, offsets = nodes, row_offsets
+        has_missing = bool(np.isnan(values).any())
+
+        for _ in range(self.max_depth):
+            x = values.take(offsets + self._feature.take(current))
+            go_left = x <= self.threshold.take(current)
+            if has_missing:
+                go_left = np.where(np.isnan(x), self.missing_left.take(current), go_left)
+            current = self._children.take(2 * current + go_left)
+
+            if compact:
+                nodes[active] = current
+                unfinished = ~self._is_leaf.take(current)
+                if not unfinished.all():
+                    active, current, offsets = active[unfinished], current[unfinished], offsets[unfinished]
+                    if len(active) == 0:
+                        break
+
+        return nodes if compact else current
+
+    def _chunks(self, X):
+        X = self._as_matrix(X)
+        for start in range(0, X.shape[0], self.CHUNK_ROWS):
+            yield X[start:start + self.CHUNK_ROWS]
+
+    def apply(self, X):
+        """
+        Leaf node index (into the flat arrays) of every row in every tree.
+
+        Returns:
+            int array of shape (n_rows, n_trees)
+        """
+        n_trees = len(self.roots)
+        leaves = [self._walk(chunk).reshape(-1, n_trees) for chunk in self._chunks(X)]
+        return np.concatenate(leaves) if leaves else np.empty((0, n_trees), dtype=np.intp)
+
+    def raw_predict(self, X):
+        """
+        Averaged leaf values (forests) or raw boosting scores (gradient boosting).
+
+        Returns:
+            float array of shape (n_rows, n_outputs)
+        """
+        n_trees = len(self.roots)
+        parts = []
+        for chunk in self._chunks(X):
+            leaves = self._walk(chunk)
+            parts.append(np.column_stack([
+                column.take(leaves).reshape(len(chunk), n_trees).sum(axis=1) for column in self._value_columns
+            ]))
+        leaf_values = np.concatenate(parts) if parts else np.empty((0, self.value.shape[1]))
+        if self.kind.startswith("forest"):
+            return leaf_values / n_trees
+        return self.init_raw + self.learning_rate * leaf_values
+
+    def predict_proba(self, X):
+        raw = self.raw_predict(X)
+        if self.kind == "forest_classifier":
+            return raw
+        if self.kind != "boosting_classifier":
+            raise AttributeError("predict_proba is only available for classifiers")
+        if raw.shape[1] == 1:
+            # Binary log-loss: the single raw column is the log-odds of the positive class
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        exp = np.exp(raw - raw.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        if self.kind.endswith("regressor"):
+            return self.raw_predict(X)[:, 0]
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
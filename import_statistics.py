@@ -0,0 +1,296 @@
+"""
+Cleaning pipeline for the IMPORT STATISTICS workbook, with a columnar stage cache.
+
+The preprocessing notebooks (CCRPM_Preprocessing.ipynb, DSGP_with_K_mean+DBSCAN.ipynb)
+start with the same steps: strip whitespace from the text columns, remove full
+stops from the categorical columns, upper-case COUNTRY and UNIT, map KGS to KG
+and pad HSCODE with trailing zeros to a common length. They are implemented here
+as vectorized column operations, one stage each.
+
+The parsed workbook and the output of every stage are written to the cache
+directory as Parquet files. A stage's key is a hash of the source file's
+contents and the names, versions and options of that stage and every stage
+before it, so after changing only a late stage a re-run reads the last valid
+result from the cache and skips the Excel parse and all earlier stages.
+
+With imputation_path, the fitted ImputationStage saved by Backend/imputation.py
+(ImputationStage.save) runs as a last stage, so new data gets the same
+imputation as the data the stage was fitted on. The file's digest is part of
+the stage key, so refitting it invalidates only that stage. The imputation
+module must be importable to load the file: add Backend to PYTHONPATH
+(PYTHONPATH=Backend python import_statistics.py ... --imputation ...).
+
+In a notebook:
+    from import_statistics import ImportStatisticsPipeline
+    data = ImportStatisticsPipeline("IMPORT STATISTICS - 2023.xlsx", imputation_path="imputation.joblib").run()
+
+Usage:
+    python import_statistics.py "IMPORT STATISTICS - 2023.xlsx" [--output cleaned.parquet] [--no-cache]
+                                [--imputation imputation.joblib]
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+INGESTION_CACHE_PATH = os.getenv("INGESTION_CACHE_PATH", os.path.join(BASE_PATH, ".ingestion-cache"))
+
+# Categorical columns of the workbook (the notebooks' categorical_features)
+CATEGORICAL_COLUMNS = ["IMPORTER", "MONTH", "COUNTRY", "HSCODE", "UNIT", "DESCRIPTION_01", "DESCRIPTION_02", "DESCRIPTION_03"]
+NUMERICAL_COLUMNS = ["YEAR", "QUANTITY", "VALUE_RS"]
+
+# Version of the parse step; bump it when read_source changes so old caches are not reused
+PARSE_VERSION = 1
+
+# fingerprint: optional extra input to the stage's cache key, e.g. the digest of a file the stage reads
+Stage = namedtuple("Stage", ["name", "function", "options", "version", "fingerprint"], defaults=(None,))
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def text_columns(data):
+    """
+    Columns holding text: object columns, and string columns (the default text dtype from pandas 3).
+    """
+    return [col for col in data.columns if data[col].dtype == object or isinstance(data[col].dtype, pd.StringDtype)]
+
+
+def read_source(path, sheet_name=0):
+    """
+    Read the workbook (or a CSV/Parquet export of it).
+
+    Values of mixed-type text columns (e.g. importer names next to numeric
+    importer IDs) are read as strings, so every column can be stored as Parquet.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        data = pd.read_csv(path)
+    elif extension == ".parquet":
+        data = pd.read_parquet(path)
+    else:
+        data = pd.read_excel(path, sheet_name=sheet_name)
+
+    for col in data.columns:
+        if data[col].dtype == object:
+            values = data[col]
+            data[col] = values.where(values.isna(), values.astype(str))
+    return data
+
+
+# ---------------------- STAGES ----------------------
+
+def strip_whitespace(data, columns=None):
+    """
+    Step 1: remove leading and trailing whitespace from the text columns.
+    """
+    for col in columns or text_columns(data):
+        data[col] = data[col].str.strip()
+    return data
+
+
+def remove_full_stops(data, columns=None):
+    """
+    Step 2: remove full stops from the categorical text columns (HSCODE is left as it is).
+    """
+    if columns is None:
+        columns = [col for col in text_columns(data) if col != "HSCODE"]
+    for col in columns:
+        data[col] = data[col].str.replace(".", "", regex=False)
+    return data
+
+
+def uppercase_columns(data, columns=("COUNTRY", "UNIT")):
+    """
+    Step 3: upper-case the values of COUNTRY and UNIT.
+    """
+    for col in columns:
+        if col in data.columns:
+            data[col] = data[col].str.upper()
+    return data
+
+
+def normalize_units(data, column="UNIT", aliases=None):
+    """
+    Step 4: map unit spellings to one unit (KGS -> KG).
+    """
+    if column in data.columns:
+        data[column] = data[column].replace(aliases if aliases is not None else {"KGS": "KG"})
+    return data
+
+
+def pad_hs_codes(data, column="HSCODE", fill_char="0"):
+    """
+    Step 5: pad the HS codes with trailing zeros to the length of the longest code.
+
+    Codes parsed as floats (a numeric column with gaps) are formatted without the ".0".
+    """
+    codes = data[column]
+    if pd.api.types.is_float_dtype(codes) and (codes.dropna() % 1 == 0).all():
+        codes = codes.astype("Int64")
+    codes = codes.astype(str)
+    data[column] = codes.str.ljust(int(codes.str.len().max()), fill_char)
+    return data
+
+
+def load_imputation_stage(path):
+    """
+    Load a fitted ImputationStage (Backend must be on PYTHONPATH to unpickle it).
+    """
+    try:
+        from imputation import ImputationStage
+    except ImportError as e:
+        raise ImportError("Loading an imputation stage needs Backend on PYTHONPATH (e.g. PYTHONPATH=Backend)") from e
+    return ImputationStage.load(path)
+
+
+def impute_missing(data, path):
+    """
+    Optional last step: fill gaps with a fitted ImputationStage saved to path.
+    """
+    return load_imputation_stage(path).transform(data)
+
+
+# Stage versions: bump one when its function changes, which invalidates its cache and every later stage's
+DEFAULT_STAGES = (
+    Stage("strip_whitespace", strip_whitespace, {}, 1),
+    Stage("remove_full_stops", remove_full_stops, {}, 1),
+    Stage("uppercase_columns", uppercase_columns, {"columns": ["COUNTRY", "UNIT"]}, 1),
+    Stage("normalize_units", normalize_units, {"column": "UNIT", "aliases": {"KGS": "KG"}}, 1),
+    Stage("pad_hs_codes", pad_hs_codes, {"column": "HSCODE", "fill_char": "0"}, 1),
+)
+
+
+# ---------------------- PIPELINE ----------------------
+
+class ImportStatisticsPipeline:
+    """
+    Runs the cleaning stages over a source file, reusing cached stage results.
+
+    Args:
+        source: Path of the workbook (or a CSV/Parquet export of it)
+        cache_path: Directory of the Parquet stage cache
+        sheet_name: Sheet of the workbook to read
+        stages: Ordered Stage tuples (default: DEFAULT_STAGES)
+        use_cache: Set to False to run every stage and leave the cache untouched
+        imputation_path: Fitted ImputationStage (joblib file) applied after the cleaning stages
+        **options: Option overrides per stage name, e.g. normalize_units={"aliases": {"KGS": "KG", "KILO": "KG"}}
+    """
+
+    def __init__(self, source, cache_path=INGESTION_CACHE_PATH, sheet_name=0, stages=DEFAULT_STAGES, use_cache=True,
+                 imputation_path=None, **options):
+        if imputation_path is not None:
+            imputation_path = os.path.abspath(imputation_path)
+            stages = tuple(stages) + (
+                Stage("impute_missing", impute_missing, {"path": imputation_path}, 1, fingerprint=file_sha256(imputation_path)),
+            )
+        unknown = set(options) - {stage.name for stage in stages}
+        if unknown:
+            raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+        self.source = source
+        self.cache_path = cache_path
+        self.sheet_name = sheet_name
+        self.use_cache = use_cache
+        self.stages = [stage._replace(options={**stage.options, **options.get(stage.name, {})}) for stage in stages]
+        # Per-step timings of the last run: [{"stage", "cached", "ms"}, ...]
+        self.report = []
+
+    def stage_keys(self):
+        """
+        Cache key of the parsed source followed by one key per stage (each chained to the previous one).
+        """
+        digest = hashlib.sha256()
+        digest.update(file_sha256(self.source).encode("utf-8"))
+        digest.update(json.dumps(["parse", PARSE_VERSION, self.sheet_name], default=str).encode("utf-8"))
+        keys = [digest.hexdigest()[:16]]
+        for stage in self.stages:
+            key = [stage.name, stage.version, stage.options] + ([stage.fingerprint] if stage.fingerprint is not None else [])
+            digest.update(json.dumps(key, sort_keys=True, default=str).encode("utf-8"))
+            keys.append(digest.hexdigest()[:16])
+        return keys
+
+    def cache_file(self, step, name, key):
+        stem = os.path.splitext(os.path.basename(self.source))[0]
+        return os.path.join(self.cache_path, stem, f"{step:02d}-{name}-{key}.parquet")
+
+    def _store(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.tmp-{os.getpid()}"
+        data.to_parquet(temporary, index=False)
+        os.replace(temporary, path)
+
+    def run(self):
+        """
+        Return the cleaned DataFrame, starting from the last stage whose result is cached.
+        """
+        self.report = []
+        names = ["parse"] + [stage.name for stage in self.stages]
+        files = [self.cache_file(step, name, key) for step, (name, key) in enumerate(zip(names, self.stage_keys()))]
+
+        # Find the latest cached step; everything before it is skipped
+        start, data = 0, None
+        if self.use_cache:
+            for step in range(len(files) - 1, -1, -1):
+                if os.path.exists(files[step]):
+                    began = time.perf_counter()
+                    data = pd.read_parquet(files[step])
+                    self.report.append({"stage": names[step], "cached": True, "ms": round((time.perf_counter() - began) * 1000, 2)})
+                    start = step + 1
+                    break
+
+        for step in range(start, len(files)):
+            began = time.perf_counter()
+            if step == 0:
+                data = read_source(self.source, self.sheet_name)
+            else:
+                stage = self.stages[step - 1]
+                data = stage.function(data, **stage.options)
+            elapsed = time.perf_counter() - began
+            if self.use_cache:
+                self._store(files[step], data)
+            self.report.append({"stage": names[step], "cached": False, "ms": round(elapsed * 1000, 2)})
+        return data
+
+
+def load_import_statistics(source, **kwargs):
+    """
+    Cleaned import statistics (see ImportStatisticsPipeline for the arguments).
+    """
+    return ImportStatisticsPipeline(source, **kwargs).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="IMPORT STATISTICS workbook (.xlsx, or a .csv/.parquet export)")
+    parser.add_argument("--output", help="Write the cleaned data to this Parquet file")
+    parser.add_argument("--cache-path", default=INGESTION_CACHE_PATH)
+    parser.add_argument("--sheet", default=0, help="Sheet name or index")
+    parser.add_argument("--no-cache", action="store_true", help="Run every stage without reading or writing the cache")
+    parser.add_argument("--imputation", help="Fitted ImputationStage (ImputationStage.save) to apply after cleaning "
+                                             "(needs Backend on PYTHONPATH)")
+    args = parser.parse_args()
+
+    sheet = int(args.sheet) if str(args.sheet).isdigit() else args.sheet
+    pipeline = ImportStatisticsPipeline(args.source, cache_path=args.cache_path, sheet_name=sheet, use_cache=not args.no_cache,
+                                        imputation_path=args.imputation)
+    data = pipeline.run()
+    for entry in pipeline.report:
+        print(f"{'✅ cached' if entry['cached'] else '⚙️  ran   '} {entry['stage']:20} {entry['ms']:10.1f} ms")
+    print(f"✅ {len(data)} rows, {len(data.columns)} columns")
+    if args.output:
+        data.to_parquet(args.output, index=False)
+        print(f"✅ Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()